@@ -1,3 +1,4 @@
+import copy
 from pathlib import Path
 
 from vyper import ast as vy_ast
@@ -69,3 +70,63 @@ def test_order_reversed():
     values = [i.value for i in node.get_descendants(vy_ast.Int, reverse=True)]
 
     assert values == [0, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def test_parent_before_children():
+    vyper_ast = vy_ast.parse_to_ast("@public\ndef foo(a: int128):\n    unlock []\n    pass")[0]
+    descendants = vyper_ast.get_descendants()
+
+    for idx, node in enumerate(descendants):
+        for child in node.get_children():
+            assert descendants.index(child) > idx
+
+
+def test_reverse_is_exact_reverse():
+    vyper_ast = vy_ast.parse_to_ast("foo = [1, (2, bar(3, 4)), 5 + 6]\nbaz = 7")[0]
+
+    descendants = vyper_ast.get_descendants(include_self=True)
+    assert vyper_ast.get_descendants(include_self=True, reverse=True) == descendants[::-1]
+
+
+def test_iter_descendants_is_lazy():
+    vyper_ast = vy_ast.parse_to_ast("foo = [1, 2, 3]\nbar = 4")[0]
+    iterator = vyper_ast.iter_descendants(vy_ast.Int)
+
+    assert next(iterator).value == 1
+    assert [i.value for i in iterator] == [2, 3, 4]
+    assert [i.value for i in vyper_ast.iter_descendants(vy_ast.Int, reverse=True)] == [4, 3, 2, 1]
+
+
+def test_module_index_matches_traversal():
+    vyper_ast = vy_ast.parse_to_ast("foo = [1, bar, (2, bar(3))]\nbar = 4 + baz\nbar = 5")[0]
+
+    for node_type in (vy_ast.Name, vy_ast.Int, vy_ast.Constant, (vy_ast.Tuple, vy_ast.Call)):
+        for reverse in (False, True):
+            expected = vy_ast.VyperNode.get_descendants(vyper_ast, node_type, reverse=reverse)
+            assert vyper_ast.get_descendants(node_type, reverse=reverse) == expected
+
+    expected = vy_ast.VyperNode.get_descendants(vyper_ast, vy_ast.Name, {"id": "bar"})
+    assert len(expected) == 4
+    assert vyper_ast.get_descendants(vy_ast.Name, {"id": "bar"}) == expected
+
+
+def test_module_index_after_replace():
+    vyper_ast = vy_ast.parse_to_ast("foo = bar + bar\nbaz = bar")[0]
+    assert len(vyper_ast.get_descendants(vy_ast.Name, {"id": "bar"})) == 3
+
+    old_node = vyper_ast.body[0].value
+    new_node = vy_ast.Name.from_node(old_node, id="bar")
+    vyper_ast.replace_in_tree(old_node, new_node)
+
+    assert not vyper_ast.get_descendants(vy_ast.BinOp)
+    names = vyper_ast.get_descendants(vy_ast.Name, {"id": "bar"})
+    assert names == [new_node, vyper_ast.body[1].value]
+    assert names[0] is new_node
+
+
+def test_module_index_deepcopy():
+    vyper_ast = vy_ast.parse_to_ast("foo = 42")[0]
+    vyper_ast.get_descendants(vy_ast.Int)
+
+    copied = copy.deepcopy(vyper_ast)
+    assert copied.get_descendants(vy_ast.Int)[0] is copied.body[0].value
@@ -78,3 +78,61 @@ def test_cannot_replace_twice():
 
     with pytest.raises(CompilerPanic):
         test_tree.replace_in_tree(old_node, new_node)
+
+
+def test_cannot_replace_discarded_descendant():
+    test_tree = vy_ast.parse_to_ast("foo = [1, 2]")[0]
+    old_node = test_tree.body[0].value
+    discarded_node = old_node.elts[0]
+
+    new_node = vy_ast.parse_to_ast("42")[0].body[0].value
+    test_tree.replace_in_tree(old_node, new_node)
+
+    with pytest.raises(CompilerPanic):
+        test_tree.replace_in_tree(discarded_node, vy_ast.Int(value=31337))
+
+
+def test_replace_moved_node():
+    test_tree = vy_ast.parse_to_ast("foo = [1, 2][1]")[0]
+    expected_tree = vy_ast.parse_to_ast("foo = 31337")[0]
+
+    subscript = test_tree.body[0].value
+    moved_node = subscript.value.elts[1]
+    test_tree.replace_in_tree(subscript, moved_node)
+    test_tree.replace_in_tree(moved_node, vy_ast.Int(value=31337))
+
+    assert vy_ast.compare_nodes(test_tree, expected_tree)
+
+
+@pytest.mark.parametrize("debug", [True, False])
+def test_node_does_not_exist_debug(monkeypatch, debug):
+    monkeypatch.setattr("vyper.ast.nodes.VYPER_DEBUG_AST", debug)
+    test_tree = vy_ast.parse_to_ast("foo = 42")[0]
+    old_node = test_tree.body[0].target
+
+    new_node = vy_ast.parse_to_ast("42")[0].body[0].value
+
+    with pytest.raises(CompilerPanic):
+        test_tree.replace_in_tree(new_node, old_node)
+
+    test_tree.replace_in_tree(old_node, new_node)
+    assert test_tree.body[0].target is new_node
+
+
+def test_replace_copy_on_write():
+    vyper_ast = vy_ast.parse_to_ast("foo = 42 + bar\nbaz = 31337")[0]
+    old_node = vyper_ast.body[0].value.left
+    expected_ast = vy_ast.parse_to_ast("foo = 23 + bar\nbaz = 31337")[0]
+
+    copied_ast = vyper_ast.copy_on_write()
+    new_node = vy_ast.Int.from_node(old_node, value=23)
+    copied_ast.replace_in_tree(old_node, new_node)
+
+    assert vy_ast.compare_nodes(copied_ast, expected_ast)
+    assert vyper_ast.body[0].value.left is old_node
+
+    # the ancestors of the replaced node are copied, other nodes are shared
+    assert copied_ast.body[0] is not vyper_ast.body[0]
+    assert copied_ast.get_copy(vyper_ast.body[0]) is copied_ast.body[0]
+    assert copied_ast.body[0].value.right is vyper_ast.body[0].value.right
+    assert copied_ast.body[1] is vyper_ast.body[1]
@@ -208,3 +208,63 @@ def test_replace_builtins(source, original, result):
     folding.replace_builtin_functions(original_ast)
 
     assert vy_ast.compare_nodes(original_ast, target_ast)
+
+
+def _fold_iteratively(vyper_module):
+    folding.replace_builtin_constants(vyper_module)
+    changed_nodes = 1
+    while changed_nodes:
+        changed_nodes = folding.replace_user_defined_constants(vyper_module)
+        changed_nodes += folding.replace_literal_ops(vyper_module)
+        changed_nodes += folding.replace_subscripts(vyper_module)
+        changed_nodes += folding.replace_builtin_functions(vyper_module)
+
+
+fold_sources = [
+    "FOO: constant(int128) = BAR + 1\nBAR: constant(int128) = 2\nfoo = FOO * BAR",
+    "FOO: constant(int128) = 1\nBAR: constant(int128[2]) = [FOO + 1, FOO]\nfoo = BAR[0]",
+    "FOO: constant(int128) = 3\nfoo = [FOO, 2][1] + [[FOO], [4]][FOO - 3][0]",
+    "FOO: constant(int128) = 1\nBAR: constant(int128) = min(FOO, 2)\nfoo = min([FOO, BAR][0], 3)",
+    "FOO: constant(decimal) = 4.2\nfoo = ceil(FOO) + floor(FOO * 2.0) + MAX_INT128",
+    "FOO: constant(int128) = 3\nfoo = FOO in [1, 2, FOO] and not FOO > 4",
+]
+
+
+@pytest.mark.parametrize("source", fold_sources)
+def test_fold_matches_iterative(source):
+    expected_ast = vy_ast.parse_to_ast(source)[0]
+    folded_ast = vy_ast.parse_to_ast(source)[0]
+
+    _fold_iteratively(expected_ast)
+    folding.fold(folded_ast)
+
+    assert vy_ast.compare_nodes(expected_ast, folded_ast)
+    assert expected_ast.to_dict() == folded_ast.to_dict()
+
+
+def test_fold_constant_chain():
+    source = "\n".join(
+        ["FOO0: constant(int128) = 1"]
+        + [f"FOO{i}: constant(int128) = FOO{i-1} + 1" for i in range(1, 30)]
+        + ["foo = FOO29"]
+    )
+    folded_ast = vy_ast.parse_to_ast(source)[0]
+    expected_ast = vy_ast.parse_to_ast("foo = 30")[0]
+
+    folding.fold(folded_ast)
+
+    assert vy_ast.compare_nodes(folded_ast.body[-1], expected_ast.body[0])
+
+
+@pytest.mark.parametrize("source", fold_sources)
+def test_fold_copy_on_write(source):
+    expected_ast = vy_ast.parse_to_ast(source)[0]
+    vyper_ast = vy_ast.parse_to_ast(source)[0]
+    unfolded = vyper_ast.to_dict()
+
+    folding.fold(expected_ast)
+    folded_ast = vyper_ast.copy_on_write()
+    folding.fold(folded_ast)
+
+    assert expected_ast.to_dict() == folded_ast.to_dict()
+    assert vyper_ast.to_dict() == unfolded
@@ -7,6 +7,7 @@ from web3.contract import Contract, mk_collision_prop
 from web3.providers.eth_tester import EthereumTesterProvider
 
 from vyper import compiler
+from vyper.parser.dispatcher import DEFAULT_DISPATCH
 
 from .grammar.conftest import get_lark_grammar
 
@@ -112,6 +113,8 @@ def _get_contract(w3, source_code, *args, **kwargs):
         ['abi', 'bytecode'],
         interface_codes=kwargs.pop('interface_codes', None),
         evm_version=kwargs.pop('evm_version', None),
+        dispatch=kwargs.pop('dispatch', DEFAULT_DISPATCH),
+        dispatch_profile=kwargs.pop('dispatch_profile', None),
     )
     LARK_GRAMMAR.parse(source_code + "\n")  # Test grammar.
     abi = out['abi']
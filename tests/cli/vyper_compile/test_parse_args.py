@@ -25,3 +25,15 @@ def foo() -> bool:
     os.chdir(chdir_path.parent)
     _parse_args([str(bar_path)])  # absolute path, subfolder of cwd
     _parse_args([str(bar_path.relative_to(chdir_path.parent))])  # relative path
+
+
+@pytest.mark.parametrize('profile', ['["transfer"]', '95'])
+def test_invalid_dispatch_profile(chdir_path, profile):
+    bar_path = chdir_path.joinpath('bar.vy')
+    with bar_path.open('w') as fp:
+        fp.write("")
+    profile_path = chdir_path.joinpath('profile.json')
+    with profile_path.open('w') as fp:
+        fp.write(profile)
+    with pytest.raises(ValueError):
+        _parse_args([str(bar_path), '--dispatch-profile', str(profile_path)])
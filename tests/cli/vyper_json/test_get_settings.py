@@ -2,9 +2,13 @@
 
 import pytest
 
-from vyper.cli.vyper_json import get_input_dict_settings
+from vyper.cli.vyper_json import (
+    get_input_dict_dispatch,
+    get_input_dict_settings,
+)
 from vyper.exceptions import JSONError
 from vyper.opcodes import DEFAULT_EVM_VERSION
+from vyper.parser.dispatcher import DEFAULT_DISPATCH
 
 
 def test_unknown_evm():
@@ -26,3 +30,24 @@ def test_valid_evm(evm_version):
 
 def test_default_evm():
     get_input_dict_settings({}) == {'evm_version': DEFAULT_EVM_VERSION}
+
+
+def test_default_dispatch():
+    assert get_input_dict_dispatch({}) == (DEFAULT_DISPATCH, None)
+
+
+def test_dispatch_profile():
+    input_dict = {'settings': {'dispatch': "jumptable", 'dispatchProfile': {'transfer': 95}}}
+    assert get_input_dict_dispatch(input_dict) == ("jumptable", {'transfer': 95})
+
+
+@pytest.mark.parametrize('settings', [
+    {'dispatch': "foo"},
+    {'dispatchProfile': ["transfer"]},
+    {'dispatchProfile': {'transfer': -1}},
+    {'dispatchProfile': {'transfer': "95"}},
+    {'dispatchProfile': {'transfer': True}},
+])
+def test_invalid_dispatch(settings):
+    with pytest.raises(JSONError):
+        get_input_dict_dispatch({'settings': settings})
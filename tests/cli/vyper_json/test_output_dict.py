@@ -38,5 +38,9 @@ def test_keys():
                 'sourceMap': data['source_map']['pc_pos_map_compressed']
             },
             'methodIdentifiers': data['method_identifiers'],
+            'gasEstimates': {
+                'dispatch': data['dispatch_gas'],
+                'dispatchExpected': data['dispatch_gas_expected'],
+            },
         }
     }
@@ -1,6 +1,9 @@
+import sys
+
 import pytest
 
-from vyper import compile_lll
+from vyper import compile_lll, opcodes
+from vyper.exceptions import CompilerPanic
 from vyper.parser.parser import LLLnode
 from vyper.parser.s_expressions import parse_s_exp
 
@@ -82,3 +85,161 @@ def test_pc_debugger():
     lll_nodes = LLLnode.from_list(debugger_lll)
     _, line_number_map = compile_lll.assembly_to_evm(compile_lll.compile_to_assembly(lll_nodes))
     assert line_number_map['pc_breakpoints'][0] == 5
+
+
+def test_compile_deeply_nested():
+    # nesting beyond the recursion limit
+    depth = sys.getrecursionlimit() * 2
+    lll_node = LLLnode.from_list(['mstore', 0, 1], pos=(1, 0, 1, 5))
+    for _ in range(depth):
+        lll_node = LLLnode('seq', [lll_node], pos=(2, 0, 2, 5))
+
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    assert assembly == ['PUSH1', 1, 'PUSH1', 0, 'MSTORE']
+    # instructions carry the position of the node that emitted them
+    assert [(i.lineno, i.end_col_offset) for i in assembly if isinstance(i, str)] == [(1, 5)] * 3
+
+
+@pytest.mark.parametrize('value', ['mstore', 'MSTORE', 'Mstore'])
+def test_compile_opcode_case(value):
+    lll_node = LLLnode.from_list([value, 0, 1])
+    assert compile_lll.compile_to_assembly(lll_node) == ['PUSH1', 1, 'PUSH1', 0, 'MSTORE']
+
+
+@pytest.mark.parametrize('evm_version', ['byzantium', 'istanbul'])
+def test_compile_opcodes_by_evm_version(monkeypatch, evm_version):
+    monkeypatch.setattr(opcodes, 'active_evm_version', opcodes.EVM_VERSIONS[evm_version])
+    for value in ('chainid', 'CHAINID', 'ChainId'):
+        lll_node = LLLnode.from_list([value])
+        if evm_version == 'byzantium':
+            with pytest.raises(Exception, match="Weird code element"):
+                compile_lll.compile_to_assembly(lll_node)
+        else:
+            assert compile_lll.compile_to_assembly(lll_node) == ['CHAINID']
+
+
+def test_compact_assembly():
+    lll_node = LLLnode.from_list(
+        ['seq', ['mstore', 0, 32], ['pc_debugger'], ['return', 0, ['lll', ['stop'], 0]]],
+        pos=(1, 0, 1, 5),
+    )
+    lll_node.args[0].pos = (2, 4, 2, 9)
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    compact = compile_lll.Assembly.from_list(assembly)
+
+    # each distinct position is stored once, and shared with sub-assemblies
+    assert compact.positions == [None, (1, 0, 1, 5), (2, 4, 2, 9)]
+    runtime = next(i for i in compact if isinstance(i, compile_lll.Assembly))
+    assert runtime.positions is compact.positions
+
+    roundtrip = compact.to_list()
+    assert roundtrip == assembly
+    assert [getattr(i, 'pc_debugger', None) for i in roundtrip] == [
+        getattr(i, 'pc_debugger', None) for i in assembly
+    ]
+    assert compile_lll.assembly_to_evm(compact) == compile_lll.assembly_to_evm(assembly)
+
+
+def test_assembly_to_evm_sub_assemblies():
+    # equal sub-assemblies are assembled and placed independently
+    sub_a = ['PUSH1', 1, 'POP']
+    sub_b = ['PUSH1', 1, 'POP']
+    assembly = [
+        '_sym_a', 'JUMP', '_sym_b', 'BLANK', sub_a, '_sym_a', 'JUMPDEST', sub_b, 'STOP'
+    ]
+    bytecode, _ = compile_lll.assembly_to_evm(assembly)
+    assert bytecode.hex() == "6006566001505b60015000"
+
+    # already assembled sub-assemblies are spliced in by identity
+    spliced, _ = compile_lll.assembly_to_evm(assembly, sub_codes={id(sub_b): b"\xfe"})
+    assert spliced.hex() == "6006566001505bfe00"
+
+
+@pytest.mark.parametrize('padding,push', [
+    (0, '6003'),
+    (252, '60ff'),
+    (253, '610101'),
+    (65531, '61ffff'),
+    (65532, '62010001'),
+])
+def test_assembly_to_evm_label_width(padding, push):
+    # labels are pushed with the smallest width that fits, widening the push
+    # moves the label that follows it
+    assembly = ['_sym_a', 'JUMP'] + ['STOP'] * padding + ['_sym_a', 'JUMPDEST']
+    bytecode, _ = compile_lll.assembly_to_evm(assembly)
+    assert bytecode.hex() == push + "56" + "00" * padding + "5b"
+
+
+def test_compile_gosub_twice():
+    # the same node may be compiled more than once, each with its own return label
+    gosub = LLLnode.from_list(['gosub', 'f'])
+    label = LLLnode.from_list(['seq', ['label', 'f'], ['jump', 'pass']])
+    lll_node = LLLnode('seq', [gosub, gosub, label])
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    return_labels = [
+        assembly[idx - 1] for idx, item in enumerate(assembly)
+        if item == 'JUMPDEST' and assembly[idx - 1] != '_sym_f'
+    ]
+    assert len(set(return_labels)) == 2
+    compile_lll.assembly_to_evm(assembly)
+
+
+def test_compile_sha3_64_variable():
+    # the second argument is compiled with the first one on the stack
+    lll_node = LLLnode.from_list(['with', 'x', 5, ['sha3_64', 1, 'x']])
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    assert assembly[:5] == ['PUSH1', 5, 'PUSH1', 1, 'DUP2']
+
+
+def test_compile_jumptable():
+    lll_node = LLLnode.from_list([
+        'seq',
+        ['jumptable', ['calldataload', 0], ['goto', 'a'], ['goto', 'b']],
+        ['label', 'a'], ['return', 0, 0],
+        ['label', 'b'], ['revert', 0, 0],
+    ])
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    bytecode, _ = compile_lll.assembly_to_evm(assembly)
+
+    # the entries of the table are of equal size, with labels pushed as two bytes
+    table = bytecode.index(bytes.fromhex("5b61"))
+    entries = [bytecode[i:i + 5] for i in (table, table + 5)]
+    assert [i[:2] + i[4:] for i in entries] == [bytes.fromhex("5b6156")] * 2
+    labels = [int.from_bytes(i[2:4], 'big') for i in entries]
+    assert [bytecode[i] for i in labels] == [0x5b, 0x5b]
+    assert bytecode[labels[0]:labels[1]].hex() == "5b60006000f3"
+
+
+def test_compile_jumptable_past_64kib():
+    # a label past 64KiB widens every entry of the table
+    padding = [['pop', ['calldataload', 2 ** 255]]] * 2400
+    lll_node = LLLnode.from_list([
+        'seq',
+        ['jumptable', ['calldataload', 0], ['goto', 'a'], ['goto', 'b']],
+        ['label', 'a'], ['return', 0, 0],
+        ['seq'] + padding,
+        ['label', 'b'], ['revert', 0, 0],
+    ])
+    assembly = compile_lll.compile_to_assembly(lll_node)
+    bytecode, _ = compile_lll.assembly_to_evm(assembly)
+    assert len(bytecode) > 2 ** 16
+
+    # the entry size is pushed before the table
+    assert bytecode[:6].hex() == "600035600602"
+    table = bytecode.index(bytes.fromhex("5b62"))
+    entries = [bytecode[i:i + 6] for i in (table, table + 6)]
+    assert [i[:2] + i[5:] for i in entries] == [bytes.fromhex("5b6256")] * 2
+    labels = [int.from_bytes(i[2:5], 'big') for i in entries]
+    assert labels[1] > 2 ** 16
+    assert [bytecode[i] for i in labels] == [0x5b, 0x5b]
+    assert bytecode[labels[1]:].hex() == "5b60006000fd"
+
+
+@pytest.mark.parametrize('bad_lll', [
+    ['jumptable', 0],
+    ['jumptable', ['pass'], ['goto', 'a']],
+    ['jumptable', 0, ['stop']],
+])
+def test_jumptable_fail(bad_lll):
+    with pytest.raises(CompilerPanic):
+        LLLnode.from_list(bad_lll).validate()
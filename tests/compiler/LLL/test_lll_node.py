@@ -0,0 +1,48 @@
+import sys
+
+import pytest
+
+from vyper.exceptions import CompilerPanic
+from vyper.parser.lll_node import LLLnode
+
+invalid_lll = [
+    ['mstore', 0],
+    ['mstore', 0, ['seq']],
+    ['if', ['seq'], ['pass']],
+    ['if', 1],
+    ['with', 1, 0, ['pass']],
+    ['repeat', 0, 0, 10, 1],
+    ['multi', 1, ['seq']],
+]
+
+
+@pytest.mark.parametrize('lll', invalid_lll)
+def test_validate(lll):
+    # malformed LLL is accepted until it is validated
+    lll_node = LLLnode.from_list(['seq', ['pass'], lll])
+    with pytest.raises(CompilerPanic):
+        lll_node.validate()
+
+
+def test_lazy_gas_and_valency():
+    lll_node = LLLnode.from_list(['if', 1, ['sstore', 0, 1]], add_gas_estimate=7)
+    assert lll_node._gas is None
+    assert lll_node._valency is None
+
+    # the children are estimated along with the node
+    assert lll_node.gas == 5 + (20000 + 5 + 5 + 15000 - 4) + 17 + 7
+    assert lll_node.args[1].gas == 20000 + 5 + 5 + 15000 - 4
+    assert lll_node.valency == 0
+
+    lll_node.total_gas = lll_node.gas + 10
+    assert lll_node.total_gas_overhead == 10
+
+
+def test_deeply_nested():
+    lll_node = LLLnode.from_list(['mstore', 0, 1])
+    for _ in range(sys.getrecursionlimit() * 2):
+        lll_node = LLLnode('seq', [lll_node])
+
+    lll_node.validate()
+    assert lll_node.valency == 0
+    assert lll_node.gas > 0
@@ -0,0 +1,101 @@
+from collections import Counter
+
+import pytest
+
+import vyper
+from vyper import compile_lll
+
+peephole_list = [
+    (['PUSH1', 5, 'POP', 'STOP'], ['STOP'], 'push_pop'),
+    (['PUSH2', 1, 0, 'POP', 'STOP'], ['STOP'], 'push_pop'),
+    (['_sym_a', 'POP', 'STOP'], ['STOP'], 'push_pop'),
+    (['DUP3', 'POP', 'STOP'], ['STOP'], 'dup_pop'),
+    (['SWAP2', 'SWAP2', 'STOP'], ['STOP'], 'swap_swap'),
+    (['CALLER', 'PUSH1', 0, 'ADD', 'STOP'], ['CALLER', 'STOP'], 'push_zero_op'),
+    (['CALLER', 'PUSH1', 0, 'XOR', 'STOP'], ['CALLER', 'STOP'], 'push_zero_op'),
+    (
+        ['CALLER', 'ISZERO', 'ISZERO', '_sym_a', 'JUMPI', '_sym_a', 'JUMPDEST'],
+        ['CALLER', '_sym_a', 'JUMPI', '_sym_a', 'JUMPDEST'],
+        'iszero_iszero_jumpi',
+    ),
+    # windows that are rewritten in turn
+    (['SWAP1', 'DUP1', 'PUSH1', 3, 'POP', 'POP', 'SWAP1'], [], 'swap_swap'),
+    # noop
+    (['CALLER', 'PUSH1', 1, 'ADD', 'POP'], ['CALLER', 'PUSH1', 1, 'ADD', 'POP'], None),
+    (['PUSH1', 0, 'SUB', 'STOP'], ['PUSH1', 0, 'SUB', 'STOP'], None),
+    (['SWAP1', 'SWAP2'], ['SWAP1', 'SWAP2'], None),
+    (['PUSH1', 5, '_sym_a', 'JUMPDEST', 'POP'], ['PUSH1', 5, '_sym_a', 'JUMPDEST', 'POP'], None),
+    (['ISZERO', 'ISZERO', 'DUP1', 'JUMPI'], ['ISZERO', 'ISZERO', 'DUP1', 'JUMPI'], None),
+]
+
+
+@pytest.mark.parametrize('assembly,expected,pattern', peephole_list)
+def test_peephole(assembly, expected, pattern):
+    hits = Counter()
+    assert compile_lll.optimize_assembly(assembly, hits) == expected
+    if pattern is None:
+        assert not hits
+    else:
+        assert hits[pattern]
+
+
+def test_peephole_nested_assembly():
+    # patterns do not span nested assemblies, which are optimized separately
+    assembly = ['PUSH1', 5, ['POP', 'DUP1', 'POP'], 'POP']
+    assert compile_lll.optimize_assembly(assembly) == ['PUSH1', 5, ['POP'], 'POP']
+
+
+def test_thread_jumps():
+    hits = Counter()
+    assembly = [
+        '_sym_a', 'JUMP',
+        '_sym_a', 'JUMPDEST', '_sym_b', 'JUMPDEST', '_sym_c', 'JUMP',
+        '_sym_c', 'JUMPDEST', 'CALLER', '_sym_b', 'JUMPI',
+        '_sym_d', 'JUMPDEST', '_sym_d', 'JUMP',
+    ]
+    optimized = compile_lll.optimize_assembly(assembly, hits)
+
+    assert optimized[0] == '_sym_c'
+    assert optimized[11] == '_sym_c'
+    # jumps that loop are left as they are
+    assert optimized[15] == '_sym_d'
+    assert hits == {'jump_to_jump': 2}
+
+
+def test_peephole_source_positions():
+    assembly = [
+        compile_lll.instruction(i, (1, 0, 1, 5)) for i in ('CALLER', 'DUP1', 'POP')
+    ] + [
+        compile_lll.instruction('_sym_a', (2, 0, 2, 5)),
+        compile_lll.instruction('JUMP', (3, 0, 3, 5)),
+        compile_lll.instruction('_sym_a', (4, 0, 4, 5)),
+        compile_lll.instruction('JUMPDEST', (4, 0, 4, 5)),
+        '_sym_b',
+        'JUMP',
+    ]
+    optimized = compile_lll.optimize_assembly(assembly)
+
+    assert optimized[:2] == ['CALLER', '_sym_b']
+    # the retargeted jump keeps the position of the original symbol
+    assert [(i.lineno, i.end_col_offset) for i in optimized[:3]] == [(1, 5), (2, 5), (3, 5)]
+
+
+def test_asm_diff_output():
+    code = """
+@public
+def __init__():
+    unlock [foo]
+
+@public
+def foo(a: uint256) -> uint256:
+    unlock []
+    if a <= 3:
+        return 1
+    return 2
+"""
+    out = vyper.compile_code(code, ['asm', 'asm_diff'])
+
+    assert out['asm_diff'].startswith('# iszero_iszero_jumpi: ')
+    assert '--- asm\n+++ asm (optimized)\n' in out['asm_diff']
+    assert '-ISZERO' in out['asm_diff']
+    assert 'ISZERO \nISZERO \n_sym' not in out['asm']
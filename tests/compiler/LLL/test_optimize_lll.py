@@ -1,21 +1,167 @@
+from collections import Counter
+
 import pytest
 
-from vyper import optimizer
+from vyper import opcodes, optimizer
 from vyper.parser.parser import LLLnode
 
 optimize_list = [
-    (['ne', 1, 0], ['ne', 1, 0]),  # noop
-    (['if', ['ne', 1, 0], 'pass'], ['if', ['xor', 1, 0], 'pass']),
-    (['assert', ['ne', 1, 0]], ['assert', ['xor', 1, 0]]),
-    (['assert_reason', ['ne', 1, 0], 0, 0], ['assert_reason', ['xor', 1, 0], 0, 0]),
-    (['mstore', 0, ['ne', 1, 0]], ['mstore', 0, ['ne', 1, 0]]),  # noop
+    (['ne', 1, 'x'], ['ne', 1, 'x']),  # noop
+    (['if', ['ne', 1, 'x'], 'pass'], ['if', ['xor', 1, 'x'], 'pass']),
+    (['assert', ['ne', 1, 'x']], ['assert', ['xor', 1, 'x']]),
+    (['assert_reason', ['ne', 1, 'x'], 0, 0], ['assert_reason', ['xor', 1, 'x'], 0, 0]),
+    (['mstore', 0, ['ne', 1, 'x']], ['mstore', 0, ['ne', 1, 'x']]),  # noop
+    (['if', ['iszero', ['iszero', 'x']], 'pass'], ['if', 'x', 'pass']),
+    (['iszero', ['iszero', ['iszero', 'x']]], ['iszero', 'x']),
+    (  # noop
+        ['mstore', 0, ['iszero', ['iszero', 'x']]],
+        ['mstore', 0, ['iszero', ['iszero', 'x']]],
+    ),
+    (['mod', 'x', 32], ['and', 'x', 31]),
 ]
 
 
 @pytest.mark.parametrize('lll', optimize_list)
 def test_lll_compile_fail(lll):
     optimized = optimizer.optimize(LLLnode.from_list(lll[0]))
-    optimized.repr_show_gas = True
     hand_optimized = LLLnode.from_list(lll[1])
-    hand_optimized.repr_show_gas = True
     assert optimized == hand_optimized
+
+
+fold_list = [
+    (['sub', 1, 2], -1),
+    (['div', 7, 0], 0),
+    (['div', -2, 2], 2**255 - 1),
+    (['sdiv', -7, 2], -3),
+    (['smod', -7, 2], -1),
+    (['mul', 2**255, 2], 0),
+    (['exp', 2, 256], 0),
+    (['addmod', 2**256 - 1, 2, 7], (2**256 + 1) % 7),
+    (['lt', -1, 1], 0),
+    (['slt', -1, 1], 1),
+    (['sge', 1, 1], 1),
+    (['ne', 1, 0], 1),
+    (['iszero', ['iszero', 5]], 1),
+    (['not', 0], 2**256 - 1),
+    (['byte', 31, 258], 2),
+    (['shr', 4, 255], 15),
+    (['sar', 4, -32], -2),
+    (['signextend', 0, 255], -1),
+    (['ceil32', 33], 64),
+]
+
+
+@pytest.mark.parametrize('lll,expected', fold_list)
+def test_fold_constants(lll, expected):
+    optimized = optimizer.optimize(LLLnode.from_list(lll))
+    assert optimized.value == expected
+    assert not optimized.args
+
+
+@pytest.mark.parametrize('evm_version', ['byzantium', 'constantinople'])
+def test_strength_reduction(monkeypatch, evm_version):
+    monkeypatch.setattr(opcodes, 'active_evm_version', opcodes.EVM_VERSIONS[evm_version])
+    reduce_list = [
+        (['mul', 'x', 32], ['shl', 5, 'x']),
+        (['mul', ['exp', 2, 3], 'x'], ['shl', 3, 'x']),
+        (['div', 'x', 256], ['shr', 8, 'x']),
+        (['exp', 2, 'x'], ['shl', 'x', 1]),
+    ]
+    for lll, expected in reduce_list:
+        optimized = optimizer.optimize(LLLnode.from_list(lll))
+        if evm_version == 'byzantium':
+            # shl and shr are not available before constantinople
+            assert optimized.value == lll[0]
+        else:
+            assert optimized.to_list() == LLLnode.from_list(expected).to_list()
+
+
+def test_optimize_in_place():
+    lll = LLLnode.from_list(['seq', ['mstore', 0, ['add', 1, 2]], ['sstore', 0, ['sload', 1]]])
+    sstore = lll.args[1]
+    optimized = optimizer.optimize(lll)
+
+    assert optimized is lll
+    assert optimized.args[1] is sstore
+    expected = LLLnode.from_list(['seq', ['mstore', 0, 3], ['sstore', 0, ['sload', 1]]])
+    assert optimized.to_list() == expected.to_list()
+
+
+def test_optimize_fixed_point():
+    hits = Counter()
+    lll = LLLnode.from_list(['add', 1, ['add', -1, ['sload', 1]]])
+    optimized = optimizer.optimize(lll, hits)
+
+    assert optimized.to_list() == LLLnode.from_list(['sload', 1]).to_list()
+    assert hits == {'fold_constant_add': 1, 'remove_add_zero': 1}
+
+
+def test_optimize_rule_evm_version(monkeypatch):
+    def _swap_args(node):
+        if node.args[0].value == 'sload':
+            node.args = node.args[::-1]
+            return True
+        return False
+
+    rules = [optimizer.Rule('swap_args', ('xor',), _swap_args, begin='istanbul')]
+    monkeypatch.setattr(optimizer, 'RULES', rules)
+    optimizer._get_rules.cache_clear()
+    try:
+        lll = LLLnode.from_list(['xor', ['sload', 1], 2])
+        opcodes.active_evm_version = opcodes.EVM_VERSIONS['byzantium']
+        assert optimizer.optimize(lll).args[0].value == 'sload'
+        opcodes.active_evm_version = opcodes.EVM_VERSIONS['istanbul']
+        assert optimizer.optimize(lll).args[0].value == 2
+    finally:
+        opcodes.active_evm_version = opcodes.EVM_VERSIONS[opcodes.DEFAULT_EVM_VERSION]
+        optimizer._get_rules.cache_clear()
+
+
+_mload_sum = ['add', ['mload', 320], ['mload', 352]]
+_sload_sum = ['add', ['sload', 1], ['sload', 2]]
+_x_sum = ['add', 'x', ['calldataload', 4]]
+
+cse_list = [
+    (
+        ['seq', ['sstore', 0, _mload_sum], ['sstore', 1, _mload_sum]],
+        ['with', '_cse0', _mload_sum, ['seq', ['sstore', 0, '_cse0'], ['sstore', 1, '_cse0']]],
+    ),
+    (
+        ['with', 'x', 1, ['seq', ['sstore', 0, _x_sum], ['sstore', 1, _x_sum]]],
+        ['with', 'x', 1, ['with', '_cse0', _x_sum,
+                          ['seq', ['sstore', 0, '_cse0'], ['sstore', 1, '_cse0']]]],
+    ),
+    # memory is written between the occurrences
+    (['seq', ['sstore', 0, _mload_sum], ['mstore', 320, 1], ['sstore', 1, _mload_sum]], None),
+    # storage is written between the occurrences
+    (['seq', ['sstore', 0, _sload_sum], ['sstore', 1, _sload_sum]], None),
+    # `x` is not bound
+    (['seq', ['sstore', 0, _x_sum], ['sstore', 1, _x_sum]], None),
+    # `x` is reassigned between the occurrences
+    (
+        ['with', 'x', 1, ['seq', ['sstore', 0, _x_sum], ['set', 'x', 2], ['sstore', 1, _x_sum]]],
+        None,
+    ),
+]
+
+
+@pytest.mark.parametrize('lll,expected', cse_list)
+def test_common_subexpression(lll, expected):
+    hits = Counter()
+    optimized = optimizer.optimize(LLLnode.from_list(lll), hits)
+    if expected is None:
+        expected = lll
+    assert optimized.to_list() == LLLnode.from_list(expected).to_list()
+    assert hits['common_subexpression'] == (expected is not lll)
+
+
+@pytest.mark.parametrize('depth', [14, 15])
+def test_common_subexpression_stack_depth(depth):
+    expr = ['add', 'var_2', ['calldataload', 4]]
+    lll = ['seq', ['sstore', 'var_1', expr], ['sstore', 'var_2', expr]]
+    for i in range(depth, 0, -1):
+        lll = ['with', f'var_{i}', 0, lll]
+
+    optimized = optimizer.optimize(LLLnode.from_list(lll))
+    # with 15 variables, another one would put `var_1` out of reach of DUP16
+    assert ('_cse0' in str(optimized)) == (depth == 14)
@@ -1,4 +1,6 @@
 import vyper
+from vyper import compile_lll
+from vyper.compiler.phases import CompilerData
 
 
 def test_bytecode_runtime():
@@ -12,3 +14,41 @@ def a() -> bool:
 
     assert len(out['bytecode']) > len(out['bytecode_runtime'])
     assert out['bytecode_runtime'][2:] in out['bytecode'][2:]
+
+
+def test_runtime_shared_with_deployment():
+    code = """
+@public
+def __init__():
+    unlock [a]
+
+@public
+def a() -> bool:
+    unlock []
+    return True
+    """
+
+    compiler_data = CompilerData(code)
+    lll_runtime = compiler_data.lll_runtime
+    assert compiler_data.lll_nodes.args[-1].args[1].args[0] is lll_runtime
+    assert any(i is compiler_data.assembly_runtime for i in compiler_data.assembly)
+
+    # splicing the runtime gives the same result as assembling it again
+    assert compiler_data.bytecode == compile_lll.assembly_to_evm(compiler_data.assembly)[0]
+    assembly_runtime = compile_lll.compile_to_assembly(lll_runtime)
+    assert compiler_data.bytecode_runtime == compile_lll.assembly_to_evm(assembly_runtime)[0]
+
+
+def test_constructor_only():
+    code = """
+x: uint256
+
+@public
+def __init__():
+    unlock []
+    self.x = 1
+    """
+
+    compiler_data = CompilerData(code)
+    assert compiler_data.assembly_runtime is not compiler_data.assembly
+    assert compiler_data.bytecode_runtime == compiler_data.bytecode
@@ -0,0 +1,107 @@
+import pytest
+
+import vyper
+from vyper import compiler
+from vyper.cli.vyper_compile import compile_files
+from vyper.compiler.cache import CompilationCache
+
+CODE = """
+@public
+def __init__():
+    unlock [foo]
+
+@public
+def foo(a: uint256) -> uint256:
+    unlock []
+    return a * 2
+"""
+
+FORMATS = ["bytecode", "bytecode_runtime", "abi", "asm", "source_map", "method_identifiers"]
+
+
+class CompiledError(Exception):
+    pass
+
+
+def _no_compile(*args, **kwargs):
+    raise CompiledError
+
+
+def test_cache_hit(tmp_path, monkeypatch):
+    expected = vyper.compile_code(CODE, FORMATS, cache_dir=tmp_path)
+
+    monkeypatch.setattr(compiler, "CompilerData", _no_compile)
+    assert vyper.compile_code(CODE, FORMATS, cache_dir=tmp_path) == expected
+    assert vyper.compile_code(CODE, ["abi"], cache_dir=tmp_path) == {"abi": expected["abi"]}
+
+
+def test_cache_adds_missing_formats(tmp_path, monkeypatch):
+    vyper.compile_code(CODE, ["bytecode"], cache_dir=tmp_path)
+    vyper.compile_code(CODE, ["abi"], cache_dir=tmp_path)
+
+    monkeypatch.setattr(compiler, "CompilerData", _no_compile)
+    output = vyper.compile_code(CODE, ["bytecode", "abi"], cache_dir=tmp_path)
+    assert set(output) == {"bytecode", "abi"}
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"contract_source": CODE + "\n# changed"},
+        {"evm_version": "byzantium"},
+        {"interface_codes": {"Foo": {"type": "vyper", "code": "@public\ndef foo(): pass"}}},
+    ],
+)
+def test_cache_miss(tmp_path, monkeypatch, kwargs):
+    vyper.compile_code(CODE, ["bytecode"], cache_dir=tmp_path)
+
+    kwargs = {"contract_source": CODE, "output_formats": ["bytecode"], **kwargs}
+    monkeypatch.setattr(compiler, "CompilerData", _no_compile)
+    with pytest.raises(CompiledError):
+        vyper.compile_code(cache_dir=tmp_path, **kwargs)
+
+
+def test_ir_not_cached(tmp_path, monkeypatch):
+    vyper.compile_code(CODE, ["ir", "bytecode"], cache_dir=tmp_path)
+
+    monkeypatch.setattr(compiler, "CompilerData", _no_compile)
+    vyper.compile_code(CODE, ["bytecode"], cache_dir=tmp_path)
+    with pytest.raises(CompiledError):
+        vyper.compile_code(CODE, ["ir"], cache_dir=tmp_path)
+
+
+def test_lru_eviction(tmp_path):
+    cache = CompilationCache(tmp_path, max_size=0)
+    cache.store("a", {"bytecode": "0x00"})
+    assert not list(tmp_path.iterdir())
+
+    cache.max_size = 2 ** 20
+    for key in ("a", "b", "c"):
+        cache.store(key, {"bytecode": "0x00"})
+    entry_size = tmp_path.joinpath("a.pickle").stat().st_size
+
+    # "a" becomes the most recently used entry, "b" is evicted first
+    assert cache.load("a") == {"bytecode": "0x00"}
+    cache.max_size = entry_size * 3
+    cache.store("d", {"bytecode": "0x00"})
+    assert cache.load("b") == {}
+    assert cache.load("a") == {"bytecode": "0x00"}
+
+
+def test_corrupt_entry(tmp_path):
+    cache = CompilationCache(tmp_path)
+    tmp_path.joinpath("a.pickle").write_bytes(b"not a pickle")
+    assert cache.load("a") == {}
+    assert not tmp_path.joinpath("a.pickle").exists()
+
+
+def test_compile_files_cache_dir(tmp_path):
+    foo_path = tmp_path.joinpath("foo.vy")
+    foo_path.write_text(CODE)
+    cache_path = tmp_path.joinpath("cache")
+
+    output = compile_files([foo_path], ["bytecode"], root_folder=tmp_path, cache_dir=cache_path)
+    assert len(list(cache_path.iterdir())) == 1
+    assert compile_files(
+        [foo_path], ["bytecode"], root_folder=tmp_path, cache_dir=cache_path
+    ) == output
@@ -0,0 +1,113 @@
+import pytest
+
+import vyper
+from vyper.cli.vyper_json import compile_from_input_dict, exc_handler_to_dict
+from vyper.exceptions import InvalidType, TypeMismatch
+
+FOO_CODE = """
+@public
+def __init__():
+    unlock [foo]
+
+@public
+def foo(a: uint256) -> uint256:
+    unlock []
+    return a * 2
+"""
+
+BAR_CODE = """
+@public
+def __init__():
+    unlock [bar]
+
+@public
+def bar() -> bool:
+    unlock []
+    return True
+"""
+
+BAD_COMPILER_CODE = """
+@public
+def __init__():
+    unlock [oopsie]
+
+@public
+def oopsie(a: uint256) -> bool:
+    unlock []
+    return 42
+"""
+
+DEPRECATED_MAPPING_CODE = """
+x: uint256[address]
+
+@public
+def __init__():
+    unlock []
+    pass
+"""
+
+FORMATS = ["abi", "bytecode", "bytecode_runtime", "source_map", "method_identifiers"]
+
+
+def test_parallel_matches_serial():
+    sources = {"foo.vy": FOO_CODE, "bar.vy": BAR_CODE, "baz.vy": FOO_CODE}
+
+    serial = vyper.compile_codes(sources, FORMATS, initial_id=3)
+    parallel = vyper.compile_codes(sources, FORMATS, initial_id=3, workers=2)
+
+    assert list(parallel) == list(serial) == ["bar.vy", "baz.vy", "foo.vy"]
+    assert parallel == serial
+    # source ids follow the sorted order of the contracts
+    assert parallel["foo.vy"]["source_map"]["pc_pos_map_compressed"].startswith("-1:-1:5:")
+
+
+def test_parallel_exc_handler_order():
+    sources = {"c.vy": BAD_COMPILER_CODE, "a.vy": BAD_COMPILER_CODE, "b.vy": FOO_CODE}
+
+    def exc_handler(contract_name, exc):
+        handled.append((contract_name, type(exc)))
+
+    handled = []
+    serial = vyper.compile_codes(sources, FORMATS, exc_handler=exc_handler)
+    serial_handled = handled
+
+    handled = []
+    parallel = vyper.compile_codes(sources, FORMATS, exc_handler=exc_handler, workers=3)
+
+    assert parallel == serial
+    assert handled == serial_handled
+    names = [i[0] for i in handled]
+    assert names == sorted(names)
+    assert set(names) == {"a.vy", "c.vy"}
+    assert set(i[1] for i in handled) == {TypeMismatch}
+
+
+def test_parallel_raises_and_warns():
+    sources = {"a.vy": FOO_CODE, "b.vy": DEPRECATED_MAPPING_CODE, "c.vy": BAD_COMPILER_CODE}
+
+    with pytest.warns(DeprecationWarning):
+        with pytest.raises(InvalidType):
+            vyper.compile_codes(sources, FORMATS, workers=3)
+
+
+def test_parallel_input_dict():
+    input_json = {
+        "language": "Vyper",
+        "sources": {
+            "contracts/foo.vy": {"content": FOO_CODE},
+            "contracts/bar.vy": {"content": BAR_CODE},
+        },
+        "settings": {"outputSelection": {"*": ["*"]}},
+    }
+
+    serial, _ = compile_from_input_dict(input_json)
+    parallel, _ = compile_from_input_dict(input_json, workers=2)
+    for path in ("contracts/foo.vy", "contracts/bar.vy"):
+        serial[path].pop("ir")
+        parallel[path].pop("ir")
+    assert parallel == serial
+
+    input_json["sources"]["contracts/baz.vy"] = {"content": BAD_COMPILER_CODE}
+    output, _ = compile_from_input_dict(input_json, exc_handler_to_dict, workers=2)
+    assert output["errors"][0]["sourceLocation"]["file"] == "contracts/baz.vy"
+    assert output["errors"][0]["type"] == "TypeMismatch"
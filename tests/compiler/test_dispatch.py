@@ -0,0 +1,108 @@
+import pytest
+
+import vyper
+from vyper.parser.dispatcher import (
+    DISPATCH_MODES,
+    get_expected_gas,
+    get_method_id_weights,
+    make_dispatcher,
+)
+from vyper.utils import fourbytes_to_int, keccak256
+
+
+def _make_code(count):
+    # every function is unlocked when the contract is deployed
+    names = [f"foo{i}" for i in range(count)]
+    code = f"""
+@public
+def __init__():
+    unlock [{", ".join(names)}]
+"""
+    for i, name in enumerate(names):
+        code += f"""
+@public
+def {name}() -> uint256:
+    unlock []
+    return {i}
+"""
+    return code
+
+
+@pytest.mark.parametrize("dispatch", DISPATCH_MODES)
+def test_dispatch(get_contract, dispatch):
+    c = get_contract(_make_code(20), dispatch=dispatch)
+    for i in range(20):
+        assert getattr(c, f"foo{i}")() == i
+
+
+@pytest.mark.parametrize("dispatch", DISPATCH_MODES)
+def test_dispatch_gas_output(dispatch):
+    out = vyper.compile_code(_make_code(20), ["dispatch_gas", "abi"], dispatch=dispatch)
+    dispatch_gas = out["dispatch_gas"]
+    assert sorted(dispatch_gas) == sorted(f"foo{i}" for i in range(20))
+
+
+def test_dispatch_gas_by_mode():
+    method_ids = [fourbytes_to_int(keccak256(f"foo{i}()".encode())[:4]) for i in range(60)]
+    worst_case = {}
+    for dispatch in DISPATCH_MODES:
+        _, dispatch_gas = make_dispatcher(method_ids, dispatch)
+        assert sorted(dispatch_gas) == sorted(method_ids)
+        worst_case[dispatch] = max(dispatch_gas.values())
+
+    # a linear search is paid for by the functions defined last
+    _, linear_gas = make_dispatcher(method_ids, "linear")
+    assert linear_gas[method_ids[-1]] == worst_case["linear"]
+    assert worst_case["jumptable"] < worst_case["binary"] < worst_case["linear"]
+
+
+def test_dispatch_unknown_mode():
+    with pytest.raises(ValueError):
+        make_dispatcher([1, 2, 3], "random")
+
+
+def test_method_id_weights():
+    method_ids = {"foo()": 1, "bar()": 2, "bar(uint256)": 3}
+    profile = {"foo()": 10, "bar": 4, "0x3": 1, "baz": 100, "0xff": 100}
+    assert get_method_id_weights(profile, method_ids) == {1: 10, 2: 2, 3: 3}
+
+    for weight in (-1, "1", True):
+        with pytest.raises(ValueError):
+            get_method_id_weights({"foo()": weight}, method_ids)
+
+
+@pytest.mark.parametrize("dispatch", DISPATCH_MODES)
+def test_dispatch_profile(dispatch):
+    method_ids = [fourbytes_to_int(keccak256(f"foo{i}()".encode())[:4]) for i in range(60)]
+    weights = {method_ids[-1]: 90, method_ids[-2]: 10}
+
+    _, dispatch_gas = make_dispatcher(method_ids, dispatch)
+    _, profiled_gas = make_dispatcher(method_ids, dispatch, weights)
+    assert sorted(profiled_gas) == sorted(method_ids)
+
+    # the most called method id is found first
+    assert profiled_gas[method_ids[-1]] == min(profiled_gas.values())
+    assert get_expected_gas(profiled_gas, weights) < get_expected_gas(dispatch_gas, weights)
+
+
+@pytest.mark.parametrize("dispatch", DISPATCH_MODES)
+def test_dispatch_profile_contract(get_contract, dispatch):
+    profile = {"foo19": 90, "foo18()": 10}
+    c = get_contract(_make_code(20), dispatch=dispatch, dispatch_profile=profile)
+    for i in range(20):
+        assert getattr(c, f"foo{i}")() == i
+
+
+def test_dispatch_gas_expected_output():
+    code = _make_code(20)
+    profile = {"foo19": 1}
+    out = vyper.compile_code(
+        code, ["dispatch_gas", "dispatch_gas_expected"], dispatch_profile=profile
+    )
+    assert out["dispatch_gas_expected"] == out["dispatch_gas"]["foo19"]
+    assert out["dispatch_gas"]["foo19"] == min(out["dispatch_gas"].values())
+
+    # without a profile, every function is weighted equally
+    out = vyper.compile_code(code, ["dispatch_gas", "dispatch_gas_expected"])
+    mean = sum(out["dispatch_gas"].values()) / 20
+    assert out["dispatch_gas_expected"] == pytest.approx(mean)
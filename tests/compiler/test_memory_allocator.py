@@ -0,0 +1,144 @@
+import pytest
+
+from vyper.ast import parse_to_ast
+from vyper.exceptions import CompilerPanic
+from vyper.parser.context import Context
+from vyper.parser.global_context import GlobalContext
+from vyper.parser.memory_allocator import MemoryAllocator
+from vyper.parser.stmt import parse_body
+
+
+def test_reuse_released_memory():
+    allocator = MemoryAllocator(0)
+    assert allocator.increase_memory(64) == (0, 64)
+    assert allocator.increase_memory(32) == (64, 96)
+    assert allocator.increase_memory(32) == (96, 128)
+
+    allocator.release_memory(0, 64)
+    assert allocator.increase_memory(32) == (0, 32)
+    assert allocator.increase_memory(64) == (128, 192)
+    assert allocator.increase_memory(32) == (32, 64)
+    assert allocator.free_blocks == []
+    assert allocator.size_of_mem == 192
+
+
+def test_merge_released_memory():
+    allocator = MemoryAllocator(0)
+    for _ in range(4):
+        allocator.increase_memory(32)
+
+    allocator.release_memory(0, 32)
+    allocator.release_memory(64, 32)
+    allocator.release_memory(32, 32)
+    assert allocator.free_blocks == [(0, 96)]
+    assert allocator.increase_memory(96) == (0, 96)
+
+
+def test_release_end_of_memory():
+    allocator = MemoryAllocator(0)
+    allocator.increase_memory(32)
+    allocator.increase_memory(64)
+    allocator.increase_memory(32)
+
+    allocator.release_memory(32, 64)
+    allocator.release_memory(96, 32)
+    assert allocator.free_blocks == []
+    assert allocator.get_next_memory_position() == 32
+    assert allocator.size_of_mem == 128
+
+
+def test_release_twice():
+    allocator = MemoryAllocator(0)
+    allocator.increase_memory(64)
+    allocator.release_memory(0, 32)
+    with pytest.raises(CompilerPanic):
+        allocator.release_memory(0, 32)
+    with pytest.raises(CompilerPanic):
+        allocator.release_memory(64, 32)
+
+
+sequential_blocks_code = """
+a: int128 = 1
+if a > 1:
+    x: bytes[64] = b"hello"
+else:
+    y: bytes[64] = b"world"
+for i in range(2):
+    z: bytes[64] = b"vyper"
+"""
+
+nested_blocks_code = """
+a: int128 = 1
+if a > 1:
+    x: bytes[64] = b"hello"
+    if a > 2:
+        y: bytes[64] = b"world"
+        for i in range(2):
+            z: bytes[64] = b"vyper"
+"""
+
+
+def _parse_body(code):
+    module, _ = parse_to_ast(code)
+    context = Context(vars={}, global_ctx=GlobalContext(), memory_allocator=MemoryAllocator(0))
+    parse_body(module.body, context)
+    return context
+
+
+def test_blocks_share_memory():
+    sequential = _parse_body(sequential_blocks_code)
+    nested = _parse_body(nested_blocks_code)
+
+    # only `a` is still allocated once the blocks end
+    assert list(sequential.vars) == list(nested.vars) == ['a']
+    assert sequential.memory_allocator.get_next_memory_position() == 32
+    assert nested.memory_allocator.get_next_memory_position() == 32
+    assert sequential.memory_allocator.size_of_mem < nested.memory_allocator.size_of_mem
+
+
+private_call_code = """
+@public
+def __init__():
+    unlock [bar, foo]
+
+@private
+def bar(a: int128, b: bytes[8]) -> bytes[40]:
+    unlock []
+    c: int128 = a * 2
+    return concat(b, convert(c, bytes32))
+
+@public
+def foo(a: int128) -> int128:
+    unlock []
+    total: int128 = 0
+    if a > 5:
+        x: bytes[40] = self.bar(a, b"hello")
+        total = len(x) + a
+    for i in range(3):
+        y: int128 = len(self.bar(i, b"vyper"))
+        total += y + i
+        z: bytes[40] = self.bar(total, b"world")
+        total += len(z)
+    d: int128 = total * 2
+    w: int128 = total + d
+    x: bytes[40] = self.bar(w, b"again")
+    return total + len(x) + w + a
+"""
+
+
+@pytest.mark.parametrize("a,expected", [(0, 937), (3, 940), (6, 1115)])
+def test_private_call_with_reused_memory(get_contract, monkeypatch, a, expected):
+    allocations = []
+    increase_memory = MemoryAllocator.increase_memory
+
+    def record_allocation(self, size):
+        start, end = increase_memory(self, size)
+        allocations.append((self, start))
+        return start, end
+
+    monkeypatch.setattr(MemoryAllocator, 'increase_memory', record_allocation)
+    c = get_contract(private_call_code)
+
+    # within a function, memory of variables that went out of scope is handed out again
+    assert len(set(allocations)) < len(allocations)
+    assert c.foo(a) == expected
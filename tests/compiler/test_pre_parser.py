@@ -1,5 +1,8 @@
 from pytest import raises
 
+from vyper import ast as vy_ast
+from vyper.ast.pre_parser import pre_parse
+from vyper.ast.utils import parse_to_ast
 from vyper.exceptions import SyntaxException
 
 
@@ -109,3 +112,90 @@ def foo():
 
     with raises(SyntaxException):
         get_contract(code)
+
+
+UNLOCK_CODE = """
+x: uint256
+
+@public
+def __init__():
+    unlock [foo]
+
+@public
+def foo(a: uint256,
+        b: uint256) -> uint256:  # multi-line header
+    unlock []
+    return a + b
+"""
+
+
+def test_unlock_guards():
+    _, unlocked_functions, reformatted_code, position_map = pre_parse(UNLOCK_CODE)
+    lines = reformatted_code.splitlines()
+
+    assert unlocked_functions == ["foo"]
+    assert lines[0] == "ul22_foo: bool"
+    # `__init__` is not guarded
+    assert lines[lines.index("def __init__():") + 1] == "    self.ul22_foo=True"
+    assert lines[lines.index("    assert self.ul22_foo", 7) - 1].endswith("# multi-line header")
+
+    # injected lines map to the end of the function header
+    header_idx = lines.index("        b: uint256) -> uint256:  # multi-line header")
+    assert position_map.get_position(1, 4) == (1, 0)
+    assert position_map.get_position(header_idx + 2, 4) == (10, 31)
+    assert position_map.get_position(lines.index("    return a + b") + 1, 4) == (12, 4)
+
+
+def test_unlock_many_functions(get_contract):
+    code = """
+@public
+def __init__():
+    unlock [foo, bar, baz]
+
+@private
+def baz() -> uint256:
+    unlock [foo, bar]
+    return 3
+
+@public
+def foo() -> uint256:
+    unlock [baz]
+    return 1
+
+@public
+def bar() -> uint256:
+    unlock [foo]
+    return self.baz() + 2
+"""
+    _, unlocked_functions, reformatted_code, _ = pre_parse(code)
+    lines = reformatted_code.splitlines()
+
+    # each flag is set in its own statement, and declared once
+    assert unlocked_functions == ["foo", "bar", "baz", "foo", "bar", "baz", "foo"]
+    assert "    self.ul22_foo=True;self.ul22_bar=True;self.ul22_baz=True" in lines
+    assert lines[:3] == ["ul22_baz: bool", "ul22_bar: bool", "ul22_foo: bool"]
+
+    c = get_contract(code)
+    assert c.foo() == 1
+    assert c.bar() == 5
+
+
+def test_unlock_original_positions():
+    vyper_module = parse_to_ast(UNLOCK_CODE)[0]
+
+    return_node = vyper_module.get_descendants(vy_ast.Return)[0]
+    assert (return_node.lineno, return_node.col_offset) == (12, 4)
+    assert return_node.node_source_code == "return a + b"
+    assert return_node.full_source_code is UNLOCK_CODE
+
+    assign_node = vyper_module.get_descendants(vy_ast.Assign)[0]
+    assert assign_node.lineno == 6
+    assert assign_node.node_source_code == "unlock [foo]"
+
+
+def test_unlock_syntax_error_lineno():
+    code = UNLOCK_CODE + "\n@public\ndef bar() -> uint256:\n    unlock []\n    return (1\n"
+
+    with raises(SyntaxException) as exc_info:
+        parse_to_ast(code)
+    assert exc_info.value.lineno == 18
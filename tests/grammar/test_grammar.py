@@ -29,6 +29,27 @@ def test_basic_grammar(lark_grammar):
     assert parse_to_ast(textwrap.dedent(code_func))
 
 
+def test_unlock_grammar(lark_grammar):
+    code = """
+    @public
+    def __init__():
+        unlock [foo, bar]
+
+    @public
+    def foo():
+        unlock []
+        pass
+
+    @public
+    def bar():
+        unlock [foo]
+        pass
+    """
+
+    assert lark_grammar.parse(textwrap.dedent(code) + "\n")
+    assert parse_to_ast(textwrap.dedent(code))
+
+
 def test_basic_grammar_empty(lark_grammar):
     code = """
     """
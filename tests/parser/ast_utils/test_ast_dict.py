@@ -90,3 +90,25 @@ def test() -> int128:
     new_ast = dict_to_ast(out_dict)
 
     assert new_ast == original_ast
+
+
+def test_ast_dict_is_not_folded():
+    code = """
+FOO: constant(int128) = 1 + 2
+
+@public
+def __init__():
+    unlock [foo]
+
+@public
+def foo() -> int128:
+    unlock []
+    return FOO * 2
+    """
+    out = compiler.compile_code(code, ['ast_dict', 'bytecode'])
+    expected = compiler.compile_code(code, ['ast_dict'])
+    assert out['ast_dict'] == expected['ast_dict']
+
+    # the constant and the reference to it have not been folded
+    assert out['ast_dict']['ast']['body'][1]['value']['ast_type'] == 'BinOp'
+    assert str(out['ast_dict']['ast']).count("'id': 'FOO'") == 2
@@ -3,7 +3,9 @@ from decimal import Decimal
 import pytest
 
 from vyper.compiler import compile_code
+from vyper.compiler.phases import CompilerData
 from vyper.exceptions import StructureException, TypeMismatch
+from vyper.signatures.function_signature import FunctionSignature
 
 
 def test_selfcall_code(get_contract_with_gas_estimation):
@@ -500,3 +502,154 @@ def test_selfcall_kwarg_raises(failing_contract_code, decorator, assert_compile_
         lambda: compile_code(failing_contract_code.format(decorator)),
         TypeMismatch
     )
+
+
+def test_selfcall_saves_live_variables(get_contract_with_gas_estimation):
+    # `mid` calls `deep`, whose frame is larger than its own. Some locals are read
+    # again after a call, in a later statement or in a later loop iteration, others
+    # are dead.
+    code = """
+@public
+def __init__():
+    unlock [deep, mid, tiny, foo, bar]
+
+@private
+def deep(a: int128) -> int128:
+    unlock []
+    p1: int128 = a + 1
+    p2: int128 = p1 + 1
+    p3: int128 = p2 + 1
+    p4: int128 = p3 + 1
+    p5: int128 = p4 + 1
+    p6: int128 = p5 + 1
+    p7: int128 = p6 + 1
+    p8: int128 = p7 + 1
+    p9: int128 = p8 + 1
+    p10: int128 = p9 + 1
+    return p10 + p1
+
+@private
+def mid(a: int128) -> int128:
+    unlock []
+    return self.deep(a) + 1
+
+@private
+def tiny(a: int128) -> int128:
+    unlock []
+    return a * 3
+
+@public
+def foo(n: int128) -> int128:
+    unlock []
+    u1: int128 = n
+    u2: int128 = n * 2
+    u3: int128 = n * 3
+    u4: int128 = n * 4
+    u5: int128 = n * 5
+    u6: int128 = n * 6
+    acc: int128 = 0
+    for i in range(5):
+        acc += u1 + self.mid(i)
+        acc = self.tiny(acc) - acc + u2
+        dead: int128 = self.tiny(i)
+        acc += u3 * self.mid(u4)
+    last: int128 = self.tiny(u5) + u6 + self.mid(acc)
+    return u5 + self.mid(last) + last
+
+@public
+def bar(n: int128) -> int128:
+    unlock []
+    x: int128 = n + 7
+    y: int128 = x * 2 + self.mid(x) - x
+    z: int128 = 0
+    for i in range(3):
+        if i > 0:
+            z += y
+        y = self.mid(i)
+    return z + y
+    """
+
+    def mid(a):
+        return 2 * a + 12
+
+    def foo(n):
+        acc = 0
+        for i in range(5):
+            acc += n + mid(i)
+            acc = 2 * acc + 2 * n
+            acc += 3 * n * mid(4 * n)
+        last = 15 * n + 6 * n + mid(acc)
+        return 5 * n + mid(last) + last
+
+    c = get_contract_with_gas_estimation(code)
+    for n in (0, 1, 5, -3):
+        assert c.foo(n) == foo(n)
+        assert c.bar(n) == 42
+
+
+def test_selfcall_base_type_args_on_stack(get_contract_with_gas_estimation):
+    code = """
+order: public(int128)
+
+@public
+def __init__():
+    unlock [mark, combine, pick, add_order, neg, foo]
+
+@private
+def mark(v: int128) -> int128:
+    unlock []
+    self.order = self.order * 10 + v
+    return v
+
+@private
+def combine(a: int128, b: int128, c: int128) -> int128:
+    unlock []
+    return a * 100 + b * 10 + c
+
+@private
+def pick(a: uint256, b: bool, c: address, d: decimal) -> uint256:
+    unlock []
+    if b and c == self:
+        return a + convert(floor(d), uint256)
+    return a
+
+@private
+def add_order(a: int128):
+    unlock []
+    self.order += a
+
+@private
+def neg(a: int128) -> int128:
+    unlock []
+    return -a
+
+@public
+def foo(n: int128) -> int128:
+    unlock []
+    self.order = 0
+    x: int128 = self.combine(self.mark(1), self.mark(2), self.mark(3))
+    y: uint256 = self.pick(10, True, self, 2.5) + self.pick(100, False, self, 1.0)
+    self.add_order(self.neg(n))
+    assert self.order == 123 - n
+    z: int128 = 0
+    for i in range(3):
+        z += self.neg(self.neg(i)) * x + self.combine(n, i, self.neg(-n))
+    return x + convert(y, int128) * 1000 + z * 1000000
+    """
+
+    def foo(n):
+        x = 123
+        z = sum(i * x + n * 100 + i * 10 + n for i in range(3))
+        return x + 112 * 1000 + z * 1000000
+
+    # every private function takes its arguments on the stack
+    global_ctx = CompilerData(code).global_ctx
+    for func in global_ctx._defs:
+        sig = FunctionSignature.from_definition(
+            func, custom_structs=global_ctx._structs, constants=global_ctx._constants
+        )
+        assert sig.uses_stack_convention() == sig.private
+
+    c = get_contract_with_gas_estimation(code)
+    for n in (0, 1, 5, -3):
+        assert c.foo(n) == foo(n)
@@ -1,6 +1,13 @@
 import ast as python_ast
+import sys
 
-from vyper.ast.annotation import annotate_python_ast
+import pytest
+
+from vyper.ast.annotation import (
+    _mark_native_positions,
+    _mark_token_positions,
+    annotate_python_ast,
+)
 from vyper.ast.pre_parser import pre_parse
 
 
@@ -65,3 +72,27 @@ def test_it_rewrites_unary_subtractions():
 
     assert isinstance(return_stmt.value, python_ast.Num)
     assert return_stmt.value.n == -1
+
+
+POSITION_SOURCES = [
+    "@public\n@constant\ndef foo(x: int128) -> int128:\n    return -(-(x)) + max(x, 2)",
+    "import foo as bar\nfrom a.b import c as d, e\n",
+    "# comment\n@ public\ndef foo(a: int128 = (1), b: uint256 = ((2))) -> (int128):\n    pass",
+    "def foo(\n    a: int128,  # comment (\n):\n    bar(a, b=(3), **c)\n    x = y[(0)]\n",
+    "x: string[10] = 'ñañá'  # ü\ny = {'é': [1, 2][0]}\nz = \\\n    1 + 2\n",
+    "\n\n",
+]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="requires native end positions")
+@pytest.mark.parametrize("source_code", POSITION_SOURCES)
+def test_native_positions_match_tokens(source_code):
+    native_ast = python_ast.parse(source_code)
+    token_ast = python_ast.parse(source_code)
+
+    _mark_native_positions(native_ast, source_code)
+    _mark_token_positions(token_ast, source_code)
+
+    for native_node, token_node in zip(python_ast.walk(native_ast), python_ast.walk(token_ast)):
+        assert getattr(native_node, "src_start", None) == getattr(token_node, "src_start", None)
+        assert getattr(native_node, "src_end", None) == getattr(token_node, "src_end", None)
@@ -1,9 +1,13 @@
 import ast as python_ast
+import re
+import sys
+from bisect import bisect_right
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional
 
 import asttokens
 
+from vyper.ast.pre_parser import PositionMap
 from vyper.exceptions import CompilerPanic, SyntaxException
 from vyper.typing import ClassTypes
 
@@ -37,22 +41,23 @@ class AnnotatingVisitor(python_ast.NodeTransformer):
         self.counter += 1
 
         # Decorate every node with source end offsets
-        start = node.first_token.start if hasattr(node, "first_token") else (None, None)
-        end = node.last_token.end if hasattr(node, "last_token") else (None, None)
+        start = getattr(node, "src_start", (None, None, None))
+        end = getattr(node, "src_end", (None, None, None))
 
         node.lineno = start[0]
         node.col_offset = start[1]
         node.end_lineno = end[0]
         node.end_col_offset = end[1]
 
-        if hasattr(node, "last_token"):
-            start_pos = node.first_token.startpos
-            end_pos = node.last_token.endpos
-            node.src = f"{start_pos}:{end_pos-start_pos}:{self._source_id}"
-            node.node_source_code = self._source_code[start_pos:end_pos]
+        if hasattr(node, "src_end"):
+            node.src = f"{start[2]}:{end[2]-start[2]}:{self._source_id}"
 
         return super().generic_visit(node)
 
+    def _get_source(self, node):
+        # source code of a node, as given by it's source offsets
+        return self._source_code[node.src_start[2]:node.src_end[2]]
+
     def _visit_docstring(self, node):
         """
         Move a node docstring from body to `doc_string` and annotate it as `DocStr`.
@@ -127,7 +132,7 @@ class AnnotatingVisitor(python_ast.NodeTransformer):
         """
         # modify vyper AST type according to the format of the literal value
         self.generic_visit(node)
-        value = node.node_source_code
+        value = self._get_source(node)
 
         # deduce non base-10 types based on prefix
         literal_prefixes = {"0x": "Hex", "0o": "Octal"}
@@ -183,17 +188,224 @@ class AnnotatingVisitor(python_ast.NodeTransformer):
         if is_sub and is_num:
             node.operand.n = 0 - node.operand.n
             node.operand.col_offset = node.col_offset
-            node.operand.node_source_code = node.node_source_code
+            node.operand.node_source_code = self._get_source(node)
             return node.operand
         else:
             return node
 
 
+class _LineOffsets:
+    """
+    Table of line start offsets, used to convert source positions to offsets.
+    """
+
+    def __init__(self, source_code: str) -> None:
+        self._lines = source_code.split("\n")
+        self._offsets = [0]
+        for line in self._lines[:-1]:
+            self._offsets.append(self._offsets[-1] + len(line) + 1)
+
+    def from_native(self, lineno: int, col_offset: int) -> tuple:
+        # convert a Python AST position, where the column is a UTF-8 byte
+        # offset, to a `(lineno, column, offset)` tuple
+        line = self._lines[lineno - 1]
+        if not line.isascii():
+            col_offset = len(line.encode("utf-8")[:col_offset].decode("utf-8", "ignore"))
+        return lineno, col_offset, self._offsets[lineno - 1] + col_offset
+
+    def from_position(self, lineno: int, col_offset: int) -> tuple:
+        # convert a `(lineno, column)` position to a `(lineno, column, offset)`
+        # tuple, limiting the column to the length of the line
+        col_offset = min(col_offset, len(self._lines[lineno - 1]))
+        return lineno, col_offset, self._offsets[lineno - 1] + col_offset
+
+    def from_offset(self, offset: int) -> tuple:
+        # convert an offset within the source to a `(lineno, column, offset)` tuple
+        lineno = bisect_right(self._offsets, offset)
+        return lineno, offset - self._offsets[lineno - 1], offset
+
+
+# node classes that asttokens does not annotate, as they are shared between nodes
+# and do not represent a particular position in the source
+_SINGLETON_NODES = (
+    python_ast.expr_context,
+    python_ast.boolop,
+    python_ast.operator,
+    python_ast.unaryop,
+    python_ast.cmpop,
+)
+
+_MATCHING_PAIRS = {"(": ")", "[": "]", "{": "}"}
+
+_FIRST_TOKEN_RE = re.compile(r"\w+|\S")
+_MODULE_TOKEN_RE = re.compile(r"#.*|\n|\w+|\S")
+
+
+def _iter_children(node):
+    return (i for i in python_ast.iter_child_nodes(node) if not isinstance(i, _SINGLETON_NODES))
+
+
+def _skip_whitespace(source_code: str, offset: int) -> int:
+    # offset of the next character that is not whitespace or part of a comment
+    while offset < len(source_code):
+        if source_code[offset] == "#":
+            offset = source_code.find("\n", offset)
+            if offset == -1:
+                return len(source_code)
+        elif not source_code[offset].isspace() and source_code[offset] != "\\":
+            return offset
+        offset += 1
+    return offset
+
+
+def _expand_to_matching_pairs(source_code: str, start: int, end: int, children: list) -> tuple:
+    # expand the range of a node to include brackets that are opened or closed
+    # between it's children, but not matched within the range
+    to_match_right: list = []
+    to_match_left: list = []
+    offset = start
+    for child in sorted(children, key=lambda k: k.src_start[2]) + [None]:
+        gap_end = end if child is None else child.src_start[2]
+        while offset < gap_end:
+            char = source_code[offset]
+            if char == "#":
+                offset = source_code.find("\n", offset, gap_end)
+                if offset == -1:
+                    break
+            elif to_match_right and char == to_match_right[-1]:
+                to_match_right.pop()
+            elif char in _MATCHING_PAIRS:
+                to_match_right.append(_MATCHING_PAIRS[char])
+            elif char in _MATCHING_PAIRS.values():
+                to_match_left.append(char)
+            offset += 1
+        if child is not None:
+            offset = max(offset, child.src_end[2])
+
+    for char in reversed(to_match_right):
+        offset = _skip_whitespace(source_code, end)
+        # allow for trailing commas or colons before the closing bracket
+        while offset < len(source_code) and source_code[offset] in ",:":
+            offset = _skip_whitespace(source_code, offset + 1)
+        if offset < len(source_code) and source_code[offset] == char:
+            end = offset + 1
+
+    for char in to_match_left:
+        offset = start - 1
+        while offset >= 0 and source_code[offset].isspace():
+            offset -= 1
+        if offset >= 0 and _MATCHING_PAIRS.get(source_code[offset]) == char:
+            start = offset
+
+    return start, end
+
+
+def _mark_native_positions(parsed_ast: python_ast.AST, source_code: str) -> None:
+    """
+    Annotate each node of a Python AST with it's start and end position.
+
+    Positions are taken from the end offsets that the `ast` module provides in
+    Python 3.8 and later, so the source is not tokenized a second time. Nodes
+    without a native position are given the same position as `asttokens` would
+    give them.
+    """
+    line_offsets = _LineOffsets(source_code)
+
+    # depth-first traversal, each node is visited once prior to it's children
+    # and again after them. `parent_start` is the start offset of the closest
+    # ancestor that has a native position.
+    stack: list = [(parsed_ast, 0, False)]
+    while stack:
+        node, parent_start, is_expanded = stack.pop()
+        is_native = "end_lineno" in node._attributes
+
+        if not is_expanded:
+            stack.append((node, parent_start, True))
+            if is_native:
+                parent_start = line_offsets.from_native(node.lineno, node.col_offset)[2]
+            if not isinstance(node, python_ast.JoinedStr):
+                # the values of an f-string are not annotated
+                stack.extend((i, parent_start, False) for i in _iter_children(node))
+            continue
+
+        if is_native:
+            node.src_start = line_offsets.from_native(node.lineno, node.col_offset)
+            node.src_end = line_offsets.from_native(node.end_lineno, node.end_col_offset)
+            if getattr(node, "decorator_list", None):
+                # the node begins at the first decorator
+                offset = source_code.rfind("@", 0, node.decorator_list[0].src_start[2])
+                node.src_start = line_offsets.from_offset(offset)
+            continue
+
+        if isinstance(node, python_ast.JoinedStr):
+            continue
+        children = [i for i in _iter_children(node) if hasattr(i, "src_start")]
+        if isinstance(node, python_ast.Module):
+            # a module begins at the start of the source
+            node.src_start = (1, 0, 0)  # type: ignore
+            if children:
+                end_position = max((i.src_end for i in children), key=lambda k: k[2])
+                node.src_end = end_position  # type: ignore
+            else:
+                # an empty module spans the first token on the first line
+                match = _MODULE_TOKEN_RE.match(source_code)
+                end = match.end() if match else 0
+                node.src_end = (1, end, end)  # type: ignore
+            continue
+
+        if not children:
+            # a node without children spans the first token of it's parent
+            start = parent_start
+            end = _FIRST_TOKEN_RE.match(source_code, parent_start).end()  # type: ignore
+        else:
+            start = min(i.src_start[2] for i in children)
+            end = max(i.src_end[2] for i in children)
+            start, end = _expand_to_matching_pairs(source_code, start, end, children)
+            if isinstance(node, python_ast.keyword) and node.arg is not None:
+                # a keyword begins with the argument name
+                start = source_code.rfind(node.arg, 0, start)
+                start, end = _expand_to_matching_pairs(source_code, start, end, children)
+            elif isinstance(node, python_ast.comprehension):
+                start = source_code.rfind("for", 0, start)
+
+        node.src_start = line_offsets.from_offset(start)
+        node.src_end = line_offsets.from_offset(end)
+
+
+def _mark_token_positions(parsed_ast: python_ast.AST, source_code: str) -> None:
+    """
+    Annotate each node of a Python AST with it's start and end position, by
+    tokenizing the source with `asttokens`.
+    """
+    asttokens.ASTTokens(source_code, tree=parsed_ast)
+    node: Any
+    for node in python_ast.walk(parsed_ast):
+        if hasattr(node, "first_token"):
+            node.src_start = node.first_token.start + (node.first_token.startpos,)
+            node.src_end = node.last_token.end + (node.last_token.endpos,)
+
+
+def _map_positions(parsed_ast: python_ast.AST, position_map: PositionMap) -> None:
+    """
+    Translate the start and end position of each node of a Python AST from the
+    reformatted source to the original source.
+    """
+    line_offsets = _LineOffsets(position_map.source_code)
+    node: Any
+    for node in python_ast.walk(parsed_ast):
+        if hasattr(node, "src_start"):
+            start = position_map.get_position(*node.src_start[:2])
+            end = position_map.get_position(*node.src_end[:2])
+            node.src_start = line_offsets.from_position(*start)
+            node.src_end = line_offsets.from_position(*end)
+
+
 def annotate_python_ast(
     parsed_ast: python_ast.AST,
     source_code: str,
     class_types: Optional[ClassTypes] = None,
     source_id: int = 0,
+    position_map: Optional[PositionMap] = None,
 ) -> python_ast.AST:
     """
     Annotate and optimize a Python AST in preparation conversion to a Vyper AST.
@@ -206,13 +418,25 @@ def annotate_python_ast(
         The originating source code of the AST.
     class_types : dict, optional
         A mapping of class names to their original class types.
+    source_id : int, optional
+        Source id to use in the `src` member of each node.
+    position_map : PositionMap, optional
+        Map of positions within `source_code` to the original source, as given
+        by `pre_parse`. When given, nodes are annotated with their position
+        within the original source.
 
     Returns
     -------
         The annotated and optimized AST.
     """
 
-    asttokens.ASTTokens(source_code, tree=parsed_ast)
+    if sys.version_info >= (3, 8):
+        _mark_native_positions(parsed_ast, source_code)
+    else:
+        _mark_token_positions(parsed_ast, source_code)
+    if position_map is not None:
+        _map_positions(parsed_ast, position_map)
+        source_code = position_map.source_code
     AnnotatingVisitor(source_code, class_types, source_id).visit(parsed_ast)
 
     return parsed_ast
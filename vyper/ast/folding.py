@@ -1,5 +1,7 @@
+import heapq
 from decimal import Decimal
-from typing import Union
+from itertools import count
+from typing import Dict, List, Union
 
 from vyper.ast import nodes as vy_ast
 from vyper.exceptions import UnfoldableNode
@@ -19,24 +21,197 @@ BUILTIN_CONSTANTS = {
 }
 
 
+# node types that are folded in each phase of a folding round, in order of
+# application. references to user-defined constants are replaced prior to these.
+PHASE_NODE_TYPES = (
+    (vy_ast.BoolOp, vy_ast.BinOp, vy_ast.UnaryOp, vy_ast.Compare),
+    (vy_ast.Subscript,),
+    (vy_ast.Call,),
+)
+
+# node types that may contain a foldable node without being foldable themselves,
+# e.g. the elements of a literal list that is indexed by a subscript
+CONTAINER_NODE_TYPES = (vy_ast.List, vy_ast.Tuple, vy_ast.Index, vy_ast.keyword)
+
+
 def fold(vyper_module: vy_ast.Module) -> None:
     """
     Perform literal folding operations on a Vyper AST.
 
+    Folding is driven by a worklist. Every foldable node is visited in the first
+    round, after which a node is only revisited when one of its children is
+    replaced or, for references to user-defined constants, when the value of the
+    constant changes. Each round applies the same phases in the same order as
+    `replace_user_defined_constants`, `replace_literal_ops`, `replace_subscripts`
+    and `replace_builtin_functions`, so the result is identical to applying those
+    functions until the AST stops changing.
+
     Arguments
     ---------
     vyper_module : Module
         Top-level Vyper AST node.
     """
-    replace_builtin_constants(vyper_module)
+    # a single traversal to find every foldable node and index all names
+    name_index: Dict[str, List] = {}
+    nodes = []
+    for node in vyper_module.get_descendants(reverse=True):
+        if isinstance(node, vy_ast.Name):
+            name_index.setdefault(node.id, []).append(node)
+        else:
+            nodes.append(node)
+
+    for name, (node, value) in BUILTIN_CONSTANTS.items():
+        for name_node in name_index.pop(name, []):
+            if _is_replaceable_name(name_node):
+                new_node = _replace(name_node, node(value=value))  # type: ignore
+                vyper_module.replace_in_tree(name_node, new_node)
+
+    constants: Dict[str, vy_ast.AnnAssign] = {}
+    for node in vyper_module.get_children(vy_ast.AnnAssign):
+        if _is_constant_definition(node):
+            constants.setdefault(node.target.id, node)
+
+    worklist = _Worklist(vyper_module, constants, name_index)
+    for name in constants:
+        worklist.names[name] = list(name_index.get(name, []))
+    for node in nodes:
+        worklist.add(node)
+
+    while worklist:
+        # constants are replaced in order of definition, a constant referenced by
+        # a later definition is available to that definition within the same round
+        for name, definition in constants.items():
+            # the definition may have been copied when its value was folded
+            definition = vyper_module.get_copy(definition)
+            for node in worklist.names.pop(name, []):
+                if worklist.is_discarded(node) or not _is_replaceable_name(node):
+                    continue
+                try:
+                    new_node = _replace(node, definition.value)
+                except UnfoldableNode:
+                    continue
+                worklist.replace(node, new_node)
+
+        for heap in worklist.heaps:
+            while heap:
+                # the node may have been copied since it was added to the worklist
+                node = vyper_module.get_copy(heapq.heappop(heap)[-1])
+                if worklist.is_discarded(node):
+                    continue
+                try:
+                    new_node = _evaluate(node)
+                except UnfoldableNode:
+                    continue
+                worklist.replace(node, new_node)
+
+
+class _Worklist:
+    """
+    Nodes awaiting evaluation during constant folding.
+
+    Attributes
+    ----------
+    vyper_module : Module
+        Top-level Vyper AST node that is being folded.
+    constants : Dict
+        User-defined constant definitions, as `{"name": AnnAssign}`
+    name_index : Dict
+        All `Name` nodes within the AST, as `{"name": [Name, ..]}`
+    names : Dict
+        References to user-defined constants that must be revisited, as
+        `{"name": [Name, ..]}`
+    heaps : List
+        One heap for each of `PHASE_NODE_TYPES`. Nodes within a heap are ordered
+        by descending source offset, so that children are evaluated prior to
+        their parents.
+    """
 
-    changed_nodes = 1
-    while changed_nodes:
-        changed_nodes = 0
-        changed_nodes += replace_user_defined_constants(vyper_module)
-        changed_nodes += replace_literal_ops(vyper_module)
-        changed_nodes += replace_subscripts(vyper_module)
-        changed_nodes += replace_builtin_functions(vyper_module)
+    def __init__(
+        self,
+        vyper_module: vy_ast.Module,
+        constants: Dict[str, vy_ast.AnnAssign],
+        name_index: Dict,
+    ) -> None:
+        self.vyper_module = vyper_module
+        self.constants = constants
+        self.name_index = name_index
+        self.names: Dict[str, List] = {}
+        self.heaps: List[List] = [[] for i in PHASE_NODE_TYPES]
+        self._counter = count()
+        # nodes removed from the AST, by id. the nodes are kept so their ids are
+        # not reused while folding.
+        self._discarded: Dict[int, vy_ast.VyperNode] = {}
+
+    def __bool__(self) -> bool:
+        return any(self.names.values()) or any(self.heaps)
+
+    def add(self, node: vy_ast.VyperNode) -> None:
+        if isinstance(node, vy_ast.Name):
+            if node.id in self.constants:
+                self.names.setdefault(node.id, []).append(node)
+            return
+        if isinstance(node, vy_ast.Call) and not isinstance(node.func, vy_ast.Name):
+            return
+        for heap, node_types in zip(self.heaps, PHASE_NODE_TYPES):
+            if isinstance(node, node_types):
+                sort_key = tuple(
+                    float("-inf") if i is None else -i
+                    for i in (node.lineno, node.col_offset, node.node_id)
+                )
+                heapq.heappush(heap, (sort_key, next(self._counter), node))
+                return
+
+    def is_discarded(self, node: vy_ast.VyperNode) -> bool:
+        # a node is discarded when it, or one of its ancestors, was replaced
+        return id(node) in self._discarded
+
+    def replace(self, old_node: vy_ast.VyperNode, new_node: vy_ast.VyperNode) -> None:
+        """
+        Replace a node within the AST and add the affected nodes to the worklist.
+        """
+        # the new node may be a descendant of the old node, as when a subscript
+        # evaluates to one of its existing elements
+        stack = [old_node]
+        while stack:
+            node = stack.pop()
+            if node is not new_node:
+                self._discarded[id(node)] = node
+                stack.extend(node._children)
+
+        self.vyper_module.replace_in_tree(old_node, new_node)
+        self._add_replacement(new_node)
+
+    def _add_replacement(self, node: vy_ast.VyperNode) -> None:
+        # add the nodes that must be revisited after `node` was inserted into the AST
+        # an existing node that was moved may itself contain foldable nodes
+        for child in node.get_descendants(include_self=True):
+            self.add(child)
+
+        parent = node.get_ancestor()
+        while isinstance(parent, CONTAINER_NODE_TYPES):
+            parent = parent.get_ancestor()
+
+        if isinstance(parent, vy_ast.AnnAssign):
+            name = parent.target.get("id")
+            definition = self.constants.get(name)
+            if definition is not None and self.vyper_module.get_copy(definition) is parent:
+                # the value of a constant changed, revisit all references to it
+                self.names.setdefault(name, []).extend(self.name_index.get(name, []))
+        elif parent is not None:
+            self.add(parent)
+
+
+def _evaluate(node: vy_ast.VyperNode) -> vy_ast.VyperNode:
+    # evaluate a single node, raises `UnfoldableNode` if it cannot be folded
+    if not isinstance(node, vy_ast.Call):
+        return node.evaluate()
+
+    if not isinstance(node.func, vy_ast.Name):
+        raise UnfoldableNode("Not a builtin function call")
+    func = DISPATCH_TABLE.get(node.func.id)
+    if func is None or not hasattr(func, "evaluate"):
+        raise UnfoldableNode("Builtin function cannot be evaluated")
+    return func.evaluate(node)  # type: ignore
 
 
 def replace_literal_ops(vyper_module: vy_ast.Module) -> int:
@@ -116,15 +291,8 @@ def replace_builtin_functions(vyper_module: vy_ast.Module) -> int:
     changed_nodes = 0
 
     for node in vyper_module.get_descendants(vy_ast.Call, reverse=True):
-        if not isinstance(node.func, vy_ast.Name):
-            continue
-
-        name = node.func.id
-        func = DISPATCH_TABLE.get(name)
-        if func is None or not hasattr(func, "evaluate"):
-            continue
         try:
-            new_node = func.evaluate(node)  # type: ignore
+            new_node = _evaluate(node)
         except UnfoldableNode:
             continue
 
@@ -165,11 +333,7 @@ def replace_user_defined_constants(vyper_module: vy_ast.Module) -> int:
     changed_nodes = 0
 
     for node in vyper_module.get_children(vy_ast.AnnAssign):
-        if not isinstance(node.target, vy_ast.Name):
-            # left-hand-side of assignment is not a variable
-            continue
-        if node.get("annotation.func.id") != "constant":
-            # annotation is not wrapped in `constant(...)`
+        if not _is_constant_definition(node):
             continue
 
         changed_nodes += replace_constant(
@@ -179,6 +343,35 @@ def replace_user_defined_constants(vyper_module: vy_ast.Module) -> int:
     return changed_nodes
 
 
+def _is_constant_definition(node: vy_ast.AnnAssign) -> bool:
+    if not isinstance(node.target, vy_ast.Name):
+        # left-hand-side of assignment is not a variable
+        return False
+    # annotation must be wrapped in `constant(...)`
+    return node.get("annotation.func.id") == "constant"
+
+
+def _is_replaceable_name(node: vy_ast.Name) -> bool:
+    # check if a reference to a name may be substituted with a literal value
+    # do not replace attributes or calls
+    if isinstance(node.get_ancestor(), (vy_ast.Attribute, vy_ast.Call)):
+        return False
+    # do not replace dictionary keys
+    parent = node.get_ancestor()
+    if isinstance(parent, vy_ast.Dict) and node in parent.keys:
+        return False
+
+    if not isinstance(node.get_ancestor(), vy_ast.Index):
+        # do not replace left-hand side of assignments
+        assignments = (vy_ast.Assign, vy_ast.AnnAssign, vy_ast.AugAssign)
+        parent = node.get_ancestor(assignments)
+        if isinstance(parent, assignments):
+            if node in parent.target.iter_descendants(include_self=True):
+                return False
+
+    return True
+
+
 def _replace(old_node, new_node):
     if isinstance(new_node, vy_ast.Constant):
         return new_node.from_node(old_node, value=new_node.value)
@@ -217,24 +410,9 @@ def replace_constant(
     changed_nodes = 0
 
     for node in vyper_module.get_descendants(vy_ast.Name, {"id": id_}, reverse=True):
-        # do not replace attributes or calls
-        if isinstance(node.get_ancestor(), (vy_ast.Attribute, vy_ast.Call)):
-            continue
-        # do not replace dictionary keys
-        if (
-            isinstance(node.get_ancestor(), vy_ast.Dict)
-            and node in node.get_ancestor().keys
-        ):
+        if not _is_replaceable_name(node):
             continue
 
-        if not isinstance(node.get_ancestor(), vy_ast.Index):
-            # do not replace left-hand side of assignments
-            parent = node.get_ancestor(
-                (vy_ast.Assign, vy_ast.AnnAssign, vy_ast.AugAssign)
-            )
-            if parent and node in parent.target.get_descendants(include_self=True):
-                continue
-
         try:
             new_node = _replace(node, replacement_node)
         except UnfoldableNode:
@@ -1,8 +1,9 @@
 import ast as python_ast
+import copy
 import decimal
 import operator
 import sys
-from typing import Any, Optional, Union
+from typing import Any, Iterator, Optional, Union
 
 from vyper.exceptions import (
     CompilerPanic,
@@ -11,13 +12,19 @@ from vyper.exceptions import (
     UnfoldableNode,
     ZeroDivisionException,
 )
-from vyper.settings import VYPER_ERROR_CONTEXT_LINES, VYPER_ERROR_LINE_NUMBERS
+from vyper.settings import (
+    VYPER_DEBUG_AST,
+    VYPER_ERROR_CONTEXT_LINES,
+    VYPER_ERROR_LINE_NUMBERS,
+)
 from vyper.utils import annotate_source_code
 
 NODE_BASE_ATTRIBUTES = (
     "_children",
     "_depth",
+    "_node_source_code",
     "_parent",
+    "_parent_slot",
     "ast_type",
     "node_id",
 )
@@ -27,7 +34,6 @@ NODE_SRC_ATTRIBUTES = (
     "end_lineno",
     "full_source_code",
     "lineno",
-    "node_source_code",
     "src",
 )
 
@@ -132,6 +138,13 @@ def _to_node(value, parent):
     return value
 
 
+def _set_parent_slot(value, parent, field_name, idx):
+    # record the location of a child node within it's parent, as the name of the
+    # field and the index within the field if the field is a list
+    if isinstance(value, VyperNode) and value._parent is parent:
+        value._parent_slot = (field_name, idx)
+
+
 def _to_dict(value):
     # if value is a Vyper node, convert to a dict
     if isinstance(value, VyperNode):
@@ -152,16 +165,87 @@ def _node_filter(node, filters):
     return True
 
 
-def _sort_nodes(node_iterable):
-    # sorting function for VyperNode.get_children
-
-    def sortkey(key):
-        return float("inf") if key is None else key
-
-    return sorted(
-        node_iterable,
-        key=lambda k: (sortkey(k.lineno), sortkey(k.col_offset), k.node_id),
-    )
+def _sort_key(node):
+    # nodes are ordered by starting source offset and node ID
+    lineno = float("inf") if node.lineno is None else node.lineno
+    col_offset = float("inf") if node.col_offset is None else node.col_offset
+    return lineno, col_offset, node.node_id
+
+
+def _insert_child(parent, node):
+    # add a node to the children of `parent`, maintaining source order
+    children = parent._children
+    key = _sort_key(node)
+    idx = len(children)
+    # children are almost always added in order, so search from the end
+    while idx and _sort_key(children[idx - 1]) > key:
+        idx -= 1
+    if idx and children[idx - 1] is node:
+        # the node was already added, as `Assign` may initialize more than once
+        return
+    children.insert(idx, node)
+
+
+def _child_position(parent, node):
+    # index of `node` within the children of `parent`
+    children = parent._children
+    key = _sort_key(node)
+    lo, hi = 0, len(children)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _sort_key(children[mid]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    for idx in range(lo, len(children)):
+        if children[idx] is node:
+            return idx
+        if _sort_key(children[idx]) != key:
+            break
+    # a replacement node may be out of order with it's siblings
+    return next(idx for idx, child in enumerate(children) if child is node)
+
+
+def _get_slots(cls):
+    # names of all slots of a node class, including private slots
+    return [x for i in cls.__mro__ for x in getattr(i, "__slots__", ())]
+
+
+def _copy_node(node):
+    # shallow copy of a node, the copy takes the place of the node as the
+    # parent of it's children
+    new_node = object.__new__(type(node))
+    for field_name in _get_slots(type(node)):
+        if hasattr(node, field_name):
+            value = getattr(node, field_name)
+            if isinstance(value, list):
+                value = list(value)
+            setattr(new_node, field_name, value)
+    for child in new_node._children:
+        child._parent = new_node
+    return new_node
+
+
+def _iter_pre_order(node):
+    # non-recursive depth-first traversal, yielding each node before it's children
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node._children))
+
+
+def _iter_post_order(node):
+    # the exact reverse of `_iter_pre_order`, yielding children (last to first)
+    # before their parent
+    stack = [(node, False)]
+    while stack:
+        node, is_expanded = stack.pop()
+        if is_expanded:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((i, False) for i in node._children)
 
 
 def _raise_syntax_exc(error_msg: str, ast_struct: dict) -> None:
@@ -217,8 +301,12 @@ class VyperNode:
             Dictionary of fields to be included within the node.
         """
         self._parent = parent
+        self._parent_slot: Optional[tuple] = None
         self._depth = getattr(parent, "_depth", -1) + 1
-        self._children: set = set()
+        self._children: list = []
+        # the source code of the node is sliced from `full_source_code` when it is
+        # first accessed, unless it is explicitly given
+        self._node_source_code = kwargs.get("node_source_code")
 
         for field_name in NODE_SRC_ATTRIBUTES:
             # when a source offset is not available, use the parent's source offset
@@ -237,8 +325,11 @@ class VyperNode:
             if field_name in self.get_fields():
                 if isinstance(value, list):
                     value = [_to_node(i, self) for i in value]
+                    for idx, node in enumerate(value):
+                        _set_parent_slot(node, self, field_name, idx)
                 else:
                     value = _to_node(value, self)
+                    _set_parent_slot(value, self, field_name, None)
                 setattr(self, field_name, value)
 
             elif value and field_name in self._only_empty_fields:
@@ -250,7 +341,7 @@ class VyperNode:
 
         # add to children of parent last to ensure an accurate hash is generated
         if parent is not None:
-            parent._children.add(self)
+            _insert_child(parent, self)
 
     @classmethod
     def from_node(cls, node: "VyperNode", **kwargs) -> "VyperNode":
@@ -277,6 +368,7 @@ class VyperNode:
         ast_struct = {
             i: getattr(node, i) for i in VyperNode.__slots__ if not i.startswith("_")
         }
+        ast_struct["node_source_code"] = node._node_source_code
         ast_struct.update(ast_type=cls.__name__, **kwargs)
         return cls(**ast_struct)
 
@@ -323,6 +415,16 @@ class VyperNode:
 
         return f"{class_repr}:\n{source_annotation}"
 
+    @property
+    def node_source_code(self) -> Optional[str]:
+        """
+        Property method providing the source code of a node.
+        """
+        if self._node_source_code is None and None not in (self.src, self.full_source_code):
+            start, length = (int(i) for i in self.src.split(":")[:2])
+            self._node_source_code = self.full_source_code[start:start + length]
+        return self._node_source_code
+
     @property
     def description(self):
         """
@@ -421,11 +523,9 @@ class VyperNode:
         list
             Child nodes matching the filter conditions.
         """
-        children = _sort_nodes(self._children)
+        children = self._children[::-1] if reverse else list(self._children)
         if node_type is not None:
             children = [i for i in children if isinstance(i, node_type)]
-        if reverse:
-            children.reverse()
         if filters is None:
             return children
         return [i for i in children if _node_filter(i, filters)]
@@ -442,10 +542,11 @@ class VyperNode:
 
         A descendant is any node which exists within the AST beneath the given node.
 
-        Results are sorted by the starting source offset and depth, ascending. You
-        can rely on that the sequence will always contain a parent node prior to any
-        of it's children. If the result is reversed, all children of a node will
-        be in the sequence prior to their parent.
+        Results are given in depth-first pre-order, with the children of each node
+        sorted by the starting source offset. You can rely on that the sequence
+        will always contain a parent node prior to any of it's children. If the
+        result is reversed, all children of a node will be in the sequence prior
+        to their parent.
 
         Parameters
         ----------
@@ -473,19 +574,34 @@ class VyperNode:
         list
             Descendant nodes matching the filter conditions.
         """
-        children = self.get_children(node_type, filters)
-        for node in self.get_children():
-            children.extend(node.get_descendants(node_type, filters))
-        if (
-            include_self
-            and (not node_type or isinstance(self, node_type))
-            and _node_filter(self, filters)
-        ):
-            children.append(self)
-        result = _sort_nodes(children)
+        return list(self.iter_descendants(node_type, filters, include_self, reverse))
+
+    def iter_descendants(
+        self,
+        node_type: Union["VyperNode", tuple, None] = None,
+        filters: Optional[dict] = None,
+        include_self: bool = False,
+        reverse: bool = False,
+    ) -> Iterator["VyperNode"]:
+        """
+        Iterate over the descendant nodes of this node which match the given filter(s).
+
+        This is the lazy equivalent of `get_descendants`, yielding nodes in the
+        same order. The tree is not traversed beyond the last node that is consumed,
+        so this method is preferred when searching for a single node. The tree must
+        not be modified while iterating.
+        """
         if reverse:
-            result.reverse()
-        return result
+            nodes = _iter_post_order(self)
+        else:
+            nodes = _iter_pre_order(self)
+        if not include_self:
+            nodes = (i for i in nodes if i is not self)
+        if node_type is not None:
+            nodes = (i for i in nodes if isinstance(i, node_type))
+        if filters is not None:
+            nodes = (i for i in nodes if _node_filter(i, filters))
+        return nodes
 
     def get(self, field_str: str) -> Any:
         """
@@ -534,12 +650,198 @@ class TopLevel(VyperNode):
 
 
 class Module(TopLevel):
-    __slots__ = ()
+    """
+    The top-level node of a Vyper AST.
+
+    Class attributes
+    ----------------
+    _node_index : Dict, optional
+        Every descendant of the module, as `{type: {id(node): node}}`. Generated
+        on the first type-filtered search and updated by `replace_in_tree`.
+    _name_index : Dict, optional
+        Every `Name` descendant of the module, as `{"id": {id(node): node}}`.
+    _private : Dict, optional
+        For a module created by `copy_on_write`, the nodes that have been copied
+        and are not shared with the original module, as `{id(node): node}`.
+        `None` if the module is not a copy.
+    _copies : Dict
+        For a module created by `copy_on_write`, the nodes that have been copied
+        and the copy that replaced them, as `{id(node): (node, copy)}`.
+    """
+
+    __slots__ = ("_node_index", "_name_index", "_private", "_copies")
+
+    def __init__(self, *args, **kwargs):
+        self._node_index: Optional[dict] = None
+        self._name_index: Optional[dict] = None
+        self._private: Optional[dict] = None
+        self._copies: dict = {}
+        super().__init__(*args, **kwargs)
+
+    def __deepcopy__(self, memo):
+        # the indexes are keyed by object identity and are not valid for a copy
+        result = type(self).__new__(type(self))
+        memo[id(self)] = result
+        for field_name in _get_slots(type(self)):
+            if hasattr(self, field_name):
+                value = copy.deepcopy(getattr(self, field_name), memo)
+                setattr(result, field_name, value)
+        result._node_index = None
+        result._name_index = None
+        return result
+
+    def copy_on_write(self) -> "Module":
+        """
+        Return a copy of this module that shares all of it's descendants with
+        the original.
+
+        Nodes are copied as they are modified. When `replace_in_tree` is called
+        on the copy, the parent of the replaced node and each of it's ancestors
+        are copied and the rest of the tree remains shared. The original module
+        continues to hold the unmodified tree, however the parent of a shared
+        node is the parent within the copy. Once a copy has been made, the
+        original tree should only be used to read the members and children of
+        nodes, e.g. to generate `ast_dict` output.
+
+        Returns
+        -------
+        Module
+            Copy of this module.
+        """
+        vyper_module = _copy_node(self)
+        vyper_module._node_index = None
+        vyper_module._name_index = None
+        vyper_module._private = {}
+        vyper_module._copies = {}
+        return vyper_module
+
+    def get_copy(self, node: VyperNode) -> VyperNode:
+        """
+        Return the node that takes the place of `node` within this module.
+
+        For a module created by `copy_on_write`, this is the copy of `node` if
+        one was made by `replace_in_tree`. Otherwise, `node` is returned.
+        """
+        value = self._copies.get(id(node))
+        if value is not None and value[0] is node:
+            return value[1]
+        return node
+
+    def _make_private(self, node: VyperNode) -> VyperNode:
+        # copy a shared node and each of it's shared ancestors, so that the node
+        # may be modified without affecting the original module
+        path = []
+        while node is not self and id(node) not in self._private:  # type: ignore
+            path.append(node)
+            node = node._parent  # type: ignore
+        for original in reversed(path):
+            # the parent of `original` has already been copied
+            parent = original._parent
+            node = _copy_node(original)
+            field_name, idx = original._parent_slot
+            if idx is None:
+                setattr(parent, field_name, node)
+            else:
+                getattr(parent, field_name)[idx] = node
+            parent._children[_child_position(parent, original)] = node
+            node._parent = parent
+
+            self._private[id(node)] = node  # type: ignore
+            self._copies[id(original)] = (original, node)
+            if self._node_index is not None:
+                self._remove_from_index(original)
+                self._add_to_index(node)
+        return node
+
+    def iter_descendants(
+        self,
+        node_type: Union["VyperNode", tuple, None] = None,
+        filters: Optional[dict] = None,
+        include_self: bool = False,
+        reverse: bool = False,
+    ) -> Iterator["VyperNode"]:
+        """
+        Iterate over the descendant nodes of this module which match the given filter(s).
+
+        When `node_type` is given, matching nodes are taken from an index rather
+        than by traversing the tree, and the cost of the search depends on the
+        number of matches. A filter on the `id` of `Name` nodes is also resolved
+        from an index. The results are identical to `VyperNode.iter_descendants`.
+        """
+        if node_type is None:
+            return super().iter_descendants(node_type, filters, include_self, reverse)
+
+        if self._node_index is None:
+            self._build_index()
+
+        name_id = (filters or {}).get("id")
+        if isinstance(name_id, str) and isinstance(node_type, type) and issubclass(Name, node_type):
+            # matching nodes must be `Name` nodes with the given `id`
+            nodes = [i for i in self._name_index.get(name_id, {}).values()]  # type: ignore
+        else:
+            nodes = [
+                node
+                for cls, members in self._node_index.items()  # type: ignore
+                if issubclass(cls, node_type)
+                for node in members.values()
+            ]
+        if filters is not None:
+            nodes = [i for i in nodes if _node_filter(i, filters)]
+
+        positions: dict = {id(self): ()}
+        nodes.sort(key=lambda k: self._tree_position(k, positions), reverse=reverse)
+
+        if include_self and isinstance(self, node_type) and _node_filter(self, filters):
+            if reverse:
+                nodes.append(self)
+            else:
+                nodes.insert(0, self)
+        return iter(nodes)
+
+    def _tree_position(self, node: VyperNode, positions: dict) -> tuple:
+        # the position of `node` within the pre-order traversal of the tree, as the
+        # index of each ancestor within the children of it's parent. `positions`
+        # holds the known positions of other nodes.
+        path = []
+        while id(node) not in positions:
+            path.append(node)
+            node = node._parent
+        position = positions[id(node)]
+        for node in reversed(path):
+            position += (_child_position(node._parent, node),)
+            positions[id(node)] = position
+        return position
+
+    def _build_index(self) -> None:
+        self._node_index = {}
+        self._name_index = {}
+        for node in _iter_pre_order(self):
+            if node is not self:
+                self._add_to_index(node)
+
+    def _add_to_index(self, node: VyperNode) -> None:
+        self._node_index.setdefault(type(node), {})[id(node)] = node  # type: ignore
+        if isinstance(node, Name):
+            self._name_index.setdefault(node.id, {})[id(node)] = node  # type: ignore
+
+    def _remove_from_index(self, node: VyperNode) -> None:
+        self._node_index[type(node)].pop(id(node), None)  # type: ignore
+        if isinstance(node, Name):
+            self._name_index[node.id].pop(id(node), None)  # type: ignore
 
     def replace_in_tree(self, old_node: VyperNode, new_node: VyperNode) -> None:
         """
         Perform an in-place substitution of a node within the tree.
 
+        The location of the node is taken from the parent slot recorded when it
+        was added to the tree, so the cost of a replacement does not depend on
+        the size of the tree. When `VYPER_DEBUG_AST` is set, the consistency of
+        the parent and it's members is also verified prior to replacement.
+
+        If this module was created by `copy_on_write`, the parent of the
+        replaced node and it's ancestors are copied before the replacement is
+        made, so that the original module is not modified.
+
         Parameters
         ----------
         old_node : VyperNode
@@ -552,6 +854,53 @@ class Module(TopLevel):
         -------
         None
         """
+        if VYPER_DEBUG_AST:
+            self._verify_replacement(old_node)
+
+        if not self._contains(old_node):
+            raise CompilerPanic("Node to be replaced does not exist within the tree")
+
+        parent = old_node._parent
+        if self._private is not None:
+            # a module created by `copy_on_write` only modifies it's own nodes
+            parent = self._make_private(parent)
+        field_name, idx = old_node._parent_slot
+        if idx is None:
+            setattr(parent, field_name, new_node)
+        else:
+            getattr(parent, field_name)[idx] = new_node
+
+        # the new node takes the position of the old node within the children
+        parent._children[_child_position(parent, old_node)] = new_node
+
+        new_node._parent = parent
+        new_node._parent_slot = old_node._parent_slot
+        new_node._depth = old_node._depth
+
+        if self._node_index is not None:
+            for node in _iter_pre_order(old_node):
+                self._remove_from_index(node)
+            for node in _iter_pre_order(new_node):
+                self._add_to_index(node)
+
+    def _contains(self, node: VyperNode) -> bool:
+        # check that each node from `node` up to this module is held in the
+        # recorded slot of it's parent
+        while node is not self:
+            parent = node._parent
+            if parent is None or node._parent_slot is None:
+                return False
+            field_name, idx = node._parent_slot
+            member = getattr(parent, field_name, None)
+            if idx is not None:
+                member = member[idx] if isinstance(member, list) and idx < len(member) else None
+            if member is not node:
+                return False
+            node = parent
+        return True
+
+    def _verify_replacement(self, old_node: VyperNode) -> None:
+        # exhaustive checks that `old_node` exists exactly once within the tree
         parent = old_node._parent
         if old_node not in self.get_descendants(type(old_node)):
             raise CompilerPanic("Node to be replaced does not exist within the tree")
@@ -561,34 +910,26 @@ class Module(TopLevel):
                 "Node to be replaced does not exist within parent children"
             )
 
-        is_replaced = False
+        is_found = False
         for key in parent.get_fields():
             obj = getattr(parent, key, None)
             if obj == old_node:
-                if is_replaced:
+                if is_found:
                     raise CompilerPanic(
                         "Node to be replaced exists as multiple members in parent"
                     )
-                setattr(parent, key, new_node)
-                is_replaced = True
+                is_found = True
             elif isinstance(obj, list) and obj.count(old_node):
-                if is_replaced or obj.count(old_node) > 1:
+                if is_found or obj.count(old_node) > 1:
                     raise CompilerPanic(
                         "Node to be replaced exists as multiple members in parent"
                     )
-                obj[obj.index(old_node)] = new_node
-                is_replaced = True
-        if not is_replaced:
+                is_found = True
+        if not is_found:
             raise CompilerPanic(
                 "Node to be replaced does not exist within parent members"
             )
 
-        parent._children.remove(old_node)
-
-        new_node._parent = parent
-        new_node._depth = old_node._depth
-        parent._children.add(new_node)
-
 
 class FunctionDef(TopLevel):
     __slots__ = ("args", "returns", "decorator_list", "pos")
@@ -1,5 +1,5 @@
 import ast as python_ast
-from typing import Any, Optional, Sequence, Type, Union
+from typing import Any, Iterator, Optional, Sequence, Type, TypeVar, Union
 
 from .natspec import parse_natspec as parse_natspec
 from .utils import ast_to_dict as ast_to_dict
@@ -9,12 +9,18 @@ NODE_BASE_ATTRIBUTES: Any
 NODE_SRC_ATTRIBUTES: Any
 DICT_AST_SKIPLIST: Any
 
+_NodeT = TypeVar("_NodeT", bound=VyperNode)
+
 def get_node(
     ast_struct: Union[dict, python_ast.AST], parent: Optional[VyperNode] = ...
 ) -> VyperNode: ...
 
 class VyperNode:
     full_source_code: str = ...
+    node_id: int = ...
+    lineno: Optional[int] = ...
+    col_offset: Optional[int] = ...
+    _children: list = ...
     def __init__(self, parent: Optional[VyperNode] = ..., **kwargs: dict) -> None: ...
     def __hash__(self) -> Any: ...
     def __eq__(self, other: Any) -> Any: ...
@@ -39,6 +45,13 @@ class VyperNode:
         include_self: bool = ...,
         reverse: bool = ...,
     ) -> Sequence: ...
+    def iter_descendants(
+        self,
+        node_type: Union[Type[VyperNode], Sequence[Type[VyperNode]], None] = ...,
+        filters: Optional[dict] = ...,
+        include_self: bool = ...,
+        reverse: bool = ...,
+    ) -> Iterator[VyperNode]: ...
     def get_ancestor(
         self, node_type: Union[Type[VyperNode], Sequence[Type[VyperNode]], None] = ...
     ) -> VyperNode: ...
@@ -55,6 +68,8 @@ class TopLevel(VyperNode):
 
 class Module(TopLevel):
     def replace_in_tree(self, old_node: VyperNode, new_node: VyperNode) -> None: ...
+    def copy_on_write(self) -> Module: ...
+    def get_copy(self, node: _NodeT) -> _NodeT: ...
 
 class FunctionDef(TopLevel):
     name: str = ...
@@ -100,7 +115,10 @@ class List(VyperNode):
 class Tuple(VyperNode):
     elts: list = ...
 
-class Dict(VyperNode): ...
+class Dict(VyperNode):
+    keys: list = ...
+    values: list = ...
+
 class NameConstant(Constant): ...
 
 class Name(VyperNode):
@@ -152,14 +170,19 @@ class Subscript(VyperNode):
 class Index(VyperNode):
     value: Constant = ...
 
-class Assign(VyperNode): ...
+class Assign(VyperNode):
+    target: VyperNode = ...
+    value: VyperNode = ...
 
 class AnnAssign(VyperNode):
     target: VyperNode = ...
     value: VyperNode = ...
     annotation: VyperNode = ...
 
-class AugAssign(VyperNode): ...
+class AugAssign(VyperNode):
+    target: VyperNode = ...
+    value: VyperNode = ...
+
 class Raise(VyperNode): ...
 class Assert(VyperNode): ...
 class Pass(VyperNode): ...
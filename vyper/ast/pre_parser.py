@@ -1,5 +1,6 @@
 import io
 import re
+from bisect import bisect_right
 from tokenize import (
     COMMENT,
     NAME,
@@ -11,7 +12,7 @@ from tokenize import (
     tokenize,
     untokenize,
 )
-from typing import Sequence, Tuple
+from typing import List, Optional, Sequence, Tuple, Union
 
 from vyper.exceptions import SyntaxException, VersionException
 from vyper.typing import ClassTypes, ParserPosition
@@ -58,7 +59,82 @@ VYPER_CLASS_TYPES = {
 }
 
 
-def pre_parse(code: str) -> Tuple[ClassTypes, str]:
+class PositionMap:
+    """
+    Map of positions within a reformatted source string back to positions within
+    the original source.
+
+    The reformatted source is made up of segments of consecutive lines. Lines
+    within a copied segment are offset from their original line by a constant
+    amount, lines within an injected segment have no original counterpart and
+    all map to a single anchor position. Only the first line of each segment is
+    stored, so the size of the map grows with the number of functions rather
+    than the number of injected lines.
+
+    Attributes
+    ----------
+    source_code : str
+        The original source code.
+    """
+
+    def __init__(self, source_code: str) -> None:
+        self.source_code = source_code
+        self._starts: List[int] = []
+        self._targets: List[Union[int, ParserPosition]] = []
+
+    def add_copied(self, lineno: int, shift: int) -> None:
+        # lines from `lineno` onward are original lines, offset by `shift`
+        self._starts.append(lineno)
+        self._targets.append(shift)
+
+    def add_injected(self, lineno: int, anchor: ParserPosition) -> None:
+        # lines from `lineno` onward were injected, and map to `anchor`
+        self._starts.append(lineno)
+        self._targets.append(anchor)
+
+    def get_position(self, lineno: int, col_offset: int) -> ParserPosition:
+        """
+        Return the `(lineno, col_offset)` position within the original source
+        for a position within the reformatted source.
+        """
+        target = self._targets[bisect_right(self._starts, lineno) - 1]
+        if isinstance(target, tuple):
+            return target
+        return lineno - target, col_offset
+
+
+def _insert_guards(
+    code: str, reformatted_code: str, unlocked_functions: List[str], header_ends: List
+) -> Tuple[str, PositionMap]:
+    # Add a `ul22_` storage flag for each unlocked function at the start of the
+    # source, and assert every flag at the start of each function. A function
+    # may be unlocked more than once, its flag is declared once. The output is
+    # assembled as a list of lines and joined once.
+    lines = reformatted_code.split("\n")
+    position_map = PositionMap(code)
+
+    names = list(dict.fromkeys(unlocked_functions))
+    output = [f"ul22_{name}: bool" for name in reversed(names)]
+    guards = [f"    assert self.ul22_{name}" for name in names]
+    if output:
+        position_map.add_injected(1, (1, 0))
+    position_map.add_copied(len(output) + 1, len(output))
+
+    idx = 0
+    for lineno, col_offset in header_ends:
+        output.extend(lines[idx:lineno])
+        idx = lineno
+        if guards:
+            # guards map to the end of the function header
+            position_map.add_injected(len(output) + 1, (lineno, col_offset))
+            output.extend(guards)
+            position_map.add_copied(len(output) + 1, len(output) - lineno)
+    output.extend(lines[idx:])
+
+    return "\n".join(output), position_map
+
+
+def pre_parse(code: str) -> Tuple[ClassTypes, List[str], str, PositionMap]:
     """
     Re-formats a vyper source string into a python source string and performs
     some validation.  More specifically,
@@ -67,9 +143,13 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
     * Validates "@version" pragma against current compiler version
     * Prevents direct use of python "class" keyword
     * Prevents use of python semi-colon statement separator
+    * Translates "unlock" statements into assignments of the `ul22_` storage
+      flags of each unlocked function, declares the flags and asserts them at
+      the start of each function other than `__init__`
 
     Also returns a mapping of detected contract and struct names to their
-    respective vyper class types ("contract" or "struct").
+    respective vyper class types ("contract" or "struct"), and a map of
+    positions within the reformatted source back to the original source.
 
     Parameters
     ----------
@@ -80,8 +160,12 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
     -------
     dict
         Mapping of class types for the given source.
+    list
+        Names of the unlocked functions, in the order they were unlocked.
     str
         Reformatted python source string.
+    PositionMap
+        Map of positions within the reformatted source to the original source.
     """
     result = []
     unlocked_functions = []
@@ -92,6 +176,9 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
     function_flag = False
     startcol = False
     class_types: ClassTypes = {}
+    header_ends: List[ParserPosition] = []
+    header_end: Optional[ParserPosition] = None
+    function_name: Optional[str] = None
 
     try:
         code_bytes = code.encode("utf-8")
@@ -105,6 +192,22 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
             end = token.end
             line = token.line
 
+            # Make note of where each function header ends, the function
+            # guards are inserted on the following line. `__init__` is not
+            # guarded, as no function can be unlocked before it runs.
+            if typ == NAME and string == "def" and start[1] == 0:
+                header_end = end
+                function_name = None
+            elif header_end is not None:
+                if function_name is None:
+                    function_name = string
+                if typ == NEWLINE:
+                    if function_name != "__init__":
+                        header_ends.append(header_end)
+                    header_end = None
+                elif typ not in (COMMENT, NL):
+                    header_end = end
+
             if typ == COMMENT and "@version" in string:
                 validate_version_pragma(string[1:], start)
 
@@ -163,25 +266,26 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
                 unlock_name = [TokenInfo(NAME, new_name, (sl,sc), (sl,sc+len_name), new_line)]
                 sc = sc + len_name
                 result.extend(unlock_name)
+                # Each flag is set in its own statement, on the line of the unlock
+                equal = [TokenInfo(OP, "=", (sl,sc), (sl,sc+1), new_line)]
+                sc = sc + 1
+                result.extend(equal)
+                true = [TokenInfo(NAME, "True", (sl,sc), (sl,sc+4), new_line)]
+                sc = sc + 4
+                result.extend(true)
                 cont = cont + 1
 
                 continue
             if (typ, string, unlock_flag, function_flag) == (OP, ",", True, True):
-                comma = [TokenInfo(OP, "=", (sl,sc), (sl,sc+1), new_line)]
+                semicolon = [TokenInfo(OP, ";", (sl,sc), (sl,sc+1), new_line)]
                 sc = sc + 1
-                result.extend(comma)
+                result.extend(semicolon)
 
                 continue
             if (typ, string, unlock_flag, function_flag) == (OP, "]", True, True):
                 continue
             if (typ, string, unlock_flag, function_flag) == (NEWLINE, "\n", True, True):
                 if (cont!=0):
-                    equal = [TokenInfo(OP, "=", (sl,sc), (sl,sc+1), new_line)]
-                    sc = sc + 1
-                    result.extend(equal)
-                    true = [TokenInfo(NAME, "True", (sl,sc), (sl,sc+4), new_line)]
-                    sc = sc + 4
-                    result.extend(true)
                     space = [TokenInfo(NEWLINE, "\n", (sl,sc), (sl,sc+1), new_line)]
                     sc = sc + 1
                     result.extend(space)
@@ -196,4 +300,7 @@ def pre_parse(code: str) -> Tuple[ClassTypes, str]:
     except TokenError as e:
         raise SyntaxException(e.args[0], code, e.args[1][0], e.args[1][1]) from e
 
-    return class_types, unlocked_functions, untokenize(result).decode("utf-8")
+    reformatted_code = untokenize(result).decode("utf-8")
+    return (class_types, unlocked_functions) + _insert_guards(
+        code, reformatted_code, unlocked_functions, header_ends
+    )
@@ -25,28 +25,15 @@ def parse_to_ast(source_code: str, source_id: int = 0) -> Tuple[vy_ast.Module, L
     """
     if "\x00" in source_code:
         raise ParserException("No null bytes (\\x00) allowed in the source code.")
-    class_types, unlocked_functions, reformatted_code = pre_parse(source_code)
-
-    new_code = ""
-    for function in unlocked_functions:
-        new_declaration = "ul22_"+function+": bool\n"
-        new_code = new_declaration + new_code
-
-    for line in reformatted_code.splitlines():
-        new_code = new_code + line + "\n"
-        if (line[:4] == "def "):
-            for function in unlocked_functions:
-                new_assert = "    assert self.ul22_"+function+"\n"
-                new_code = new_code + new_assert
-
-    source_code = new_code
-    reformatted_code = new_code
+    class_types, unlocked_functions, reformatted_code, position_map = pre_parse(source_code)
     try:
         py_ast = python_ast.parse(reformatted_code)
     except SyntaxError as e:
-        # TODO: Ensure 1-to-1 match of source_code:reformatted_code SyntaxErrors
-        raise SyntaxException(str(e), source_code, e.lineno, e.offset) from e
-    annotate_python_ast(py_ast, source_code, class_types, source_id)
+        lineno, col_offset = e.lineno, e.offset
+        if lineno is not None:
+            lineno, col_offset = position_map.get_position(lineno, col_offset or 0)
+        raise SyntaxException(e.msg, source_code, lineno, col_offset) from e
+    annotate_python_ast(py_ast, reformatted_code, class_types, source_id, position_map)
 
     # Convert to Vyper AST.
     #return vy_ast.get_node(py_ast)  # type: ignore
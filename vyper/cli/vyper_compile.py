@@ -5,14 +5,20 @@ import sys
 import warnings
 from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, Sequence, Set, TypeVar
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, TypeVar
 
 import vyper
 from vyper.opcodes import DEFAULT_EVM_VERSION, EVM_VERSIONS
 from vyper.parser import parser_utils
+from vyper.parser.dispatcher import DEFAULT_DISPATCH, DISPATCH_MODES
 from vyper.settings import VYPER_TRACEBACK_LIMIT
 from vyper.signatures.interface import extract_file_interface_imports
-from vyper.typing import ContractCodes, ContractPath, OutputFormats
+from vyper.typing import (
+    ContractCodes,
+    ContractPath,
+    DispatchProfile,
+    OutputFormats,
+)
 
 T = TypeVar('T')
 
@@ -23,6 +29,8 @@ abi                - ABI in JSON format
 abi_python         - ABI in python format
 source_map         - Vyper source map
 method_identifiers - Dictionary of method signature to method identifier
+dispatch_gas       - Worst-case gas used to dispatch a call to each public function
+dispatch_gas_expected - Mean gas used to dispatch a call, weighted by the call profile
 userdoc            - Natspec user documentation
 devdoc             - Natspec developer documentation
 combined_json      - All of the above format options combined as single JSON output
@@ -32,6 +40,8 @@ external_interface - External interface of a contract, used for outside contract
 opcodes            - List of opcodes as a string
 opcodes_runtime    - List of runtime opcodes as a string
 ir                 - Intermediate representation in LLL
+asm                - Assembly instructions
+asm_diff           - Changes made to the assembly by peephole optimization
 """
 
 combined_json_outputs = [
@@ -83,6 +93,19 @@ def _parse_args(argv):
         choices=list(EVM_VERSIONS),
         default=DEFAULT_EVM_VERSION, dest='evm_version',
     )
+    parser.add_argument(
+        '--dispatch',
+        help=f'Select how calls are dispatched to public functions (default {DEFAULT_DISPATCH})',
+        choices=list(DISPATCH_MODES),
+        default=DEFAULT_DISPATCH, dest='dispatch',
+    )
+    parser.add_argument(
+        '--dispatch-profile',
+        help='JSON file with the relative number of calls to each public function, '
+             'as {"method id, signature or name": weight}. The most called functions '
+             'are dispatched first.',
+        default=None, dest='dispatch_profile'
+    )
     parser.add_argument(
         '--traceback-limit',
         help='Set the traceback limit for error messages reported by the compiler',
@@ -93,6 +116,17 @@ def _parse_args(argv):
         help='Set the root path for contract imports',
         default='.', dest='root_folder'
     )
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory of an on-disk compilation cache. Outputs are reused '
+             'for unchanged contracts.',
+        default=None, dest='cache_dir'
+    )
+    parser.add_argument(
+        '-j',
+        help='Number of processes used to compile contracts in parallel (default 1)',
+        type=int, default=1, dest='workers'
+    )
 
     args = parser.parse_args(argv)
 
@@ -108,12 +142,25 @@ def _parse_args(argv):
 
     output_formats = tuple(uniq(args.format.split(',')))
 
+    dispatch_profile = None
+    if args.dispatch_profile is not None:
+        with Path(args.dispatch_profile).open() as fh:
+            dispatch_profile = json.load(fh)
+        if not isinstance(dispatch_profile, dict):
+            raise ValueError(
+                f"Invalid dispatch profile '{args.dispatch_profile}', must be a JSON object"
+            )
+
     compiled = compile_files(
         args.input_files,
         output_formats,
         args.root_folder,
         args.show_gas_estimates,
         args.evm_version,
+        args.cache_dir,
+        args.workers,
+        args.dispatch,
+        dispatch_profile,
     )
 
     if output_formats == ('combined_json',):
@@ -200,7 +247,11 @@ def compile_files(input_files: Iterable[str],
                   output_formats: OutputFormats,
                   root_folder: str = '.',
                   show_gas_estimates: bool = False,
-                  evm_version: str = DEFAULT_EVM_VERSION) -> OrderedDict:
+                  evm_version: str = DEFAULT_EVM_VERSION,
+                  cache_dir: Optional[str] = None,
+                  workers: int = 1,
+                  dispatch: str = DEFAULT_DISPATCH,
+                  dispatch_profile: Optional[DispatchProfile] = None) -> OrderedDict:
 
     if show_gas_estimates:
         parser_utils.LLLnode.repr_show_gas = True
@@ -239,6 +290,10 @@ def compile_files(input_files: Iterable[str],
         exc_handler=exc_handler,
         interface_codes=get_interface_codes(root_path, contract_sources),
         evm_version=evm_version,
+        cache_dir=cache_dir,
+        workers=workers,
+        dispatch=dispatch,
+        dispatch_profile=dispatch_profile,
     )
     if show_version:
         compiler_data['version'] = vyper.__version__
@@ -5,14 +5,16 @@ import json
 import sys
 import warnings
 from pathlib import Path
-from typing import Callable, Dict, Tuple, Union
+from typing import Callable, Dict, List, Tuple, Union
 
 import vyper
 from vyper.cli.vyper_compile import get_interface_file_path
+from vyper.compiler.utils import run_jobs
 from vyper.exceptions import JSONError
 from vyper.opcodes import DEFAULT_EVM_VERSION, EVM_VERSIONS
+from vyper.parser.dispatcher import DEFAULT_DISPATCH, DISPATCH_MODES
 from vyper.signatures.interface import extract_file_interface_imports
-from vyper.typing import ContractCodes, ContractPath
+from vyper.typing import ContractCodes, ContractPath, DispatchProfile
 from vyper.utils import keccak256
 
 TRANSLATE_MAP = {
@@ -25,6 +27,8 @@ TRANSLATE_MAP = {
     'evm.deployedBytecode.object': 'bytecode_runtime',
     'evm.deployedBytecode.opcodes': 'opcodes_runtime',
     'evm.deployedBytecode.sourceMap': 'source_map',
+    'evm.gasEstimates.dispatch': 'dispatch_gas',
+    'evm.gasEstimates.dispatchExpected': 'dispatch_gas_expected',
     'interface': 'interface',
     'ir': 'ir',
     'userdoc': 'userdoc',
@@ -71,6 +75,17 @@ def _parse_args(argv):
         help='Show python traceback on error instead of returning JSON',
         action='store_true'
     )
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory of an on-disk compilation cache. Outputs are reused '
+             'for unchanged contracts.',
+        default=None, dest='cache_dir'
+    )
+    parser.add_argument(
+        '-j',
+        help='Number of processes used to compile contracts in parallel (default 1)',
+        type=int, default=1, dest='workers'
+    )
 
     args = parser.parse_args(argv)
     if args.input_file:
@@ -83,7 +98,9 @@ def _parse_args(argv):
 
     exc_handler = exc_handler_raises if args.traceback else exc_handler_to_dict
     output_json = json.dumps(
-        compile_json(input_json, exc_handler, args.root_folder, json_path),
+        compile_json(
+            input_json, exc_handler, args.root_folder, json_path, args.cache_dir, args.workers
+        ),
         indent=2 if args.pretty_json else None,
         sort_keys=True,
         default=str
@@ -159,6 +176,23 @@ def get_input_dict_settings(input_dict: Dict) -> Dict:
     return {'evm_version': evm_version}
 
 
+def get_input_dict_dispatch(input_dict: Dict) -> Tuple[str, Union[DispatchProfile, None]]:
+    settings = input_dict.get('settings', {})
+    dispatch = settings.get('dispatch', DEFAULT_DISPATCH)
+    if dispatch not in DISPATCH_MODES:
+        raise JSONError(f"Unknown dispatch - '{dispatch}'")
+
+    profile = settings.get('dispatchProfile')
+    if profile is not None:
+        if not isinstance(profile, dict):
+            raise JSONError("'dispatchProfile' must be an object")
+        for key, weight in profile.items():
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+                raise JSONError(f"Invalid weight in 'dispatchProfile' for '{key}': {weight}")
+
+    return dispatch, profile
+
+
 def get_input_dict_contracts(input_dict: Dict) -> ContractCodes:
     contract_sources: ContractCodes = {}
     for path, value in input_dict['sources'].items():
@@ -211,7 +245,8 @@ def get_input_dict_output_formats(input_dict: Dict, contract_sources: ContractCo
         else:
             outputs = set(outputs)
 
-        for key in [i for i in ('evm', 'evm.bytecode', 'evm.deployedBytecode') if i in outputs]:
+        groups = ('evm', 'evm.bytecode', 'evm.deployedBytecode', 'evm.gasEstimates')
+        for key in [i for i in groups if i in outputs]:
             outputs.remove(key)
             outputs.update([i for i in TRANSLATE_MAP if i.startswith(key)])
         if '*' in outputs:
@@ -295,9 +330,35 @@ def get_interface_codes(root_path: Union[Path, None],
     return interfaces
 
 
+def _compile_contract(contract_path: str,
+                      source_code: str,
+                      output_formats: List,
+                      interface_codes: Dict,
+                      source_id: int,
+                      evm_version: str,
+                      cache_dir: Union[str, None],
+                      dispatch: str = DEFAULT_DISPATCH,
+                      dispatch_profile: Union[DispatchProfile, None] = None) -> Tuple[Dict, List]:
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter('always')
+        data = vyper.compile_codes(
+            {contract_path: source_code},
+            output_formats,
+            interface_codes=interface_codes,
+            initial_id=source_id,
+            evm_version=evm_version,
+            cache_dir=cache_dir,
+            dispatch=dispatch,
+            dispatch_profile=dispatch_profile,
+        )
+    return data, caught_warnings
+
+
 def compile_from_input_dict(input_dict: Dict,
                             exc_handler: Callable = exc_handler_raises,
-                            root_folder: Union[str, None] = None) -> Tuple[Dict, Dict]:
+                            root_folder: Union[str, None] = None,
+                            cache_dir: Union[str, None] = None,
+                            workers: int = 1) -> Tuple[Dict, Dict]:
     root_path = None
     if root_folder is not None:
         root_path = Path(root_folder).resolve()
@@ -308,37 +369,54 @@ def compile_from_input_dict(input_dict: Dict,
         raise JSONError(f"Invalid language '{input_dict['language']}' - Only Vyper is supported.")
 
     settings = get_input_dict_settings(input_dict)
+    dispatch, dispatch_profile = get_input_dict_dispatch(input_dict)
 
     contract_sources: ContractCodes = get_input_dict_contracts(input_dict)
     interface_sources = get_input_dict_interfaces(input_dict)
     output_formats = get_input_dict_output_formats(input_dict, contract_sources)
 
+    jobs = []
+    parser_error = None
+    for id_, contract_path in enumerate(sorted(contract_sources)):
+        try:
+            interface_codes = get_interface_codes(
+                root_path,
+                contract_path,
+                contract_sources,
+                interface_sources
+            )
+        except Exception as exc:
+            # contracts preceding this one are still compiled, a compiler error
+            # in any of them takes precedence
+            parser_error = (contract_path, exc)
+            break
+        jobs.append((
+            contract_path,
+            contract_sources[contract_path],
+            output_formats[contract_path],
+            interface_codes,
+            id_,
+            settings['evm_version'],
+            cache_dir,
+            dispatch,
+            dispatch_profile,
+        ))
+
     compiler_data, warning_data = {}, {}
     warnings.simplefilter('always')
-    for id_, contract_path in enumerate(sorted(contract_sources)):
-        with warnings.catch_warnings(record=True) as caught_warnings:
-            try:
-                interface_codes = get_interface_codes(
-                    root_path,
-                    contract_path,
-                    contract_sources,
-                    interface_sources
-                )
-            except Exception as exc:
-                return exc_handler(contract_path, exc, "parser"), {}
-            try:
-                data = vyper.compile_codes(
-                    {contract_path: contract_sources[contract_path]},
-                    output_formats[contract_path],
-                    interface_codes=interface_codes,
-                    initial_id=id_,
-                    evm_version=settings['evm_version']
-                )
-            except Exception as exc:
-                return exc_handler(contract_path, exc, "compiler"), {}
-            compiler_data[contract_path] = data[contract_path]
-            if caught_warnings:
-                warning_data[contract_path] = caught_warnings
+    results = run_jobs(_compile_contract, jobs, workers)
+    for job in jobs:
+        contract_path = job[0]
+        try:
+            data, caught_warnings = next(results)
+        except Exception as exc:
+            return exc_handler(contract_path, exc, "compiler"), {}
+        compiler_data[contract_path] = data[contract_path]
+        if caught_warnings:
+            warning_data[contract_path] = caught_warnings
+
+    if parser_error is not None:
+        return exc_handler(*parser_error, "parser"), {}
 
     return compiler_data, warning_data
 
@@ -374,6 +452,13 @@ def format_to_output_dict(compiler_data: Dict) -> Dict:
             if 'opcodes' in data:
                 evm['opcodes'] = data['opcodes']
 
+        if 'dispatch_gas' in data or 'dispatch_gas_expected' in data:
+            evm = output_contracts.setdefault('evm', {}).setdefault('gasEstimates', {})
+            if 'dispatch_gas' in data:
+                evm['dispatch'] = data['dispatch_gas']
+            if 'dispatch_gas_expected' in data:
+                evm['dispatchExpected'] = data['dispatch_gas_expected']
+
         if next((i for i in evm_keys if i+'_runtime' in data), False) or 'source_map' in data:
             evm = output_contracts.setdefault('evm', {}).setdefault('deployedBytecode', {})
             if 'bytecode_runtime' in data:
@@ -389,7 +474,9 @@ def format_to_output_dict(compiler_data: Dict) -> Dict:
 def compile_json(input_json: Union[Dict, str],
                  exc_handler: Callable = exc_handler_raises,
                  root_path: Union[str, None] = None,
-                 json_path: Union[str, None] = None) -> Dict:
+                 json_path: Union[str, None] = None,
+                 cache_dir: Union[str, None] = None,
+                 workers: int = 1) -> Dict:
     try:
         if isinstance(input_json, str):
             try:
@@ -401,7 +488,9 @@ def compile_json(input_json: Union[Dict, str],
             input_dict = input_json
 
         try:
-            compiler_data, warn_data = compile_from_input_dict(input_dict, exc_handler, root_path)
+            compiler_data, warn_data = compile_from_input_dict(
+                input_dict, exc_handler, root_path, cache_dir, workers
+            )
             if 'errors' in compiler_data:
                 return compiler_data
         except KeyError as exc:
@@ -57,7 +57,8 @@ def compile_to_lll(input_file, output_formats, show_gas_estimates=False):
         compiler_data['ir'] = lll
 
     if 'opt_ir' in output_formats:
-        compiler_data['opt_ir'] = optimizer.optimize(lll)
+        # the optimizer rewrites nodes in place, so it is given a separate copy
+        compiler_data['opt_ir'] = optimizer.optimize(LLLnode.from_list(s_expressions[0]))
 
     asm = compile_lll.compile_to_assembly(lll)
     if 'asm' in output_formats:
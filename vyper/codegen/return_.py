@@ -59,6 +59,16 @@ def make_return_stmt(stmt, context, begin_pos, _size, loop_memory_position=None)
         return ['seq_unchecked'] + nonreentrant_post + [['return', begin_pos, _size]]
 
 
+# Generate return code for a private function that returns a base type on the stack
+def make_stack_return_stmt(context, lll_val):
+    from vyper.parser.function_definitions.utils import (
+        get_nonreentrant_lock
+    )
+    _, nonreentrant_post = get_nonreentrant_lock(context.sig, context.global_ctx)
+    return ['seq_unchecked', lll_val] + nonreentrant_post + \
+        [['jump', ['mload', context.callback_ptr]]]
+
+
 # Generate code for returning a tuple or struct.
 def gen_tuple_return(stmt, context, sub):
     # Is from a call expression.
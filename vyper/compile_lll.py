@@ -1,14 +1,24 @@
 import functools
+import itertools
+import sys
+from array import array
 
 from vyper.exceptions import CompilerPanic
 from vyper.parser.parser import LLLnode
 from vyper.utils import MemoryPositions
 
+from . import opcodes as evm_opcodes
 from .opcodes import get_opcodes
 
 PUSH_OFFSET = 0x5f
 DUP_OFFSET = 0x7f
 SWAP_OFFSET = 0x8f
+# An entry of a jump table is JUMPDEST PUSH<n> <label> JUMP, where every entry of a
+# table pushes its label with the same number of bytes, at least two
+JUMPTABLE_ENTRY_OVERHEAD = 3
+JUMPTABLE_MIN_WIDTH = 2
+# Marks the push of a label within a jump table in assembly
+JUMPTABLE_PUSH = 'JUMPTABLE_PUSH'
 
 next_symbol = [0]
 
@@ -65,21 +75,106 @@ class instruction(str):
             self.lineno, self.col_offset, self.end_lineno, self.end_col_offset = [None] * 4
 
 
-def apply_line_numbers(func):
-    @functools.wraps(func)
-    def apply_line_no_wrapper(*args, **kwargs):
-        code = args[0]
-        ret = func(*args, **kwargs)
-        new_ret = [
-            instruction(i, code.pos) if isinstance(i, str) and not isinstance(i, instruction) else i
-            for i in ret
-        ]
-        return new_ret
-    return apply_line_no_wrapper
+class Assembly:
+    """
+    Compact representation of assembly.
+
+    In the list form of assembly, every opcode is an `instruction` string that
+    carries its own source position attributes. Here the items are stored as
+    plain interned strings, alongside a parallel array of position ids. Each
+    distinct source position is stored once, in a table that is shared with
+    any sub-assemblies.
+
+    Iterating or indexing an `Assembly` gives the items in list form.
+
+    Attributes
+    ----------
+    items : list
+        Opcode names and symbols, integer immediates and nested `Assembly`
+        objects.
+    pos_ids : array
+        Index within `positions` of the source position of each item. Items with
+        an id of zero are not `instruction` objects in list form.
+    positions : list
+        Source positions, as `(lineno, col_offset, end_lineno, end_col_offset)`.
+    pc_debuggers : set
+        Indexes of `DEBUG` items that create a PC breakpoint.
+    """
+    __slots__ = ('items', 'pos_ids', 'positions', 'pc_debuggers')
+
+    def __init__(self, positions):
+        self.items = []
+        self.pos_ids = array('I')
+        self.positions = positions
+        self.pc_debuggers = set()
+
+    @classmethod
+    def from_list(cls, assembly):
+        """
+        Convert assembly from list form.
+        """
+        return cls._from_list(assembly, [None], {})
+
+    @classmethod
+    def _from_list(cls, assembly, positions, position_ids):
+        o = cls(positions)
+        for item in assembly:
+            pos_id = 0
+            if isinstance(item, list):
+                item = cls._from_list(item, positions, position_ids)
+            elif isinstance(item, instruction):
+                pos = (item.lineno, item.col_offset, item.end_lineno, item.end_col_offset)
+                if pos not in position_ids:
+                    position_ids[pos] = len(positions)
+                    positions.append(pos)
+                pos_id = position_ids[pos]
+                if item.pc_debugger:
+                    o.pc_debuggers.add(len(o.items))
+                item = sys.intern(str(item))
+            elif isinstance(item, str):
+                item = sys.intern(item)
+            o.items.append(item)
+            o.pos_ids.append(pos_id)
+        return o
+
+    def to_list(self):
+        """
+        Convert assembly to list form.
+        """
+        return [item.to_list() if isinstance(item, Assembly) else item for item in self]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, idx):
+        item = self.items[idx]
+        pos_id = self.pos_ids[idx]
+        if pos_id:
+            item = instruction(item, self.positions[pos_id])
+            item.pc_debugger = idx in self.pc_debuggers
+        return item
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.items)))
+
+
+def _append(o, pos, items):
+    # Append assembly items to `o`, attaching the source position of the LLL node
+    # that generated them
+    o.extend(
+        instruction(i, pos) if isinstance(i, str) and not isinstance(i, instruction) else i
+        for i in items
+    )
 
 
 # Compiles LLL to assembly
-@apply_line_numbers
+#
+# Each LLL node is compiled by a handler that writes into a shared output list. Handlers
+# for nodes with arguments are generators: rather than recursing, a generator yields the
+# arguments for each child node that must be compiled in place, and the loop below runs
+# the child to completion before resuming its parent. This keeps assembly generation
+# linear in the number of emitted instructions, and deeply nested LLL does not reach the
+# recursion limit.
 def compile_to_assembly(code, withargs=None, existing_labels=None, break_dest=None, height=0):
     if withargs is None:
         withargs = {}
@@ -91,13 +186,33 @@ def compile_to_assembly(code, withargs=None, existing_labels=None, break_dest=No
     if not isinstance(existing_labels, set):
         raise CompilerPanic(f"Incorrect type for existing_labels: {type(existing_labels)}")
 
-    # Opcodes
-    if isinstance(code.value, str) and code.value.upper() in get_opcodes():
-        o = []
-        for i, c in enumerate(code.args[::-1]):
-            o.extend(compile_to_assembly(c, withargs, existing_labels, break_dest, height + i))
-        o.append(code.value.upper())
-        return o
+    handlers = _get_handlers(evm_opcodes.active_evm_version)
+    o = []
+    stack = []
+    args = (code, withargs, existing_labels, break_dest, height, o)
+    while True:
+        pending = _compile_node(handlers, *args)
+        if pending is not None:
+            stack.append(pending)
+        while stack:
+            try:
+                args = next(stack[-1])
+                break
+            except StopIteration:
+                stack.pop()
+        else:
+            return o
+
+
+def _compile_node(handlers, code, withargs, existing_labels, break_dest, height, o):
+    # Compile a single LLL node, returns a generator if the node has arguments
+    # that must be compiled first
+    handler = handlers.get(code.value)
+    if handler is None and isinstance(code.value, str):
+        # opcodes in mixed case, e.g. Mstore
+        handler = handlers.get(code.value.lower())
+    if handler is not None:
+        return handler(code, withargs, existing_labels, break_dest, height, o)
     # Numbers
     elif isinstance(code.value, int):
         if code.value <= -2**255:
@@ -105,346 +220,554 @@ def compile_to_assembly(code, withargs=None, existing_labels=None, break_dest=No
         elif code.value >= 2**256:
             raise Exception(f"Value too high: {code.value}")
         bytez = num_to_bytearray(code.value % 2**256) or [0]
-        return ['PUSH' + str(len(bytez))] + bytez
+        _append(o, code.pos, ['PUSH' + str(len(bytez))] + bytez)
     # Variables connected to with statements
-    elif isinstance(code.value, str) and code.value in withargs:
+    elif code.value in withargs:
         if height - withargs[code.value] > 16:
             raise Exception("With statement too deep")
-        return ['DUP' + str(height - withargs[code.value])]
-    # Setting variables connected to with statements
-    elif code.value == "set":
-        if len(code.args) != 2 or code.args[0].value not in withargs:
-            raise Exception("Set expects two arguments, the first being a stack variable")
-        if height - withargs[code.args[0].value] > 16:
-            raise Exception("With statement too deep")
-        return compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height) + \
-            ['SWAP' + str(height - withargs[code.args[0].value]), 'POP']
-    # Pass statements
-    elif code.value == 'pass':
-        return []
-    # Code length
-    elif code.value == '~codelen':
-        return ['_sym_codeend']
-    # Calldataload equivalent for code
-    elif code.value == 'codeload':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'seq',
-                ['codecopy', MemoryPositions.FREE_VAR_SPACE, code.args[0], 32],
-                ['mload', MemoryPositions.FREE_VAR_SPACE]
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # If statements (2 arguments, ie. if x: y)
-    elif code.value in ('if', 'if_unchecked') and len(code.args) == 2:
-        o = []
-        o.extend(compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height))
+        _append(o, code.pos, ['DUP' + str(height - withargs[code.value])])
+    # Push a symbol
+    elif isinstance(code.value, str) and code.value.startswith('_sym_'):
+        _append(o, code.pos, [code.value])
+    else:
+        raise Exception("Weird code element: " + repr(code))
+    return None
+
+
+# Opcodes
+def _compile_opcode(opcode, code, withargs, existing_labels, break_dest, height, o):
+    for i, c in enumerate(code.args[::-1]):
+        yield c, withargs, existing_labels, break_dest, height + i, o
+    _append(o, code.pos, [opcode])
+
+
+# Setting variables connected to with statements
+def _compile_set(code, withargs, existing_labels, break_dest, height, o):
+    if len(code.args) != 2 or code.args[0].value not in withargs:
+        raise Exception("Set expects two arguments, the first being a stack variable")
+    if height - withargs[code.args[0].value] > 16:
+        raise Exception("With statement too deep")
+    yield code.args[1], withargs, existing_labels, break_dest, height, o
+    _append(o, code.pos, ['SWAP' + str(height - withargs[code.args[0].value]), 'POP'])
+
+
+# Pass statements
+def _compile_pass(code, withargs, existing_labels, break_dest, height, o):
+    return None
+
+
+# Code length
+def _compile_codelen(code, withargs, existing_labels, break_dest, height, o):
+    _append(o, code.pos, ['_sym_codeend'])
+
+
+# Calldataload equivalent for code
+def _compile_codeload(code, withargs, existing_labels, break_dest, height, o):
+    yield LLLnode.from_list(
+        [
+            'seq',
+            ['codecopy', MemoryPositions.FREE_VAR_SPACE, code.args[0], 32],
+            ['mload', MemoryPositions.FREE_VAR_SPACE]
+        ]
+    ), withargs, existing_labels, break_dest, height, o
+
+
+# If statements
+def _compile_if(code, withargs, existing_labels, break_dest, height, o):
+    # 2 arguments, ie. if x: y
+    if len(code.args) == 2:
+        yield code.args[0], withargs, existing_labels, break_dest, height, o
         end_symbol = mksymbol()
-        o.extend(['ISZERO', end_symbol, 'JUMPI'])
-        o.extend(compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height))
-        o.extend([end_symbol, 'JUMPDEST'])
-        return o
-    # If statements (3 arguments, ie. if x: y, else: z)
+        _append(o, code.pos, ['ISZERO', end_symbol, 'JUMPI'])
+        yield code.args[1], withargs, existing_labels, break_dest, height, o
+        _append(o, code.pos, [end_symbol, 'JUMPDEST'])
+    # 3 arguments, ie. if x: y, else: z
     elif code.value == 'if' and len(code.args) == 3:
-        o = []
-        o.extend(compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height))
+        yield code.args[0], withargs, existing_labels, break_dest, height, o
         mid_symbol = mksymbol()
         end_symbol = mksymbol()
-        o.extend(['ISZERO', mid_symbol, 'JUMPI'])
-        o.extend(compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height))
-        o.extend([end_symbol, 'JUMP', mid_symbol, 'JUMPDEST'])
-        o.extend(compile_to_assembly(code.args[2], withargs, existing_labels, break_dest, height))
-        o.extend([end_symbol, 'JUMPDEST'])
-        return o
-    # Repeat statements (compiled from for loops)
-    # Repeat(memloc, start, rounds, body)
-    elif code.value == 'repeat':
-        o = []
-        loops = num_to_bytearray(code.args[2].value)
-        start, continue_dest, end = mksymbol(), mksymbol(), mksymbol()
-        o.extend(compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height))
-        o.extend(compile_to_assembly(
-            code.args[1],
-            withargs,
-            existing_labels,
-            break_dest,
-            height + 1,
-        ))
-        o.extend(['PUSH' + str(len(loops))] + loops)
-        # stack: memloc, startvalue, rounds
-        o.extend(['DUP2', 'DUP4', 'MSTORE', 'ADD', start, 'JUMPDEST'])
-        # stack: memloc, exit_index
-        o.extend(compile_to_assembly(
-            code.args[3],
-            withargs,
-            existing_labels,
-            (end, continue_dest, height + 2),
-            height + 2,
-        ))
-        # stack: memloc, exit_index
-        o.extend([
-            continue_dest, 'JUMPDEST', 'DUP2', 'MLOAD', 'PUSH1', 1, 'ADD', 'DUP1', 'DUP4', 'MSTORE',
-        ])
-        # stack: len(loops), index memory address, new index
-        o.extend(['DUP2', 'EQ', 'ISZERO', start, 'JUMPI', end, 'JUMPDEST', 'POP', 'POP'])
-        return o
-    # Continue to the next iteration of the for loop
-    elif code.value == 'continue':
-        if not break_dest:
-            raise Exception("Invalid break")
-        dest, continue_dest, break_height = break_dest
-        return [continue_dest, 'JUMP']
-    # Break from inside a for loop
-    elif code.value == 'break':
-        if not break_dest:
-            raise Exception("Invalid break")
-        dest, continue_dest, break_height = break_dest
-        return ['POP'] * (height - break_height) + [dest, 'JUMP']
-    # With statements
-    elif code.value == 'with':
-        o = []
-        o.extend(compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height))
-        old = withargs.get(code.args[0].value, None)
-        withargs[code.args[0].value] = height
-        o.extend(compile_to_assembly(
-            code.args[2],
-            withargs,
-            existing_labels,
-            break_dest,
-            height + 1,
+        _append(o, code.pos, ['ISZERO', mid_symbol, 'JUMPI'])
+        yield code.args[1], withargs, existing_labels, break_dest, height, o
+        _append(o, code.pos, [end_symbol, 'JUMP', mid_symbol, 'JUMPDEST'])
+        yield code.args[2], withargs, existing_labels, break_dest, height, o
+        _append(o, code.pos, [end_symbol, 'JUMPDEST'])
+    else:
+        raise Exception("Weird code element: " + repr(code))
+
+
+# Repeat statements (compiled from for loops)
+# Repeat(memloc, start, rounds, body)
+def _compile_repeat(code, withargs, existing_labels, break_dest, height, o):
+    loops = num_to_bytearray(code.args[2].value)
+    start, continue_dest, end = mksymbol(), mksymbol(), mksymbol()
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    yield code.args[1], withargs, existing_labels, break_dest, height + 1, o
+    _append(o, code.pos, ['PUSH' + str(len(loops))] + loops)
+    # stack: memloc, startvalue, rounds
+    _append(o, code.pos, ['DUP2', 'DUP4', 'MSTORE', 'ADD', start, 'JUMPDEST'])
+    # stack: memloc, exit_index
+    yield (
+        code.args[3],
+        withargs,
+        existing_labels,
+        (end, continue_dest, height + 2),
+        height + 2,
+        o,
+    )
+    # stack: memloc, exit_index
+    _append(o, code.pos, [
+        continue_dest, 'JUMPDEST', 'DUP2', 'MLOAD', 'PUSH1', 1, 'ADD', 'DUP1', 'DUP4', 'MSTORE',
+    ])
+    # stack: len(loops), index memory address, new index
+    _append(o, code.pos, [
+        'DUP2', 'EQ', 'ISZERO', start, 'JUMPI', end, 'JUMPDEST', 'POP', 'POP',
+    ])
+
+
+# Continue to the next iteration of the for loop
+def _compile_continue(code, withargs, existing_labels, break_dest, height, o):
+    if not break_dest:
+        raise Exception("Invalid break")
+    dest, continue_dest, break_height = break_dest
+    _append(o, code.pos, [continue_dest, 'JUMP'])
+
+
+# Break from inside a for loop
+def _compile_break(code, withargs, existing_labels, break_dest, height, o):
+    if not break_dest:
+        raise Exception("Invalid break")
+    dest, continue_dest, break_height = break_dest
+    _append(o, code.pos, ['POP'] * (height - break_height) + [dest, 'JUMP'])
+
+
+# With statements
+def _compile_with(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[1], withargs, existing_labels, break_dest, height, o
+    old = withargs.get(code.args[0].value, None)
+    withargs[code.args[0].value] = height
+    yield code.args[2], withargs, existing_labels, break_dest, height + 1, o
+    if code.args[2].valency:
+        _append(o, code.pos, ['SWAP1', 'POP'])
+    else:
+        _append(o, code.pos, ['POP'])
+    if old is not None:
+        withargs[code.args[0].value] = old
+    else:
+        del withargs[code.args[0].value]
+
+
+# LLL statement (used to contain code inside code)
+def _compile_lll(code, withargs, existing_labels, break_dest, height, o):
+    begincode = mksymbol()
+    endcode = mksymbol()
+    _append(o, code.pos, [endcode, 'JUMP', begincode, 'BLANK'])
+    # The inner code is compiled into a nested list, which is assembled separately
+    sub = []
+    o.append(sub)
+    yield code.args[0], {}, existing_labels, None, 0, sub
+    _append(o, code.pos, [endcode, 'JUMPDEST', begincode, endcode, 'SUB', begincode])
+    yield code.args[1], withargs, existing_labels, break_dest, height, o
+    _append(o, code.pos, ['CODECOPY', begincode, endcode, 'SUB'])
+
+
+# Seq (used to piece together multiple statements)
+def _compile_seq(code, withargs, existing_labels, break_dest, height, o):
+    last = len(code.args) - 1
+    for i, arg in enumerate(code.args):
+        yield arg, withargs, existing_labels, break_dest, height, o
+        if arg.valency == 1 and i != last:
+            _append(o, code.pos, ['POP'])
+
+
+# Seq without popping.
+def _compile_seq_unchecked(code, withargs, existing_labels, break_dest, height, o):
+    for arg in code.args:
+        yield arg, withargs, existing_labels, break_dest, height, o
+
+
+# Assure (if false, invalid opcode)
+def _compile_assert_unreachable(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    end_symbol = mksymbol()
+    _append(o, code.pos, [
+        end_symbol,
+        'JUMPI',
+        'INVALID',
+        end_symbol,
+        'JUMPDEST'
+    ])
+
+
+# Assert (if false, exit)
+def _compile_assert(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    _append(o, code.pos, get_revert())
+
+
+def _compile_assert_reason(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    mem_start = []
+    yield code.args[1], withargs, existing_labels, break_dest, height, mem_start
+    mem_len = []
+    yield code.args[2], withargs, existing_labels, break_dest, height, mem_len
+    _append(o, code.pos, get_revert(mem_start, mem_len))
+
+
+# Unsigned/signed clamp, check less-than
+def _compile_clamp_op(code, withargs, existing_labels, break_dest, height, o):
+    if isinstance(code.args[0].value, int) and isinstance(code.args[1].value, int):
+        # Checks for clamp errors at compile time as opposed to run time
+        args_0_val = code.args[0].value
+        args_1_val = code.args[1].value
+        is_free_of_clamp_errors = any((
+            code.value in ('uclamplt', 'clamplt') and 0 <= args_0_val < args_1_val,
+            code.value in ('uclample', 'clample') and 0 <= args_0_val <= args_1_val,
+            code.value in ('uclampgt', 'clampgt') and 0 <= args_0_val > args_1_val,
+            code.value in ('uclampge', 'clampge') and 0 <= args_0_val >= args_1_val,
         ))
-        if code.args[2].valency:
-            o.extend(['SWAP1', 'POP'])
-        else:
-            o.extend(['POP'])
-        if old is not None:
-            withargs[code.args[0].value] = old
+        if is_free_of_clamp_errors:
+            yield code.args[0], withargs, existing_labels, break_dest, height, o
+            return
         else:
-            del withargs[code.args[0].value]
-        return o
-    # LLL statement (used to contain code inside code)
-    elif code.value == 'lll':
-        o = []
-        begincode = mksymbol()
-        endcode = mksymbol()
-        o.extend([endcode, 'JUMP', begincode, 'BLANK'])
-        # The `append(...)` call here is intentional
-        o.append(compile_to_assembly(code.args[0], {}, existing_labels, None, 0))
-        o.extend([endcode, 'JUMPDEST', begincode, endcode, 'SUB', begincode])
-        o.extend(compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height))
-        o.extend(['CODECOPY', begincode, endcode, 'SUB'])
-        return o
-    # Seq (used to piece together multiple statements)
-    elif code.value == 'seq':
-        o = []
-        for arg in code.args:
-            o.extend(compile_to_assembly(arg, withargs, existing_labels, break_dest, height))
-            if arg.valency == 1 and arg != code.args[-1]:
-                o.append('POP')
-        return o
-    # Seq without popping.
-    elif code.value == 'seq_unchecked':
-        o = []
-        for arg in code.args:
-            o.extend(compile_to_assembly(arg, withargs, existing_labels, break_dest, height))
-            # if arg.valency == 1 and arg != code.args[-1]:
-            #     o.append('POP')
-        return o
-    # Assure (if false, invalid opcode)
-    elif code.value == 'assert_unreachable':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        end_symbol = mksymbol()
-        o.extend([
-            end_symbol,
-            'JUMPI',
-            'INVALID',
-            end_symbol,
-            'JUMPDEST'
-        ])
-        return o
-    # Assert (if false, exit)
-    elif code.value == 'assert':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend(get_revert())
-        return o
-    elif code.value == 'assert_reason':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        mem_start = compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height)
-        mem_len = compile_to_assembly(code.args[2], withargs, existing_labels, break_dest, height)
-        o.extend(get_revert(mem_start, mem_len))
-        return o
-    # Unsigned/signed clamp, check less-than
-    elif code.value in CLAMP_OP_NAMES:
-        if isinstance(code.args[0].value, int) and isinstance(code.args[1].value, int):
-            # Checks for clamp errors at compile time as opposed to run time
-            args_0_val = code.args[0].value
-            args_1_val = code.args[1].value
-            is_free_of_clamp_errors = any((
-                code.value in ('uclamplt', 'clamplt') and 0 <= args_0_val < args_1_val,
-                code.value in ('uclample', 'clample') and 0 <= args_0_val <= args_1_val,
-                code.value in ('uclampgt', 'clampgt') and 0 <= args_0_val > args_1_val,
-                code.value in ('uclampge', 'clampge') and 0 <= args_0_val >= args_1_val,
-            ))
-            if is_free_of_clamp_errors:
-                return compile_to_assembly(
-                    code.args[0], withargs, existing_labels, break_dest, height,
-                )
-            else:
-                raise Exception(
-                    f"Invalid {code.value} with values {code.args[0]} and {code.args[1]}"
-                )
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend(compile_to_assembly(
-            code.args[1], withargs, existing_labels, break_dest, height + 1,
-        ))
-        o.extend(['DUP2'])
-        # Stack: num num bound
-        if code.value == 'uclamplt':
-            o.extend(['LT'])
-        elif code.value == "clamplt":
-            o.extend(['SLT'])
-        elif code.value == "uclample":
-            o.extend(['GT', 'ISZERO'])
-        elif code.value == "clample":
-            o.extend(['SGT', 'ISZERO'])
-        elif code.value == 'uclampgt':
-            o.extend(['GT'])
-        elif code.value == "clampgt":
-            o.extend(['SGT'])
-        elif code.value == "uclampge":
-            o.extend(['LT', 'ISZERO'])
-        elif code.value == "clampge":
-            o.extend(['SLT', 'ISZERO'])
-        o.extend(get_revert())
-        return o
-    # Signed clamp, check against upper and lower bounds
-    elif code.value in ('clamp', 'uclamp'):
-        comp1 = 'SGT' if code.value == 'clamp' else 'GT'
-        comp2 = 'SLT' if code.value == 'clamp' else 'LT'
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend(compile_to_assembly(
-            code.args[1], withargs, existing_labels, break_dest, height + 1,
-        ))
-        o.extend(['DUP1'])
-        o.extend(compile_to_assembly(
-            code.args[2], withargs, existing_labels, break_dest, height + 3,
-        ))
-        o.extend(['SWAP1', comp1, 'ISZERO'])
-        o.extend(get_revert())
-        o.extend(['DUP1', 'SWAP2', 'SWAP1', comp2, 'ISZERO'])
-        o.extend(get_revert())
-        return o
-    # Checks that a value is nonzero
-    elif code.value == 'clamp_nonzero':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend(['DUP1'])
-        o.extend(get_revert())
-        return o
-    # SHA3 a single value
-    elif code.value == 'sha3_32':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend([
-            'PUSH1', MemoryPositions.FREE_VAR_SPACE,
-            'MSTORE',
-            'PUSH1', 32,
-            'PUSH1', MemoryPositions.FREE_VAR_SPACE,
-            'SHA3'
-        ])
-        return o
-    # SHA3 a 64 byte value
-    elif code.value == 'sha3_64':
-        o = compile_to_assembly(code.args[0], withargs, existing_labels, break_dest, height)
-        o.extend(compile_to_assembly(code.args[1], withargs, existing_labels, break_dest, height))
-        o.extend([
-            'PUSH1', MemoryPositions.FREE_VAR_SPACE2,
-            'MSTORE',
-            'PUSH1', MemoryPositions.FREE_VAR_SPACE,
-            'MSTORE',
-            'PUSH1', 64,
-            'PUSH1', MemoryPositions.FREE_VAR_SPACE,
-            'SHA3'
-        ])
-        return o
-    # <= operator
-    elif code.value == 'le':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'iszero',
-                ['gt', code.args[0], code.args[1]],
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # >= operator
-    elif code.value == 'ge':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'iszero',
-                ['lt', code.args[0], code.args[1]],
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # <= operator
-    elif code.value == 'sle':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'iszero',
-                ['sgt', code.args[0], code.args[1]],
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # >= operator
-    elif code.value == 'sge':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'iszero',
-                ['slt', code.args[0], code.args[1]],
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # != operator
-    elif code.value == 'ne':
-        return compile_to_assembly(LLLnode.from_list(
-            [
-                'iszero',
-                ['eq', code.args[0], code.args[1]],
-            ]
-        ), withargs, existing_labels, break_dest, height)
-    # e.g. 95 -> 96, 96 -> 96, 97 -> 128
-    elif code.value == "ceil32":
-        return compile_to_assembly(LLLnode.from_list(
+            raise Exception(
+                f"Invalid {code.value} with values {code.args[0]} and {code.args[1]}"
+            )
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    yield code.args[1], withargs, existing_labels, break_dest, height + 1, o
+    _append(o, code.pos, ['DUP2'])
+    # Stack: num num bound
+    if code.value == 'uclamplt':
+        _append(o, code.pos, ['LT'])
+    elif code.value == "clamplt":
+        _append(o, code.pos, ['SLT'])
+    elif code.value == "uclample":
+        _append(o, code.pos, ['GT', 'ISZERO'])
+    elif code.value == "clample":
+        _append(o, code.pos, ['SGT', 'ISZERO'])
+    elif code.value == 'uclampgt':
+        _append(o, code.pos, ['GT'])
+    elif code.value == "clampgt":
+        _append(o, code.pos, ['SGT'])
+    elif code.value == "uclampge":
+        _append(o, code.pos, ['LT', 'ISZERO'])
+    elif code.value == "clampge":
+        _append(o, code.pos, ['SLT', 'ISZERO'])
+    _append(o, code.pos, get_revert())
+
+
+# Signed clamp, check against upper and lower bounds
+def _compile_clamp(code, withargs, existing_labels, break_dest, height, o):
+    comp1 = 'SGT' if code.value == 'clamp' else 'GT'
+    comp2 = 'SLT' if code.value == 'clamp' else 'LT'
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    yield code.args[1], withargs, existing_labels, break_dest, height + 1, o
+    _append(o, code.pos, ['DUP1'])
+    yield code.args[2], withargs, existing_labels, break_dest, height + 3, o
+    _append(o, code.pos, ['SWAP1', comp1, 'ISZERO'])
+    _append(o, code.pos, get_revert())
+    _append(o, code.pos, ['DUP1', 'SWAP2', 'SWAP1', comp2, 'ISZERO'])
+    _append(o, code.pos, get_revert())
+
+
+# Checks that a value is nonzero
+def _compile_clamp_nonzero(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    _append(o, code.pos, ['DUP1'])
+    _append(o, code.pos, get_revert())
+
+
+# SHA3 a single value
+def _compile_sha3_32(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    _append(o, code.pos, [
+        'PUSH1', MemoryPositions.FREE_VAR_SPACE,
+        'MSTORE',
+        'PUSH1', 32,
+        'PUSH1', MemoryPositions.FREE_VAR_SPACE,
+        'SHA3'
+    ])
+
+
+# SHA3 a 64 byte value
+def _compile_sha3_64(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    yield code.args[1], withargs, existing_labels, break_dest, height + 1, o
+    _append(o, code.pos, [
+        'PUSH1', MemoryPositions.FREE_VAR_SPACE2,
+        'MSTORE',
+        'PUSH1', MemoryPositions.FREE_VAR_SPACE,
+        'MSTORE',
+        'PUSH1', 64,
+        'PUSH1', MemoryPositions.FREE_VAR_SPACE,
+        'SHA3'
+    ])
+
+
+# <=, >=, signed <=, signed >= and != operators, as the negation of the opposite
+# comparison
+NEGATED_COMPARISONS = {
+    'le': 'gt',
+    'ge': 'lt',
+    'sle': 'sgt',
+    'sge': 'slt',
+    'ne': 'eq',
+}
+
+
+def _compile_negated_comparison(code, withargs, existing_labels, break_dest, height, o):
+    yield LLLnode.from_list(
+        [
+            'iszero',
+            [NEGATED_COMPARISONS[code.value], code.args[0], code.args[1]],
+        ]
+    ), withargs, existing_labels, break_dest, height, o
+
+
+# e.g. 95 -> 96, 96 -> 96, 97 -> 128
+def _compile_ceil32(code, withargs, existing_labels, break_dest, height, o):
+    yield LLLnode.from_list(
+        [
+            'with', '_val', code.args[0],
             [
-                'with', '_val', code.args[0],
-                [
-                    'sub',
-                    ['add', '_val', 31],
-                    ['mod', ['sub', '_val', 1], 32],
-                ]
+                'sub',
+                ['add', '_val', 31],
+                ['mod', ['sub', '_val', 1], 32],
             ]
-        ), withargs, existing_labels, break_dest, height)
-    # # jump to a symbol
-    elif code.value == 'goto':
-        return [
-            '_sym_' + str(code.args[0]),
-            'JUMP'
         ]
-    elif isinstance(code.value, str) and code.value.startswith('_sym_'):
-        return code.value
-    # set a symbol as a location.
-    elif code.value == 'label':
-        label_name = str(code.args[0])
+    ), withargs, existing_labels, break_dest, height, o
 
-        if label_name in existing_labels:
-            raise Exception(f'Label with name {label_name} already exists!')
-        else:
-            existing_labels.add(label_name)
 
-        return [
-            '_sym_' + label_name,
-            'JUMPDEST'
-        ]
-    # inject debug opcode.
-    elif code.value == 'debugger':
-        return mkdebug(pc_debugger=False, pos=code.pos)
-    # inject debug opcode.
-    elif code.value == 'pc_debugger':
-        return mkdebug(pc_debugger=True, pos=code.pos)
+# # jump to a symbol
+def _compile_goto(code, withargs, existing_labels, break_dest, height, o):
+    _append(o, code.pos, [
+        '_sym_' + str(code.args[0]),
+        'JUMP'
+    ])
+
+
+# jump to a symbol, pushing a fresh return label first. The label is created when
+# the node is compiled, so the same node may be compiled more than once.
+def _compile_gosub(code, withargs, existing_labels, break_dest, height, o):
+    return_symbol = mksymbol()
+    _append(o, code.pos, [
+        return_symbol,
+        '_sym_' + str(code.args[0]),
+        'JUMP',
+        return_symbol,
+        'JUMPDEST',
+    ])
+
+
+# set a symbol as a location.
+def _compile_label(code, withargs, existing_labels, break_dest, height, o):
+    label_name = str(code.args[0])
+
+    if label_name in existing_labels:
+        raise Exception(f'Label with name {label_name} already exists!')
     else:
-        raise Exception("Weird code element: " + repr(code))
+        existing_labels.add(label_name)
+
+    _append(o, code.pos, [
+        '_sym_' + label_name,
+        'JUMPDEST'
+    ])
+
+
+# Jump to one of the locations of the `goto` arguments, selected by the value of the
+# first argument, i.e. jumptable <index> <goto> <goto> ...
+# The table is laid out in the code as a series of entries of equal size, each of
+# which jumps to one location. The labels of a table are pushed with the same width,
+# so that the location of an entry can be computed from the index. The width, and
+# with it the size of an entry, is chosen when the assembly is laid out.
+def _compile_jumptable(code, withargs, existing_labels, break_dest, height, o):
+    yield code.args[0], withargs, existing_labels, break_dest, height, o
+    table_symbol = mksymbol()
+    size_symbol = _get_entry_size_symbol(table_symbol)
+    _append(o, code.pos, [size_symbol, 'MUL', table_symbol, 'ADD', 'JUMP'])
+    for i, entry in enumerate(code.args[1:]):
+        if entry.value != 'goto':
+            raise CompilerPanic(f"Jumptable entries must be gotos: {entry}")
+        items = ['JUMPDEST', JUMPTABLE_PUSH, '_sym_' + str(entry.args[0]), 'JUMP']
+        if i == 0:
+            items.insert(0, table_symbol)
+        _append(o, entry.pos, items)
+
+
+# inject debug opcode.
+def _compile_debugger(code, withargs, existing_labels, break_dest, height, o):
+    o.extend(mkdebug(pc_debugger=code.value == 'pc_debugger', pos=code.pos))
+
+
+# Handlers for LLL pseudo-opcodes, by name
+PSEUDO_OPCODE_HANDLERS = {
+    'set': _compile_set,
+    'pass': _compile_pass,
+    '~codelen': _compile_codelen,
+    'codeload': _compile_codeload,
+    'if': _compile_if,
+    'if_unchecked': _compile_if,
+    'repeat': _compile_repeat,
+    'continue': _compile_continue,
+    'break': _compile_break,
+    'with': _compile_with,
+    'lll': _compile_lll,
+    'seq': _compile_seq,
+    'seq_unchecked': _compile_seq_unchecked,
+    'assert_unreachable': _compile_assert_unreachable,
+    'assert': _compile_assert,
+    'assert_reason': _compile_assert_reason,
+    'clamp': _compile_clamp,
+    'uclamp': _compile_clamp,
+    'clamp_nonzero': _compile_clamp_nonzero,
+    'sha3_32': _compile_sha3_32,
+    'sha3_64': _compile_sha3_64,
+    'ceil32': _compile_ceil32,
+    'goto': _compile_goto,
+    'gosub': _compile_gosub,
+    'label': _compile_label,
+    'jumptable': _compile_jumptable,
+    'debugger': _compile_debugger,
+    'pc_debugger': _compile_debugger,
+}
+PSEUDO_OPCODE_HANDLERS.update((name, _compile_clamp_op) for name in CLAMP_OP_NAMES)
+PSEUDO_OPCODE_HANDLERS.update(
+    (name, _compile_negated_comparison) for name in NEGATED_COMPARISONS
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_handlers(evm_version):
+    # Dispatch table of handlers for the opcodes and pseudo-opcodes of an EVM version,
+    # by the value of the LLL node. Opcodes in other cases are looked up in lower case.
+    handlers = {}
+    for opcode in get_opcodes():
+        handler = functools.partial(_compile_opcode, sys.intern(opcode))
+        handlers[sys.intern(opcode.lower())] = handler
+        handlers[opcode] = handler
+    for name, handler in PSEUDO_OPCODE_HANDLERS.items():
+        if name in handlers:
+            raise CompilerPanic(f"Pseudo-opcode {name} shadows an opcode")
+        handlers[sys.intern(name)] = handler
+    return handlers
+
+
+# Peephole optimization of assembly
+#
+# Each item is appended to the output in turn, and the end of the output is rewritten
+# for as long as it matches a pattern. Nested assemblies are optimized separately, and
+# a pattern never spans a nested assembly, a label or a DEBUG item. Items that are kept
+# retain their source positions.
+def _get_push_start(o, end):
+    # Return the index where a push of a constant or a symbol ends at `end`, or None
+    idx = end
+    while idx > 0 and isinstance(o[idx - 1], int):
+        idx -= 1
+    if idx > 0 and o[idx - 1] == f'PUSH{end - idx}' and end > idx:
+        return idx - 1
+    if idx == end and end > 0 and is_symbol(o[end - 1]):
+        return end - 2 if _is_fixed_width(o, end - 1) else end - 1
+    return None
+
+
+def _get_push_value(o, start, end):
+    if is_symbol(o[start]):
+        return None
+    return int.from_bytes(bytes(o[start + 1:end]), 'big')
+
+
+def _peephole(o):
+    # Rewrite the end of `o`, returning the name of the pattern that was matched
+    last = o[-1]
+    if not isinstance(last, str):
+        return None
+
+    if last == 'POP' and len(o) > 1:
+        prev = o[-2]
+        if isinstance(prev, str) and prev[:3] == 'DUP':
+            del o[-2:]
+            return 'dup_pop'
+        start = _get_push_start(o, len(o) - 1)
+        if start is not None:
+            del o[start:]
+            return 'push_pop'
+
+    elif last[:4] == 'SWAP' and len(o) > 1 and o[-2] == last:
+        del o[-2:]
+        return 'swap_swap'
+
+    elif last in ('ADD', 'OR', 'XOR'):
+        start = _get_push_start(o, len(o) - 1)
+        if start is not None and _get_push_value(o, start, len(o) - 1) == 0:
+            del o[start:]
+            return 'push_zero_op'
+
+    elif last == 'JUMPI' and len(o) > 3 and is_symbol(o[-2]) and o[-3] == o[-4] == 'ISZERO':
+        del o[-4:-2]
+        return 'iszero_iszero_jumpi'
+
+    return None
+
+
+def _thread_jumps(o, hits):
+    # Jumps to a label that is immediately followed by another jump are made
+    # to the final destination instead
+    forward = {}
+    for i in range(len(o) - 1):
+        if is_symbol(o[i]) and o[i + 1] == 'JUMPDEST':
+            j = i
+            while j + 1 < len(o) and is_symbol(o[j]) and o[j + 1] == 'JUMPDEST':
+                j += 2
+            if j + 1 < len(o) and is_symbol(o[j]) and o[j + 1] == 'JUMP':
+                forward[o[i]] = o[j]
+
+    for i in range(len(o) - 1):
+        if not is_symbol(o[i]) or o[i] not in forward or o[i + 1] not in ('JUMP', 'JUMPI'):
+            continue
+        target = o[i]
+        seen = {target}
+        while target in forward and forward[target] not in seen:
+            target = forward[target]
+            seen.add(target)
+        if target != o[i]:
+            pos = None
+            if isinstance(o[i], instruction):
+                pos = (o[i].lineno, o[i].col_offset, o[i].end_lineno, o[i].end_col_offset)
+            o[i] = instruction(target, pos)
+            if hits is not None:
+                hits['jump_to_jump'] += 1
+
+
+def optimize_assembly(assembly, hits=None):
+    """
+    Apply peephole optimizations to assembly in list form.
+
+    Arguments
+    ---------
+    assembly : list
+        Assembly instructions, as returned by `compile_to_assembly`. It is not
+        modified.
+    hits : Counter, optional
+        If given, the number of times each pattern was applied is added to it.
+
+    Returns
+    -------
+    list
+        Optimized assembly instructions.
+    """
+    o = []
+    for item in assembly:
+        if isinstance(item, list):
+            o.append(optimize_assembly(item, hits))
+            continue
+        o.append(item)
+        while o:
+            pattern = _peephole(o)
+            if pattern is None:
+                break
+            if hits is not None:
+                hits[pattern] += 1
+    _thread_jumps(o, hits)
+    return o
 
 
 def note_line_num(line_number_map, item, pos):
@@ -470,19 +793,106 @@ def note_breakpoint(line_number_map, item, pos):
             line_number_map['breakpoints'].add(item.lineno + 1)
 
 
-# Assembles assembly into EVM
-def assembly_to_evm(assembly, start_pos=0):
-    line_number_map = {
-        'breakpoints': set(),
-        'pc_breakpoints': set(),
-        'pc_jump_map': {0: '-'},
-        'pc_pos_map': {},
-    }
-    posmap = {}
-    sub_assemblies = []
-    codes = []
-    pos = start_pos
+def _push_width(value):
+    # number of bytes needed to push a value, a value of zero uses PUSH1
+    return max(1, (value.bit_length() + 7) // 8)
+
+
+def _is_label(assembly, i):
+    # a symbol followed by JUMPDEST or BLANK marks a location, otherwise it is a
+    # reference that pushes the location onto the stack
+    return assembly[i + 1] == 'JUMPDEST' or assembly[i + 1] == 'BLANK'
+
+
+def _is_fixed_width(assembly, i):
+    # a symbol that follows JUMPTABLE_PUSH is a label within a jump table, and is
+    # written with the width shared by the entries of the table
+    return i > 0 and assembly[i - 1] == JUMPTABLE_PUSH
+
+
+def _get_entry_size_symbol(table_symbol):
+    # a symbol with the size of each entry of a jump table as its value
+    return table_symbol + '_entry_size'
+
+
+def _is_entry_size_symbol(item):
+    return is_symbol(item) and item.endswith('_entry_size')
+
+
+def _layout(assembly, sub_codes, layouts):
+    # Resolve the offset of each item in an assembly and the value of each symbol,
+    # storing them in `layouts` by the `id` of the assembly. Returns the size of
+    # the assembled code.
+    #
+    # Symbol references are pushed with the smallest width that fits the value of
+    # the symbol, and the labels of a jump table with the smallest width that fits
+    # all of them. As widening a reference may move other symbols, the widths are
+    # relaxed until they reach a fixed point. Widths only ever increase, so this
+    # always terminates.
+    items = assembly.items if isinstance(assembly, Assembly) else assembly
+    sizes = [0] * len(items)
+    labels = {}
+    refs = []
+    # entries of each jump table, by the symbol of its entry size
+    tables = {}
+    size_symbol = None
+    for i, item in enumerate(items):
+        if item == 'DEBUG' or item == 'BLANK':
+            continue
+        elif is_symbol(item):
+            if _is_label(items, i):
+                labels[item] = i
+            elif _is_fixed_width(items, i):
+                # the entries of a table follow the reference to its entry size
+                tables[size_symbol].append(i)
+                sizes[i] = JUMPTABLE_MIN_WIDTH
+            else:
+                if _is_entry_size_symbol(item):
+                    size_symbol = item
+                    tables[item] = []
+                refs.append(i)
+                sizes[i] = 2  # PUSH1 byte
+        elif isinstance(item, (list, Assembly)):
+            if id(item) in sub_codes:
+                sizes[i] = len(sub_codes[id(item)])
+            else:
+                sizes[i] = _layout(item, sub_codes, layouts)
+        else:
+            sizes[i] = 1
+
+    widths = dict.fromkeys(tables, JUMPTABLE_MIN_WIDTH)
+    while True:
+        offsets = list(itertools.accumulate(itertools.chain([0], sizes)))
+        posmap = {symbol: offsets[i] for symbol, i in labels.items()}
+        posmap['_sym_codeend'] = offsets[-1]
+        relaxed = True
+        for symbol, entries in tables.items():
+            width = max([widths[symbol]] + [_push_width(posmap[items[i]]) for i in entries])
+            if width > widths[symbol]:
+                widths[symbol] = width
+                for i in entries:
+                    sizes[i] = width
+                relaxed = False
+            posmap[symbol] = JUMPTABLE_ENTRY_OVERHEAD + width
+        for i in refs:
+            size = 1 + _push_width(posmap[items[i]])
+            if size > sizes[i]:
+                sizes[i] = size
+                relaxed = False
+        if relaxed:
+            break
+
+    layouts[id(assembly)] = (offsets, posmap)
+    return offsets[-1]
+
+
+def _emit(assembly, sub_codes, layouts, o, start, line_number_map):
+    # Write the bytecode of an assembly into `o`, beginning at index `start`
+    offsets, posmap = layouts[id(assembly)]
+    opcodes = get_opcodes()
     for i, item in enumerate(assembly):
+        idx = start + offsets[i]
+        pos = line_number_map['start_pos'] + idx
         note_line_num(line_number_map, item, pos)
         if item == 'DEBUG':
             continue  # skip debug
@@ -499,53 +909,60 @@ def assembly_to_evm(assembly, start_pos=0):
             line_number_map['pc_jump_map'][pos] = "-"
 
         if is_symbol(item):
-            if assembly[i + 1] == 'JUMPDEST' or assembly[i + 1] == 'BLANK':
-                # Don't increment position as the symbol itself doesn't go into code
-                posmap[item] = pos - start_pos
-            else:
-                pos += 3  # PUSH2 highbits lowbits
-        elif item == 'BLANK':
-            pos += 0
-        elif isinstance(item, list):
-            c, sub_map = assembly_to_evm(item, start_pos=pos)
-            sub_assemblies.append(item)
-            codes.append(c)
-            pos += len(c)
-            for key in line_number_map:
-                line_number_map[key].update(sub_map[key])
-        else:
-            pos += 1
-
-    posmap['_sym_codeend'] = pos
-    o = b''
-    for i, item in enumerate(assembly):
-        if item == 'DEBUG':
-            continue  # skip debug
-        elif is_symbol(item):
-            if assembly[i + 1] != 'JUMPDEST' and assembly[i + 1] != 'BLANK':
-                o += bytes([PUSH_OFFSET + 2, posmap[item] // 256, posmap[item] % 256])
+            if _is_fixed_width(assembly, i):
+                width = offsets[i + 1] - offsets[i]
+                o[idx:idx + width] = posmap[item].to_bytes(width, 'big')
+            elif not _is_label(assembly, i):
+                width = offsets[i + 1] - offsets[i] - 1
+                o[idx] = PUSH_OFFSET + width
+                o[idx + 1:idx + 1 + width] = posmap[item].to_bytes(width, 'big')
         elif isinstance(item, int):
-            o += bytes([item])
-        elif isinstance(item, str) and item.upper() in get_opcodes():
-            o += bytes([get_opcodes()[item.upper()][0]])
+            o[idx] = item
+        elif isinstance(item, (list, Assembly)):
+            if id(item) in sub_codes:
+                # already assembled, e.g. the runtime code within the deployment code
+                c = sub_codes[id(item)]
+                o[idx:idx + len(c)] = c
+            else:
+                _emit(item, sub_codes, layouts, o, idx, line_number_map)
+        elif isinstance(item, str) and item.upper() in opcodes:
+            o[idx] = opcodes[item.upper()][0]
+        elif item == JUMPTABLE_PUSH:
+            o[idx] = PUSH_OFFSET + offsets[i + 2] - offsets[i + 1]
         elif item[:4] == 'PUSH':
-            o += bytes([PUSH_OFFSET + int(item[4:])])
+            o[idx] = PUSH_OFFSET + int(item[4:])
         elif item[:3] == 'DUP':
-            o += bytes([DUP_OFFSET + int(item[3:])])
+            o[idx] = DUP_OFFSET + int(item[3:])
         elif item[:4] == 'SWAP':
-            o += bytes([SWAP_OFFSET + int(item[4:])])
+            o[idx] = SWAP_OFFSET + int(item[4:])
         elif item == 'BLANK':
             pass
-        elif isinstance(item, list):
-            for j in range(len(sub_assemblies)):
-                if sub_assemblies[j] == item:
-                    o += codes[j]
-                    break
         else:
             # Should never reach because, assembly is create in compile_to_assembly.
             raise Exception("Weird symbol in assembly: " + str(item))  # pragma: no cover
 
-    assert len(o) == pos - start_pos
+
+# Assembles assembly into EVM
+# `sub_codes` maps the `id` of sub-assemblies that were already assembled, e.g. the
+# runtime code within the deployment code, to their bytecode. These are spliced in
+# as-is and do not contribute to the returned line number map.
+def assembly_to_evm(assembly, start_pos=0, sub_codes=None):
+    if sub_codes is None:
+        sub_codes = {}
+    line_number_map = {
+        'breakpoints': set(),
+        'pc_breakpoints': set(),
+        'pc_jump_map': {0: '-'},
+        'pc_pos_map': {},
+        'start_pos': start_pos,
+    }
+    layouts = {}
+    # First pass: resolve the location of each symbol, then write the bytecode
+    # into a buffer of the final size
+    o = bytearray(_layout(assembly, sub_codes, layouts))
+    _emit(assembly, sub_codes, layouts, o, 0, line_number_map)
+
+    del line_number_map['start_pos']
     line_number_map['breakpoints'] = list(line_number_map['breakpoints'])
     line_number_map['pc_breakpoints'] = list(line_number_map['pc_breakpoints'])
-    return o, line_number_map
+    return bytes(o), line_number_map
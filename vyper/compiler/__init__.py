@@ -1,11 +1,16 @@
 from collections import OrderedDict
-from typing import Any, Callable, Optional, Sequence, Union
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
 
+from vyper import opcodes
 from vyper.compiler import output
+from vyper.compiler.cache import CompilationCache
 from vyper.compiler.phases import CompilerData
+from vyper.compiler.utils import run_jobs
 from vyper.opcodes import DEFAULT_EVM_VERSION, evm_wrapper
+from vyper.parser.dispatcher import DEFAULT_DISPATCH
 from vyper.typing import (
     ContractCodes,
+    DispatchProfile,
     InterfaceDict,
     InterfaceImports,
     OutputDict,
@@ -23,9 +28,12 @@ OUTPUT_FORMATS = {
     "interface": output.build_interface_output,
     "ir": output.build_ir_output,
     "method_identifiers": output.build_method_identifiers_output,
+    "dispatch_gas": output.build_dispatch_gas_output,
+    "dispatch_gas_expected": output.build_dispatch_gas_expected_output,
     # requires assembly
     "abi": output.build_abi_output,
     "asm": output.build_asm_output,
+    "asm_diff": output.build_asm_diff_output,
     "source_map": output.build_source_map_output,
     # requires bytecode
     "bytecode": output.build_bytecode_output,
@@ -35,6 +43,56 @@ OUTPUT_FORMATS = {
 }
 
 
+def _compile_contract(
+    source_code: str,
+    contract_name: str,
+    interfaces: Any,
+    source_id: int,
+    output_formats: Sequence[str],
+    evm_version: int,
+    dispatch: str,
+    dispatch_profile: Optional[DispatchProfile],
+) -> List[Tuple[str, Any, Optional[Exception]]]:
+    # Compile a single contract. Exceptions raised while generating an output
+    # are returned rather than raised, so that `compile_codes` can pass them to
+    # the exception handler from the calling process when compiling in parallel.
+    # Returns a list of `(output format, output, exception)`.
+
+    # worker processes do not necessarily inherit the ruleset set by `evm_wrapper`
+    opcodes.active_evm_version = evm_version
+
+    # the unfolded AST is only required for the `ast_dict` output
+    fold_in_place = "ast_dict" not in output_formats
+    compiler_data = CompilerData(
+        source_code,
+        contract_name,
+        interfaces,
+        source_id,
+        fold_in_place,
+        dispatch,
+        dispatch_profile,
+    )
+    declared_functions = set(compiler_data.global_ctx._declared_functions)
+    unlocked_functions = set(compiler_data._unlocked_functions)
+    declared_functions.remove('__init__')
+    if declared_functions == unlocked_functions:
+        print("Well done, all functions were unlocked")
+    elif declared_functions.issubset(unlocked_functions):
+        raise ValueError('There are more unlocked functions than the ones declared')
+    elif unlocked_functions.issubset(declared_functions):
+        raise ValueError('Not all functions have been unlocked')
+
+    results: List = []
+    for output_format in output_formats:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported format type {repr(output_format)}")
+        try:
+            results.append((output_format, OUTPUT_FORMATS[output_format](compiler_data), None))
+        except Exception as exc:
+            results.append((output_format, None, exc))
+    return results
+
+
 @evm_wrapper
 def compile_codes(
     contract_sources: ContractCodes,
@@ -42,6 +100,10 @@ def compile_codes(
     exc_handler: Union[Callable, None] = None,
     interface_codes: Union[InterfaceDict, InterfaceImports, None] = None,
     initial_id: int = 0,
+    cache_dir: Optional[str] = None,
+    workers: int = 1,
+    dispatch: str = DEFAULT_DISPATCH,
+    dispatch_profile: Optional[DispatchProfile] = None,
 ) -> OrderedDict:
     """
     Generate compiler output(s) from one or more contract source codes.
@@ -71,6 +133,24 @@ def compile_codes(
 
         * Interface definitions are formatted as: `{'type': "json/vyper", 'code': "interface code"}`
         * JSON interfaces are given as lists, vyper interfaces as strings
+    cache_dir: str, optional
+        Directory of an on-disk compilation cache. If given, outputs are looked up
+        in and written to the cache. Contracts whose requested outputs are all
+        cached are not compiled.
+    workers: int, optional
+        Number of processes used to compile contracts in parallel. Defaults to 1,
+        compiling each contract in the current process. The output and the calls
+        to `exc_handler` are the same regardless of the number of workers.
+    dispatch: str, optional
+        How the runtime code finds the public function that matches the method id
+        of a call. One of "linear", "binary" or "jumptable". The worst-case gas used
+        to reach each function is given by the `dispatch_gas` output.
+    dispatch_profile: Dict, optional
+        Relative number of calls to each public function, as `{key: weight}`. A key
+        may be a method id in hex, a function signature or a function name. The
+        dispatcher is arranged so that the most called functions are found first,
+        the `dispatch_gas_expected` output gives the mean dispatch gas of calls
+        following the profile.
 
     Returns
     -------
@@ -83,7 +163,11 @@ def compile_codes(
     if isinstance(output_formats, Sequence):
         output_formats = dict((k, output_formats) for k in contract_sources.keys())
 
+    cache = CompilationCache(cache_dir) if cache_dir is not None else None
+
     out: OrderedDict = OrderedDict()
+    jobs: List = []
+    cache_entries: dict = {}
     for source_id, contract_name in enumerate(
         sorted(contract_sources), start=initial_id
     ):
@@ -98,31 +182,47 @@ def compile_codes(
         ):
             interfaces = interfaces[contract_name]
 
-        compiler_data = CompilerData(source_code, contract_name, interfaces, source_id)
-        declared_functions = set(compiler_data.global_ctx._declared_functions)
-        unlocked_functions = set(compiler_data._unlocked_functions)
-        declared_functions.remove('__init__')
-        if declared_functions == unlocked_functions:
-            print("Well done, all functions were unlocked")
-        elif declared_functions.issubset(unlocked_functions):
-            raise ValueError('There are more unlocked functions than the ones declared')
-        elif unlocked_functions.issubset(declared_functions):
-            raise ValueError('Not all functions have been unlocked')
-        for output_format in output_formats[contract_name]:
-            if output_format not in OUTPUT_FORMATS:
-                raise ValueError(f"Unsupported format type {repr(output_format)}")
-            try:
-                out.setdefault(contract_name, {})
-                out[contract_name][output_format] = OUTPUT_FORMATS[output_format](
-                    compiler_data
-                )
-            except Exception as exc:
-                if exc_handler is not None:
-                    exc_handler(contract_name, exc)
-                else:
-                    raise exc
-
-    return out
+        if cache is not None:
+            cache_key = cache.get_key(
+                source_code, contract_name, interfaces, source_id, dispatch, dispatch_profile
+            )
+            cached_outputs = cache.load(cache_key)
+            formats = output_formats[contract_name]
+            if formats and all(i in cached_outputs for i in formats):
+                out[contract_name] = {i: cached_outputs[i] for i in formats}
+                continue
+            cache_entries[contract_name] = (cache_key, cached_outputs)
+
+        jobs.append(
+            (
+                source_code,
+                contract_name,
+                interfaces,
+                source_id,
+                output_formats[contract_name],
+                opcodes.active_evm_version,
+                dispatch,
+                dispatch_profile,
+            )
+        )
+
+    for job, results in zip(jobs, run_jobs(_compile_contract, jobs, workers)):
+        contract_name = job[1]
+        for output_format, value, exc in results:
+            out.setdefault(contract_name, {})
+            if exc is None:
+                out[contract_name][output_format] = value
+            elif exc_handler is not None:
+                exc_handler(contract_name, exc)
+            else:
+                raise exc
+
+        if cache is not None and contract_name in out:
+            cache_key, cached_outputs = cache_entries[contract_name]
+            cache.store(cache_key, {**cached_outputs, **out[contract_name]})
+
+    # cached contracts were added to the output first, restore the source order
+    return OrderedDict((k, out[k]) for k in sorted(contract_sources) if k in out)
 
 
 UNKNOWN_CONTRACT_NAME = "<unknown>"
@@ -133,6 +233,9 @@ def compile_code(
     output_formats: Optional[OutputFormats] = None,
     interface_codes: Optional[InterfaceImports] = None,
     evm_version: str = DEFAULT_EVM_VERSION,
+    cache_dir: Optional[str] = None,
+    dispatch: str = DEFAULT_DISPATCH,
+    dispatch_profile: Optional[DispatchProfile] = None,
 ) -> dict:
     """
     Generate compiler output(s) from a single contract source code.
@@ -152,7 +255,13 @@ def compile_code(
 
         * Formatted as as `{'interface name': {'type': "json/vyper", 'code': "interface code"}}`
         * JSON interfaces are given as lists, vyper interfaces as strings
-
+    cache_dir: str, optional
+        Directory of an on-disk compilation cache.
+    dispatch: str, optional
+        How the runtime code finds the public function that matches the method id
+        of a call. One of "linear", "binary" or "jumptable".
+    dispatch_profile: Dict, optional
+        Relative number of calls to each public function.
     Returns
     -------
     Dict
@@ -166,4 +275,7 @@ def compile_code(
         output_formats,
         interface_codes=interface_codes,
         evm_version=evm_version,
+        cache_dir=cache_dir,
+        dispatch=dispatch,
+        dispatch_profile=dispatch_profile,
     )[UNKNOWN_CONTRACT_NAME]
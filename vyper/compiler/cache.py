@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import vyper
+from vyper import opcodes
+from vyper.parser.dispatcher import DEFAULT_DISPATCH
+from vyper.settings import VYPER_CACHE_MAX_SIZE
+from vyper.typing import DispatchProfile
+
+# outputs that are live compiler objects rather than plain data, these are
+# always regenerated and never written to the cache
+UNCACHEABLE_FORMATS = {"ir"}
+
+CACHE_SUFFIX = ".pickle"
+
+
+def _hash(value: Any) -> str:
+    # stable hash of a JSON-serializable value
+    serialized = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _unlink(path: Path) -> None:
+    # another process sharing the cache may have removed the file already
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class CompilationCache:
+    """
+    Content-addressed, on-disk cache of compiler outputs.
+
+    Each cache entry holds the outputs generated for a single contract, stored
+    under a key derived from everything that can influence those outputs: the
+    source code, the resolved interface codes, the target EVM ruleset and the
+    compiler version. Entries are evicted on a least-recently-used basis once
+    the total size of the cache exceeds `max_size` bytes.
+
+    Cache entries are pickled, only point the cache at a trusted directory.
+
+    Attributes
+    ----------
+    cache_dir : Path
+        Directory where cache entries are stored.
+    max_size : int
+        Maximum total size of all cache entries, in bytes.
+    """
+
+    def __init__(
+        self, cache_dir: Union[str, Path], max_size: int = VYPER_CACHE_MAX_SIZE
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_key(
+        self,
+        source_code: str,
+        contract_name: str,
+        interface_codes: Optional[Dict],
+        source_id: int,
+        dispatch: str = DEFAULT_DISPATCH,
+        dispatch_profile: Optional[DispatchProfile] = None,
+    ) -> str:
+        """
+        Generate the cache key for a contract.
+
+        Arguments
+        ---------
+        source_code : str
+            Vyper source code.
+        contract_name : str
+            The name of the contract being compiled.
+        interface_codes : Dict, optional
+            Interfaces that may be imported by the contract, as given to `CompilerData`.
+        source_id : int
+            ID number used to identify this contract in the source map.
+        dispatch : str, optional
+            How the runtime code finds the public function matching a method id.
+        dispatch_profile : Dict, optional
+            Relative number of calls to each public function.
+
+        Returns
+        -------
+        str
+            Hex-encoded SHA256 digest identifying the cache entry.
+        """
+        interface_hashes = {
+            name: _hash(value) for name, value in (interface_codes or {}).items()
+        }
+        return _hash(
+            {
+                "compiler": f"{vyper.__version__}+commit.{vyper.__commit__}",
+                "contract_name": contract_name,
+                "dispatch": dispatch,
+                "dispatch_profile": dispatch_profile,
+                "evm_version": opcodes.active_evm_version,
+                "interfaces": interface_hashes,
+                "source": hashlib.sha256(source_code.encode("utf-8")).hexdigest(),
+                "source_id": source_id,
+            }
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(key + CACHE_SUFFIX)
+
+    def load(self, key: str) -> Dict:
+        """
+        Return the cached outputs for a key.
+
+        A successful lookup marks the entry as recently used. Missing or
+        unreadable entries return an empty dict.
+        """
+        path = self._path(key)
+        try:
+            with path.open("rb") as fp:
+                outputs = pickle.load(fp)
+            os.utime(path)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            # corrupt or incompatible entry, discard it
+            _unlink(path)
+            return {}
+        return outputs
+
+    def store(self, key: str, outputs: Dict) -> None:
+        """
+        Write the outputs for a key to the cache, then evict old entries if the
+        cache has grown beyond `max_size`.
+        """
+        outputs = {k: v for k, v in outputs.items() if k not in UNCACHEABLE_FORMATS}
+        if not outputs:
+            return
+
+        # write to a temporary file first so concurrent readers never see a
+        # partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(outputs, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the total size of the
+        cache is no greater than `max_size`.
+        """
+        entries = []
+        total_size = 0
+        for path in self.cache_dir.glob("*" + CACHE_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort(key=lambda k: k[0])
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            _unlink(path)
+            total_size -= size
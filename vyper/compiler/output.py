@@ -1,11 +1,18 @@
-from collections import OrderedDict, deque
+import difflib
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Optional
 
 import asttokens
 
 from vyper import compile_lll, opcodes
 from vyper.ast import ast_to_dict, parse_natspec
 from vyper.compiler.phases import CompilerData
-from vyper.compiler.utils import build_gas_estimates
+from vyper.compiler.utils import (
+    build_dispatch_gas_estimates,
+    build_expected_dispatch_gas,
+    build_gas_estimates,
+)
+from vyper.parser.dispatcher import get_method_id_weights
 from vyper.parser.lll_node import LLLnode
 from vyper.signatures import sig_utils
 from vyper.signatures.interface import (
@@ -54,6 +61,23 @@ def build_method_identifiers_output(compiler_data: CompilerData) -> dict:
     return sig_utils.mk_method_identifiers(compiler_data.global_ctx)
 
 
+def build_dispatch_gas_output(compiler_data: CompilerData) -> dict:
+    return build_dispatch_gas_estimates(compiler_data.lll_nodes)
+
+
+def build_dispatch_gas_expected_output(compiler_data: CompilerData) -> Optional[float]:
+    # without a profile, every public function is assumed to be called equally often
+    method_ids = {
+        k: int(v, 16)
+        for k, v in sig_utils.mk_method_identifiers(compiler_data.global_ctx).items()
+    }
+    if compiler_data.dispatch_profile is None:
+        weights: Dict[int, float] = {i: 1 for i in method_ids.values()}
+    else:
+        weights = get_method_id_weights(compiler_data.dispatch_profile, method_ids)
+    return build_expected_dispatch_gas(compiler_data.lll_nodes, weights)
+
+
 def build_abi_output(compiler_data: CompilerData) -> list:
     abi = sig_utils.mk_full_signature(compiler_data.global_ctx)
     # Add gas estimates for each function to ABI
@@ -78,11 +102,27 @@ def build_asm_output(compiler_data: CompilerData) -> str:
     return _build_asm(compiler_data.assembly)
 
 
+def build_asm_diff_output(compiler_data: CompilerData) -> str:
+    assembly = compile_lll.compile_to_assembly(compiler_data.lll_nodes)
+    hits: Counter = Counter()
+    optimized = compile_lll.optimize_assembly(assembly, hits)
+
+    output_string = "".join(f"# {k}: {v}\n" for k, v in sorted(hits.items()))
+    diff = difflib.unified_diff(
+        _build_asm(assembly).splitlines(),
+        _build_asm(optimized).splitlines(),
+        "asm",
+        "asm (optimized)",
+        lineterm="",
+    )
+    return output_string + "\n".join(diff)
+
+
 def _build_asm(asm_list):
     output_string = ""
     skip_newlines = 0
     for node in asm_list:
-        if isinstance(node, list):
+        if isinstance(node, (list, compile_lll.Assembly)):
             output_string += _build_asm(node)
             continue
 
@@ -93,6 +133,9 @@ def _build_asm(asm_list):
             skip_newlines -= 1
         elif is_push:
             skip_newlines = int(node[4:]) - 1
+        elif node == compile_lll.JUMPTABLE_PUSH:
+            # the label of a jump table entry follows as a single item
+            pass
         else:
             output_string += "\n"
     return output_string
@@ -1,12 +1,14 @@
-import copy
 import warnings
-from typing import Optional, Tuple, List
+from typing import Dict, List, Optional, Tuple
 
 from vyper import ast as vy_ast
 from vyper import compile_lll, optimizer
+from vyper.exceptions import CompilerPanic
 from vyper.parser import parser
+from vyper.parser.dispatcher import DEFAULT_DISPATCH
 from vyper.parser.global_context import GlobalContext
-from vyper.typing import InterfaceImports
+from vyper.settings import VYPER_DEBUG_LLL
+from vyper.typing import DispatchProfile, InterfaceImports
 
 
 class CompilerData:
@@ -29,9 +31,9 @@ class CompilerData:
         LLL used to generate deployment bytecode
     lll_runtime : LLLnode
         LLL used to generate runtime bytecode
-    assembly : list
+    assembly : Assembly
         Assembly instructions for deployment bytecode
-    assembly_runtime : list
+    assembly_runtime : Assembly
         Assembly instructions for runtime bytecode
     bytecode : bytes
         Deployment bytecode
@@ -45,6 +47,9 @@ class CompilerData:
         contract_name: str = "VyperContract",
         interface_codes: Optional[InterfaceImports] = None,
         source_id: int = 0,
+        fold_in_place: bool = False,
+        dispatch: str = DEFAULT_DISPATCH,
+        dispatch_profile: Optional[DispatchProfile] = None,
     ) -> None:
         """
         Initialization method.
@@ -61,11 +66,25 @@ class CompilerData:
             * JSON interfaces are given as lists, vyper interfaces as strings
         source_id : int, optional
             ID number used to identify this contract in the source map.
+        fold_in_place : bool, optional
+            If True, constant folding is performed on `vyper_module` rather than
+            on a copy. Only use this when the unfolded AST is not required, i.e.
+            when not generating the `ast_dict` output.
+        dispatch : str, optional
+            How the runtime code finds the public function that matches the
+            method id of a call. One of "linear", "binary" or "jumptable".
+        dispatch_profile : Dict, optional
+            Relative number of calls to each public function, as `{key: weight}`
+            where a key is a method id, a signature or a function name. Used to
+            arrange the dispatcher so that the most called functions are found first.
         """
         self.contract_name = contract_name
         self.source_code = source_code
         self.interface_codes = interface_codes
         self.source_id = source_id
+        self.fold_in_place = fold_in_place
+        self.dispatch = dispatch
+        self.dispatch_profile = dispatch_profile
         self._unlocked_functions = []
 
     @property
@@ -78,7 +97,9 @@ class CompilerData:
     @property
     def vyper_module_folded(self) -> vy_ast.Module:
         if not hasattr(self, "_vyper_module_folded"):
-            self._vyper_module_folded = generate_folded_ast(self.vyper_module)
+            self._vyper_module_folded = generate_folded_ast(
+                self.vyper_module, self.fold_in_place
+            )
 
         return self._vyper_module_folded
 
@@ -94,7 +115,7 @@ class CompilerData:
     def _gen_lll(self) -> None:
         # fetch both deployment and runtime LLL
         self._lll_nodes, self._lll_runtime = generate_lll_nodes(
-            self.source_code, self.global_ctx
+            self.source_code, self.global_ctx, self.dispatch, self.dispatch_profile
         )
 
     @property
@@ -110,21 +131,29 @@ class CompilerData:
         return self._lll_runtime
 
     @property
-    def assembly(self) -> list:
+    def assembly(self) -> compile_lll.Assembly:
         if not hasattr(self, "_assembly"):
             self._assembly = generate_assembly(self.lll_nodes)
         return self._assembly
 
     @property
-    def assembly_runtime(self) -> list:
+    def assembly_runtime(self) -> compile_lll.Assembly:
         if not hasattr(self, "_assembly_runtime"):
-            self._assembly_runtime = generate_assembly(self.lll_runtime)
+            if self._is_runtime_embedded():
+                # the runtime assembly is generated once, as part of the deployment assembly
+                self._assembly_runtime = _get_runtime_assembly(self.assembly)
+            else:
+                self._assembly_runtime = generate_assembly(self.lll_runtime)
         return self._assembly_runtime
 
     @property
     def bytecode(self) -> bytes:
         if not hasattr(self, "_bytecode"):
-            self._bytecode = generate_bytecode(self.assembly)
+            sub_codes = {}
+            if self._is_runtime_embedded():
+                # splice in the runtime bytecode rather than assembling it again
+                sub_codes[id(self.assembly_runtime)] = self.bytecode_runtime
+            self._bytecode = generate_bytecode(self.assembly, sub_codes)
         return self._bytecode
 
     @property
@@ -133,6 +162,11 @@ class CompilerData:
             self._bytecode_runtime = generate_bytecode(self.assembly_runtime)
         return self._bytecode_runtime
 
+    def _is_runtime_embedded(self) -> bool:
+        # the runtime LLL is returned by the deployment LLL, unless the contract
+        # has no functions other than the constructor
+        return _get_runtime_lll(self.lll_nodes) is self.lll_runtime
+
 #def generate_ast(source_code: str, source_id: int) -> vy_ast.Module:
 def generate_ast(source_code: str, source_id: int) -> Tuple[vy_ast.Module, List]:
     """
@@ -153,21 +187,30 @@ def generate_ast(source_code: str, source_id: int) -> Tuple[vy_ast.Module, List]
     return vy_ast.parse_to_ast(source_code, source_id)
 
 
-def generate_folded_ast(vyper_module: vy_ast.Module) -> vy_ast.Module:
+def generate_folded_ast(vyper_module: vy_ast.Module, in_place: bool = False) -> vy_ast.Module:
     """
     Perform constant folding operations on the Vyper AST.
 
+    Unless `in_place` is set, folding is performed on a copy-on-write copy of the
+    module. The folded AST shares every unmodified node with the original, and
+    the original AST continues to represent the unfolded source.
+
     Arguments
     ---------
     vyper_module : vy_ast.Module
         Top-level Vyper AST node
+    in_place : bool, optional
+        If True, `vyper_module` is folded directly and no copy is made.
 
     Returns
     -------
     vy_ast.Module
         Folded Vyper AST
     """
-    vyper_module_folded = copy.deepcopy(vyper_module)
+    if in_place:
+        vyper_module_folded = vyper_module
+    else:
+        vyper_module_folded = vyper_module.copy_on_write()
     vy_ast.folding.fold(vyper_module_folded)
 
     return vyper_module_folded
@@ -197,7 +240,10 @@ def generate_global_context(
 
 
 def generate_lll_nodes(
-    source_code: str, global_ctx: GlobalContext
+    source_code: str,
+    global_ctx: GlobalContext,
+    dispatch: str = DEFAULT_DISPATCH,
+    dispatch_profile: Optional[DispatchProfile] = None,
 ) -> Tuple[parser.LLLnode, parser.LLLnode]:
     """
     Generate the intermediate representation (LLL) from the contextualized AST.
@@ -208,12 +254,20 @@ def generate_lll_nodes(
     the other for generating runtime bytecode. The remaining compilation phases
     may be called with either value, depending on the desired final output.
 
+    The deployment LLL contains the runtime LLL. It is optimized once, and the
+    optimized runtime LLL is shared between both values.
+
     Arguments
     ---------
     source_code : str
         Vyper source code.
     global_ctx : GlobalContext
         Contextualized Vyper AST
+    dispatch : str, optional
+        How the runtime code finds the public function that matches the method id
+        of a call.
+    dispatch_profile : Dict, optional
+        Relative number of calls to each public function.
 
     Returns
     -------
@@ -221,16 +275,48 @@ def generate_lll_nodes(
         LLL to generate deployment bytecode
         LLL to generate runtime bytecode
     """
-    lll_nodes, lll_runtime = parser.parse_tree_to_lll(source_code, global_ctx)
+    lll_nodes, lll_runtime = parser.parse_tree_to_lll(
+        source_code, global_ctx, dispatch, dispatch_profile
+    )
+    is_embedded = _get_runtime_lll(lll_nodes) is lll_runtime
+    if VYPER_DEBUG_LLL:
+        _validate_lll(lll_nodes, None if is_embedded else lll_runtime)
     lll_nodes = optimizer.optimize(lll_nodes)
-    lll_runtime = optimizer.optimize(lll_runtime)
+    if is_embedded:
+        optimized_runtime = _get_runtime_lll(lll_nodes)
+        if optimized_runtime is None:
+            raise CompilerPanic("Runtime LLL is not embedded in the optimized deployment LLL")
+        lll_runtime = optimized_runtime
+    else:
+        lll_runtime = optimizer.optimize(lll_runtime)
+    if VYPER_DEBUG_LLL:
+        _validate_lll(lll_nodes, None if is_embedded else lll_runtime)
     return lll_nodes, lll_runtime
 
 
-def generate_assembly(lll_nodes: parser.LLLnode) -> list:
+def _validate_lll(lll_nodes: parser.LLLnode, lll_runtime: Optional[parser.LLLnode]) -> None:
+    # the runtime LLL is only given when it is not embedded within the deployment LLL
+    lll_nodes.validate()
+    if lll_runtime is not None:
+        lll_runtime.validate()
+
+
+def _get_runtime_lll(lll_nodes: parser.LLLnode) -> Optional[parser.LLLnode]:
+    # the deployment LLL returns the runtime LLL within an `lll` block, i.e.
+    # `['seq', ..., ['return', 0, ['lll', runtime, 0]]]`
+    if lll_nodes.value == "seq" and lll_nodes.args:
+        return_node = lll_nodes.args[-1]
+        if return_node.value == "return" and return_node.args[1].value == "lll":
+            return return_node.args[1].args[0]
+    return None
+
+
+def generate_assembly(lll_nodes: parser.LLLnode) -> compile_lll.Assembly:
     """
     Generate assembly instructions from LLL.
 
+    This phase also includes peephole optimizations of the assembly.
+
     Arguments
     ---------
     lll_nodes : str
@@ -238,8 +324,8 @@ def generate_assembly(lll_nodes: parser.LLLnode) -> list:
 
     Returns
     -------
-    list
-        List of assembly instructions.
+    Assembly
+        Assembly instructions, in compact form.
     """
     assembly = compile_lll.compile_to_assembly(lll_nodes)
     if _find_nested_opcode(assembly, "DEBUG"):
@@ -247,7 +333,7 @@ def generate_assembly(lll_nodes: parser.LLLnode) -> list:
             "This code contains DEBUG opcodes! The DEBUG opcode will only work in "
             "a supported EVM! It will FAIL on all other nodes!"
         )
-    return assembly
+    return compile_lll.Assembly.from_list(compile_lll.optimize_assembly(assembly))
 
 
 def _find_nested_opcode(assembly, key):
@@ -258,18 +344,30 @@ def _find_nested_opcode(assembly, key):
         return any(_find_nested_opcode(x, key) for x in sublists)
 
 
-def generate_bytecode(assembly: list) -> bytes:
+def _get_runtime_assembly(assembly: compile_lll.Assembly) -> compile_lll.Assembly:
+    # the runtime assembly is the sub-assembly of the `lll` block that is
+    # returned by the deployment assembly
+    return next(i for i in reversed(assembly.items) if isinstance(i, compile_lll.Assembly))
+
+
+def generate_bytecode(
+    assembly: compile_lll.Assembly, sub_codes: Optional[Dict] = None
+) -> bytes:
     """
     Generate bytecode from assembly instructions.
 
     Arguments
     ---------
-    assembly : list
+    assembly : Assembly
         Assembly instructions. Can be deployment or runtime assembly.
+    sub_codes : Dict, optional
+        Bytecode of sub-assemblies that have already been assembled, given as
+        `{id(sub_assembly): bytecode}`. Used to splice the runtime bytecode into
+        the deployment bytecode.
 
     Returns
     -------
     bytes
         Final compiled bytecode.
     """
-    return compile_lll.assembly_to_evm(assembly)[0]
+    return compile_lll.assembly_to_evm(assembly, sub_codes=sub_codes)[0]
@@ -1,22 +1,51 @@
-from vyper.parser.lll_node import LLLnode
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from vyper.parser.dispatcher import get_expected_gas
+from vyper.parser.lll_node import LLLnode
 
-def build_gas_estimates(lll_nodes: LLLnode) -> dict:
-    gas_estimates: dict = {}
 
+def _get_function_nodes(lll_nodes: LLLnode) -> List[LLLnode]:
     # Extract the stuff inside the LLL bracket
     if lll_nodes.value == "seq":
         if len(lll_nodes.args) > 0 and lll_nodes.args[-1].value == "return":
             lll_nodes = lll_nodes.args[-1].args[1].args[0]
 
     assert lll_nodes.value == "seq"
-    for arg in lll_nodes.args:
-        if arg.func_name is not None:
-            gas_estimates[arg.func_name] = arg.total_gas
+    return [arg for arg in lll_nodes.args if arg.func_name is not None]
+
+
+def build_gas_estimates(lll_nodes: LLLnode) -> dict:
+    gas_estimates: dict = {}
+    for arg in _get_function_nodes(lll_nodes):
+        gas_estimates[arg.func_name] = arg.total_gas
 
     return gas_estimates
 
 
+def build_dispatch_gas_estimates(lll_nodes: LLLnode) -> dict:
+    # worst-case gas used by the dispatcher to reach each public function
+    dispatch_gas: dict = {}
+    for arg in _get_function_nodes(lll_nodes):
+        if arg.dispatch_gas is not None:
+            dispatch_gas[arg.func_name] = max(arg.dispatch_gas.values())
+
+    return dispatch_gas
+
+
+def build_expected_dispatch_gas(
+    lll_nodes: LLLnode, weights: Dict[int, float]
+) -> Optional[float]:
+    # mean gas used by the dispatcher for calls weighted as `{method id: weight}`
+    dispatch_gas: dict = {}
+    for arg in _get_function_nodes(lll_nodes):
+        if arg.dispatch_gas is not None:
+            dispatch_gas.update(arg.dispatch_gas)
+
+    return get_expected_gas(dispatch_gas, weights)
+
+
 def expand_source_map(compressed_map: str) -> list:
     """
     Expand a compressed source map string.
@@ -52,3 +81,62 @@ def _expand_row(row):
         if value:
             result[i] = value if i == 3 else int(value)
     return result
+
+
+def run_jobs(fn: Callable, jobs: Sequence[Tuple], workers: int = 1) -> Iterator:
+    """
+    Call a function once for each job, yielding the results in order.
+
+    With more than one worker the jobs are executed in a process pool. Results,
+    exceptions and warnings are still delivered in job order, as though each job
+    had been run in the current process once the previous result was consumed.
+
+    Arguments
+    ---------
+    fn : Callable
+        Module-level function to call. Must be picklable, as must its arguments
+        and return value.
+    jobs : Sequence[Tuple]
+        Positional arguments for each call to `fn`.
+    workers : int, optional
+        Number of worker processes. Defaults to 1, calling `fn` in the current
+        process.
+
+    Yields
+    ------
+    The return value of `fn` for each job. If `fn` raises, the exception is raised
+    from the generator and the remaining jobs are cancelled.
+    """
+    if workers <= 1 or len(jobs) < 2:
+        for job in jobs:
+            yield fn(*job)
+        return
+
+    with ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+        futures = [executor.submit(_call_recording_warnings, fn, job) for job in jobs]
+        try:
+            for future in futures:
+                result, caught_warnings, exc = future.result()
+                for message, category, filename, lineno in caught_warnings:
+                    warnings.warn_explicit(message, category, filename, lineno)
+                if exc is not None:
+                    raise exc
+                yield result
+        finally:
+            # do not wait on pending jobs once the caller has stopped consuming
+            for future in futures:
+                future.cancel()
+
+
+def _call_recording_warnings(fn: Callable, job: Tuple) -> Tuple:
+    # warnings raised in a worker process would otherwise be printed by the
+    # worker, return them so they can be re-issued in the calling process
+    result, exc = None, None
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        try:
+            result = fn(*job)
+        except Exception as e:
+            exc = e
+    caught: List = [(i.message, i.category, i.filename, i.lineno) for i in caught_warnings]
+    return result, caught, exc
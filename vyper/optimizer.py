@@ -1,8 +1,21 @@
+import functools
 import operator
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
+from vyper import opcodes
+from vyper.compile_lll import CLAMP_OP_NAMES, NEGATED_COMPARISONS
 from vyper.parser.parser_utils import LLLnode
-from vyper.utils import LOADED_LIMITS
+from vyper.utils import LOADED_LIMITS, MemoryPositions
 
 
 def get_int_at(args: List[LLLnode], pos: int, signed: bool = False) -> Optional[int]:
@@ -28,12 +41,77 @@ def int_at(args: List[LLLnode], pos: int, signed: bool = False) -> Optional[int]
     return get_int_at(args, pos, signed) is not None
 
 
-arith = {
-    "add": (operator.add, '+'),
-    "sub": (operator.sub, '-'),
-    "mul": (operator.mul, '*'),
-    "div": (operator.floordiv, '/'),
-    "mod": (operator.mod, '%'),
+def _signed(x: int) -> int:
+    return ((x + 2**255) % 2**256) - 2**255
+
+
+def _sdiv(x: int, y: int) -> int:
+    x, y = _signed(x), _signed(y)
+    if y == 0:
+        return 0
+    sign = -1 if (x < 0) != (y < 0) else 1
+    return sign * (abs(x) // abs(y))
+
+
+def _smod(x: int, y: int) -> int:
+    x, y = _signed(x), _signed(y)
+    if y == 0:
+        return 0
+    sign = -1 if x < 0 else 1
+    return sign * (abs(x) % abs(y))
+
+
+def _signextend(b: int, x: int) -> int:
+    if b >= 31:
+        return x
+    bits = 8 * (b + 1)
+    x %= 2**bits
+    return x - 2**bits if x >= 2**(bits - 1) else x
+
+
+def _byte(i: int, x: int) -> int:
+    return (x >> (248 - i * 8)) & 0xff if i < 32 else 0
+
+
+def _ceil32(x: int) -> int:
+    return x + 31 - (x - 1) % 32
+
+
+# EVM semantics of the opcodes that are folded when all of their arguments are
+# constant, their number of arguments, and the symbol used to annotate the
+# result. Arguments are given as unsigned integers.
+arith: Dict[str, Tuple[Callable[..., int], int, Optional[str]]] = {
+    "add": (operator.add, 2, '+'),
+    "sub": (operator.sub, 2, '-'),
+    "mul": (operator.mul, 2, '*'),
+    "div": (lambda x, y: x // y if y else 0, 2, '/'),
+    "sdiv": (_sdiv, 2, '/'),
+    "mod": (lambda x, y: x % y if y else 0, 2, '%'),
+    "smod": (_smod, 2, '%'),
+    "exp": (lambda x, y: pow(x, y, 2**256), 2, '**'),
+    "addmod": (lambda x, y, z: (x + y) % z if z else 0, 3, None),
+    "mulmod": (lambda x, y, z: (x * y) % z if z else 0, 3, None),
+    "signextend": (_signextend, 2, None),
+    "lt": (lambda x, y: int(x < y), 2, '<'),
+    "gt": (lambda x, y: int(x > y), 2, '>'),
+    "slt": (lambda x, y: int(_signed(x) < _signed(y)), 2, '<'),
+    "sgt": (lambda x, y: int(_signed(x) > _signed(y)), 2, '>'),
+    "le": (lambda x, y: int(x <= y), 2, '<='),
+    "ge": (lambda x, y: int(x >= y), 2, '>='),
+    "sle": (lambda x, y: int(_signed(x) <= _signed(y)), 2, '<='),
+    "sge": (lambda x, y: int(_signed(x) >= _signed(y)), 2, '>='),
+    "eq": (lambda x, y: int(x == y), 2, '=='),
+    "ne": (lambda x, y: int(x != y), 2, '!='),
+    "iszero": (lambda x: int(x == 0), 1, None),
+    "and": (operator.and_, 2, '&'),
+    "or": (operator.or_, 2, '|'),
+    "xor": (operator.xor, 2, '^'),
+    "not": (lambda x: 2**256 - 1 - x, 1, None),
+    "byte": (_byte, 2, None),
+    "shl": (lambda s, x: x << s if s < 256 else 0, 2, None),
+    "shr": (lambda s, x: x >> s if s < 256 else 0, 2, None),
+    "sar": (lambda s, x: _signed(x) >> min(s, 256), 2, None),
+    "ceil32": (_ceil32, 1, None),
 }
 
 
@@ -53,178 +131,793 @@ def has_cond_arg(node):
     return node.value in ['if', 'if_unchecked', 'assert', 'assert_reason']
 
 
-def optimize(node: LLLnode) -> LLLnode:
-    argz = [optimize(arg) for arg in node.args]
-    if node.value in arith and int_at(argz, 0) and int_at(argz, 1):
-        left, right = get_int_at(argz, 0), get_int_at(argz, 1)
-        # `node.value in arith` implies that `node.value` is a `str`
-        calcer, symb = arith[str(node.value)]
-        new_value = calcer(left, right)
-        if argz[0].annotation and argz[1].annotation:
-            annotation = argz[0].annotation + symb + argz[1].annotation
-        elif argz[0].annotation or argz[1].annotation:
-            annotation = (
-                argz[0].annotation or str(left)
-            ) + symb + (
-                argz[1].annotation or str(right)
-            )
-        else:
-            annotation = ''
-        return LLLnode(
-            new_value,
-            [],
-            node.typ,
-            None,
-            node.pos,
-            annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    elif _is_constant_add(node, argz):
-        # `node.value in arith` implies that `node.value` is a `str`
-        calcer, symb = arith[str(node.value)]
-        if argz[0].annotation and argz[1].args[0].annotation:
-            annotation = argz[0].annotation + symb + argz[1].args[0].annotation
-        elif argz[0].annotation or argz[1].args[0].annotation:
-            annotation = (
-                argz[0].annotation or str(argz[0].value)
-            ) + symb + (
-                argz[1].args[0].annotation or str(argz[1].args[0].value)
-            )
-        else:
-            annotation = ''
-        return LLLnode(
-            "add",
-            [
-                LLLnode(int(argz[0].value) + int(argz[1].args[0].value), annotation=annotation),
-                argz[1].args[1],
-            ],
-            node.typ,
-            None,
-            annotation=node.annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    elif node.value == "add" and get_int_at(argz, 0) == 0:
-        return LLLnode(
-            argz[1].value,
-            argz[1].args,
-            node.typ,
-            node.location,
-            node.pos,
-            annotation=argz[1].annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    elif node.value == "add" and get_int_at(argz, 1) == 0:
-        return LLLnode(
-            argz[0].value,
-            argz[0].args,
-            node.typ,
-            node.location,
-            node.pos,
-            argz[0].annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    elif node.value == "clamp" and int_at(argz, 0) and int_at(argz, 1) and int_at(argz, 2):
-        if get_int_at(argz, 0, True) > get_int_at(argz, 1, True):  # type: ignore
-            raise Exception("Clamp always fails")
-        elif get_int_at(argz, 1, True) > get_int_at(argz, 2, True):  # type: ignore
-            raise Exception("Clamp always fails")
-        else:
-            return argz[1]
-    elif node.value == "clamp" and int_at(argz, 0) and int_at(argz, 1):
-        if get_int_at(argz, 0, True) > get_int_at(argz, 1, True):  # type: ignore
+class Rule:
+    """
+    An LLL rewrite rule.
+
+    Attributes
+    ----------
+    name : str
+        Name of the rule, used when counting rule hits.
+    values : Tuple[str, ...]
+        Values of the LLL nodes that the rule applies to.
+    fn : Callable[[LLLnode], bool]
+        Rewrites a node in place, returning `True` if the node was rewritten.
+        The arguments of the node are already optimized when it is called.
+    begin : str, optional
+        Oldest EVM version that the rule is valid for.
+    end : str, optional
+        Newest EVM version that the rule is valid for.
+    """
+
+    __slots__ = ('name', 'values', 'fn', 'begin', 'end')
+
+    def __init__(
+        self,
+        name: str,
+        values: Tuple[str, ...],
+        fn: Callable[[LLLnode], bool],
+        begin: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.values = values
+        self.fn = fn
+        self.begin = begin
+        self.end = end
+
+    def is_valid_for(self, evm_version: int) -> bool:
+        begin = min(opcodes.EVM_VERSIONS.values()) if self.begin is None else \
+            opcodes.EVM_VERSIONS[self.begin]
+        end = max(opcodes.EVM_VERSIONS.values()) if self.end is None else \
+            opcodes.EVM_VERSIONS[self.end]
+        return begin <= evm_version <= end
+
+
+# Registered rules, in the order that they are tried
+RULES: List[Rule] = []
+
+
+def rule(*values: str, begin: Optional[str] = None, end: Optional[str] = None) -> Callable:
+    """
+    Register a function as a rewrite rule for LLL nodes with the given values.
+    """
+    def decorator(fn: Callable[[LLLnode], bool]) -> Callable[[LLLnode], bool]:
+        RULES.append(Rule(fn.__name__.lstrip('_'), values, fn, begin, end))
+        _get_rules.cache_clear()
+        return fn
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=None)
+def _get_rules(evm_version: int) -> Dict[str, Tuple[Rule, ...]]:
+    # Rules that are valid for an EVM version, by the value of the LLL node
+    rules: Dict[str, Tuple[Rule, ...]] = {}
+    for r in RULES:
+        if r.is_valid_for(evm_version):
+            for value in r.values:
+                rules[value] = rules.get(value, ()) + (r,)
+    return rules
+
+
+def _rewrite(node: LLLnode, value: Union[str, int], args: List[LLLnode], **kwargs: Any) -> None:
+    # Rewrite a node in place. Other nodes may share the children of `node`,
+    # so the list of arguments is replaced rather than modified.
+    node.value = value
+    node.args = args
+    node.mutable = True
+    for key, attr in kwargs.items():
+        setattr(node, key, attr)
+
+
+def _replace(node: LLLnode, other: LLLnode) -> None:
+    # Make `node` a copy of `other`
+    for attr in LLLnode.__slots__:
+        setattr(node, attr, getattr(other, attr))
+    node.args = list(other.args)
+
+
+def _arith_annotation(
+    symb: str,
+    left: LLLnode,
+    right: LLLnode,
+    left_value: Union[str, int, None],
+    right_value: Union[str, int, None],
+) -> str:
+    if left.annotation and right.annotation:
+        return left.annotation + symb + right.annotation
+    elif left.annotation or right.annotation:
+        return (left.annotation or str(left_value)) + symb + (right.annotation or str(right_value))
+    else:
+        return ''
+
+
+def _to_literal(value: int) -> int:
+    # Wrap a result to 256 bits. Negative results are kept as they are if
+    # they fit, as the compiler accepts them as literals.
+    if -2**255 < value < 2**256:
+        return value
+    return value % 2**256
+
+
+def _get_power_of_two(args: List[LLLnode], pos: int) -> Optional[int]:
+    value = get_int_at(args, pos)
+    if value is None or value <= 0 or value & (value - 1):
+        return None
+    return value.bit_length() - 1
+
+
+@rule(*arith)
+def _fold_arithmetic(node: LLLnode) -> bool:
+    args = node.args
+    # `node.value in arith` implies that `node.value` is a `str`
+    calcer, arity, symb = arith[str(node.value)]
+    if len(args) != arity or not all(int_at(args, i) for i in range(arity)):
+        return False
+    values = [get_int_at(args, i) for i in range(arity)]
+    result = calcer(*(i % 2**256 for i in values))  # type: ignore
+    if symb is not None:
+        annotation = _arith_annotation(symb, args[0], args[1], values[0], values[1])
+    elif any(arg.annotation for arg in args):
+        inner = ", ".join(arg.annotation or str(v) for arg, v in zip(args, values))
+        annotation = f"{node.value}({inner})"
+    else:
+        annotation = ''
+    _rewrite(node, _to_literal(result), [], location=None, annotation=annotation)
+    return True
+
+
+@rule("add")
+def _fold_constant_add(node: LLLnode) -> bool:
+    args = node.args
+    if not _is_constant_add(node, args):
+        return False
+    inner = args[1].args
+    annotation = _arith_annotation('+', args[0], inner[0], args[0].value, inner[0].value)
+    _rewrite(
+        node,
+        "add",
+        [LLLnode(int(args[0].value) + int(inner[0].value), annotation=annotation), inner[1]],
+        location=None,
+        pos=None,
+    )
+    return True
+
+
+@rule("add")
+def _remove_add_zero(node: LLLnode) -> bool:
+    args = node.args
+    if get_int_at(args, 0) == 0:
+        other = args[1]
+    elif get_int_at(args, 1) == 0:
+        other = args[0]
+    else:
+        return False
+    _rewrite(node, other.value, list(other.args), annotation=other.annotation)
+    return True
+
+
+@rule("clamp")
+def _fold_clamp(node: LLLnode) -> bool:
+    args = node.args
+    if not (int_at(args, 0) and int_at(args, 1)):
+        return False
+    if get_int_at(args, 0, True) > get_int_at(args, 1, True):  # type: ignore
+        raise Exception("Clamp always fails")
+    if int_at(args, 2):
+        if get_int_at(args, 1, True) > get_int_at(args, 2, True):  # type: ignore
             raise Exception("Clamp always fails")
+        _replace(node, args[1])
+    else:
+        _rewrite(node, "clample", [args[1], args[2]])
+    return True
+
+
+@rule("clamp_nonzero")
+def _fold_clamp_nonzero(node: LLLnode) -> bool:
+    args = node.args
+    if not int_at(args, 0):
+        return False
+    if get_int_at(args, 0) == 0:
+        raise Exception("Clamp always fails")
+    _rewrite(node, args[0].value, [])
+    return True
+
+
+# [eq, x, 0] is the same as [iszero, x].
+@rule("eq")
+def _eq_zero_to_iszero(node: LLLnode) -> bool:
+    if not (int_at(node.args, 1) and node.args[1].value == 0):
+        return False
+    _rewrite(node, "iszero", [node.args[0]])
+    return True
+
+
+# [ne, x, y] has the same truthyness as [xor, x, y]
+# rewrite 'ne' as 'xor' in places where truthy is accepted.
+@rule('if', 'if_unchecked', 'assert', 'assert_reason')
+def _ne_to_xor(node: LLLnode) -> bool:
+    if node.args[0].value != 'ne':
+        return False
+    # the `ne` node may be used elsewhere, where it cannot be rewritten
+    xor = LLLnode.from_list(['xor'] + node.args[0].args)  # type: ignore
+    _rewrite(node, node.value, [xor] + node.args[1:], add_gas_estimate=0, _valency=None)
+    return True
+
+
+# Functions are kept as a node of their own, gas estimates are read from it
+def _can_flatten(node: LLLnode) -> bool:
+    return node.value == "seq" and node.func_name is None
+
+
+@rule("seq")
+def _flatten_seq(node: LLLnode) -> bool:
+    if not any(_can_flatten(arg) for arg in node.args):
+        return False
+    xs: List[LLLnode] = []
+    for arg in node.args:
+        if _can_flatten(arg):
+            xs.extend(arg.args)
         else:
-            return LLLnode(
-                "clample",
-                [argz[1], argz[2]],
-                node.typ,
-                node.location,
-                node.pos,
-                node.annotation,
-                add_gas_estimate=node.add_gas_estimate,
-                valency=node.valency,
-            )
-    elif node.value == "clamp_nonzero" and int_at(argz, 0):
-        if get_int_at(argz, 0) != 0:
-            return LLLnode(
-                argz[0].value,
-                [],
-                node.typ,
-                node.location,
-                node.pos,
-                node.annotation,
-                add_gas_estimate=node.add_gas_estimate,
-                valency=node.valency,
-            )
-        else:
-            raise Exception("Clamp always fails")
-    # [eq, x, 0] is the same as [iszero, x].
-    elif node.value == 'eq' and int_at(argz, 1) and argz[1].value == 0:
-        return LLLnode(
-            'iszero',
-            [argz[0]],
-            node.typ,
-            node.location,
-            node.pos,
-            node.annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    # [ne, x, y] has the same truthyness as [xor, x, y]
-    # rewrite 'ne' as 'xor' in places where truthy is accepted.
-    elif has_cond_arg(node) and argz[0].value == 'ne':
-        argz[0] = LLLnode.from_list(['xor'] + argz[0].args)  # type: ignore
-        return LLLnode.from_list(
-                [node.value] + argz,  # type: ignore
-                typ=node.typ,
-                location=node.location,
-                pos=node.pos,
-                annotation=node.annotation,
-                # let from_list handle valency and gas_estimate
-                )
-    elif node.value == "seq":
-        xs: List[Any] = []
-        for arg in argz:
-            if arg.value == "seq":
-                xs.extend(arg.args)
+            xs.append(arg)
+    _rewrite(node, node.value, xs)
+    return True
+
+
+# [iszero, [iszero, [iszero, x]]] is the same as [iszero, x].
+@rule("iszero")
+def _remove_double_iszero(node: LLLnode) -> bool:
+    inner = node.args[0]
+    if not (inner.value == "iszero" and inner.args[0].value == "iszero"):
+        return False
+    _replace(node, inner.args[0])
+    return True
+
+
+# [iszero, [iszero, x]] has the same truthyness as x.
+@rule('if', 'if_unchecked', 'assert', 'assert_reason')
+def _remove_double_iszero_cond(node: LLLnode) -> bool:
+    cond = node.args[0]
+    if not (cond.value == "iszero" and cond.args[0].value == "iszero"):
+        return False
+    _rewrite(node, node.value, [cond.args[0].args[0]] + node.args[1:])
+    return True
+
+
+# [mod, x, 2**n] is the same as [and, x, 2**n - 1].
+@rule("mod")
+def _mod_to_and(node: LLLnode) -> bool:
+    n = _get_power_of_two(node.args, 1)
+    if n is None:
+        return False
+    _rewrite(node, "and", [node.args[0], LLLnode(2**n - 1)])
+    return True
+
+
+# [mul, x, 2**n] is the same as [shl, n, x].
+@rule("mul", begin="constantinople")
+def _mul_to_shl(node: LLLnode) -> bool:
+    args = node.args
+    for pos in (1, 0):
+        n = _get_power_of_two(args, pos)
+        if n:
+            _rewrite(node, "shl", [LLLnode(n), args[1 - pos]])
+            return True
+    return False
+
+
+# [div, x, 2**n] is the same as [shr, n, x].
+@rule("div", begin="constantinople")
+def _div_to_shr(node: LLLnode) -> bool:
+    n = _get_power_of_two(node.args, 1)
+    if not n:
+        return False
+    _rewrite(node, "shr", [LLLnode(n), node.args[0]])
+    return True
+
+
+# [exp, 2, n] is the same as [shl, n, 1].
+@rule("exp", begin="constantinople")
+def _exp_to_shl(node: LLLnode) -> bool:
+    if get_int_at(node.args, 0) != 2:
+        return False
+    _rewrite(node, "shl", [node.args[1], LLLnode(1)])
+    return True
+
+
+# Common subexpression elimination
+#
+# Repeated subexpressions are evaluated once, bound to a stack variable with `with`,
+# and replaced by a reference to the variable. This is only done within straight-line
+# code, i.e. a statement or a run of consecutive statements without any control flow.
+
+# Opcodes whose result only depends on their arguments and the transaction
+PURE_OPCODES = {
+    'ADD', 'MUL', 'SUB', 'DIV', 'SDIV', 'MOD', 'SMOD', 'ADDMOD', 'MULMOD', 'EXP',
+    'SIGNEXTEND', 'LT', 'GT', 'SLT', 'SGT', 'EQ', 'ISZERO', 'AND', 'OR', 'XOR', 'NOT',
+    'BYTE', 'SHL', 'SHR', 'SAR', 'ADDRESS', 'ORIGIN', 'CALLER', 'CALLVALUE',
+    'CALLDATALOAD', 'CALLDATASIZE', 'CODESIZE', 'GASPRICE', 'BLOCKHASH', 'COINBASE',
+    'TIMESTAMP', 'NUMBER', 'DIFFICULTY', 'GASLIMIT', 'CHAINID',
+}
+# sha3_32 and sha3_64 use scratch space in memory
+MEMORY_WRITES = {
+    'MSTORE', 'MSTORE8', 'CALLDATACOPY', 'CODECOPY', 'EXTCODECOPY', 'RETURNDATACOPY',
+    'CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL', 'CREATE', 'CREATE2',
+    'SHA3_32', 'SHA3_64',
+}
+STORAGE_WRITES = {
+    'SSTORE', 'CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL', 'CREATE', 'CREATE2',
+    'SELFDESTRUCT',
+}
+# LLL nodes that jump, or that use the stack outside of their own arguments
+CONTROL_FLOW = {
+    'if', 'if_unchecked', 'repeat', 'continue', 'break', 'lll', 'seq_unchecked', 'goto',
+    'label', 'debugger', 'pc_debugger', 'assert_reason', 'codeload', 'jump', 'jumpi',
+    'jumpdest', 'jumptable', 'gosub',
+}
+# Height of the stack when each argument of a pseudo-opcode is evaluated, relative to
+# the height of the node itself. `None` marks a variable name. Other pseudo-opcodes
+# evaluate all of their arguments at the height of the node.
+ARG_HEIGHTS: Dict[str, Tuple[Optional[int], ...]] = {
+    'with': (None, 0, 1),
+    'set': (None, 0),
+    'clamp': (0, 1, 3),
+    'uclamp': (0, 1, 3),
+    'sha3_64': (0, 1),
+    'repeat': (0, 1, 0, 2),
+    'codeload': (1,),
+    'goto': (None,),
+    'gosub': (None,),
+    'label': (None,),
+}
+ARG_HEIGHTS.update((name, (0, 1)) for name in CLAMP_OP_NAMES)
+
+READS_MEMORY = 1
+READS_STORAGE = 2
+USES_SCRATCH = 4
+
+# The deepest stack item that can be reached with DUP or SWAP
+MAX_STACK_DEPTH = 16
+
+
+class _Expression:
+    # A subexpression that may be eliminated
+    __slots__ = ('flags', 'gas', 'size', 'variables')
+
+    def __init__(self, flags: int, gas: int, size: int, variables: frozenset) -> None:
+        self.flags = flags
+        self.gas = gas
+        self.size = size
+        self.variables = variables
+
+
+class _Location:
+    # Where a node is in the tree, for nodes that appear exactly once
+    __slots__ = ('node', 'parent', 'index', 'depth', 'height', 'env', 'statement')
+
+    def __init__(
+        self,
+        node: LLLnode,
+        parent: Optional['_Location'],
+        index: int,
+        depth: int,
+        height: int,
+        env: Dict[Union[str, int], int],
+        statement: Optional[int],
+    ) -> None:
+        self.node = node
+        self.parent = parent
+        self.index = index
+        self.depth = depth
+        self.height = height
+        self.env = env
+        self.statement = statement
+
+    def get_parent(self) -> '_Location':
+        # only the root of the tree has no parent, and it is never an occurrence
+        assert self.parent is not None, "The root of the tree has no parent"
+        return self.parent
+
+
+def _get_arg_heights(node: LLLnode) -> List[Optional[int]]:
+    value = node.value
+    if not isinstance(value, str) or not node.args:
+        return []
+    if value.upper() in opcodes.get_opcodes() or value in NEGATED_COMPARISONS:
+        # opcode arguments are evaluated last to first
+        return list(range(len(node.args) - 1, -1, -1))
+    heights = ARG_HEIGHTS.get(value)
+    if heights is None:
+        return [0] * len(node.args)
+    return list(heights[:len(node.args)])
+
+
+def _is_variable(value: Union[str, int]) -> bool:
+    return (
+        isinstance(value, str) and
+        value.upper() not in opcodes.get_comb_opcodes() and
+        value not in CONTROL_FLOW and
+        value != '~codelen' and
+        not value.startswith('_sym_')
+    )
+
+
+def _is_straight(node: LLLnode, straight: Dict[int, bool]) -> bool:
+    # Check whether a node is straight-line code, given its arguments
+    value = node.value
+    if not isinstance(value, str):
+        return True
+    if value.lower() in CONTROL_FLOW:
+        return False
+    opcode = opcodes.get_opcodes().get(value.upper())
+    if opcode is not None and opcode[1] != len(node.args):
+        # uses values that were already on the stack
+        return False
+    for i, arg in enumerate(node.args):
+        if not straight[id(arg)]:
+            return False
+        is_statement = value == 'seq' or (value == 'with' and i == 2)
+        if not is_statement and not arg.valency and not (value in ('with', 'set') and i == 0):
+            return False
+    return True
+
+
+def _get_expression(node: LLLnode, exprs: Dict[int, _Expression]) -> Optional[_Expression]:
+    # Check whether a node may be eliminated, given its arguments
+    value = node.value
+    if isinstance(value, int):
+        return _Expression(0, 3, 1 + max(1, ((value % 2**256).bit_length() + 7) // 8), frozenset())
+    if not node.args:
+        opcode = opcodes.get_opcodes().get(value.upper())
+        if value.upper() in PURE_OPCODES and opcode[1] == 0:  # type: ignore
+            return _Expression(0, opcode[3], 1, frozenset())  # type: ignore
+        if value == '~codelen' or value.startswith('_sym_'):
+            return _Expression(0, 3, 3, frozenset())
+        if _is_variable(value):
+            return _Expression(0, 3, 1, frozenset([value]))
+        return None
+
+    args = [exprs.get(id(arg)) for arg in node.args]
+    if None in args:
+        return None
+    flags = 0
+    name = value.upper()
+    if name in PURE_OPCODES or name in ('MLOAD', 'SLOAD'):
+        if opcodes.get_opcodes()[name][1] != len(args):
+            return None
+        gas, size = opcodes.get_opcodes()[name][3], 1
+        if name == 'MLOAD':
+            flags = READS_MEMORY
+        elif name == 'SLOAD':
+            flags = READS_STORAGE
+    elif value in NEGATED_COMPARISONS and len(args) == 2:
+        gas, size = 6, 2
+    elif value == 'ceil32' and len(args) == 1:
+        gas, size = 30, 15
+    elif value == 'sha3_32' and len(args) == 1:
+        gas, size, flags = 48, 8, USES_SCRATCH
+    elif value == 'sha3_64' and len(args) == 2:
+        gas, size, flags = 63, 11, USES_SCRATCH
+    else:
+        return None
+    variables: frozenset = frozenset()
+    for arg in args:
+        flags |= arg.flags  # type: ignore
+        gas += arg.gas  # type: ignore
+        size += arg.size  # type: ignore
+        variables |= arg.variables  # type: ignore
+    return _Expression(flags, gas, size, variables)
+
+
+def _find_common_subexpressions(root: LLLnode) -> Tuple[
+    Dict[Tuple, Dict[int, List[_Location]]],
+    Dict[int, _Location],
+    Dict[int, int],
+    Dict[int, _Expression],
+    Set[str],
+]:
+    # Find the candidates for elimination within each block of straight-line code
+    keys: Dict[Tuple, int] = {}
+    node_keys: Dict[int, int] = {}
+    straight: Dict[int, bool] = {}
+    exprs: Dict[int, _Expression] = {}
+    refcounts: Dict[int, int] = {}
+    names: Set[str] = set()
+
+    stack = [(root, False)]
+    while stack:
+        node, is_ready = stack.pop()
+        if id(node) in node_keys:
+            continue
+        if not is_ready:
+            stack.append((node, True))
+            stack.extend((arg, False) for arg in node.args)
+            continue
+        for arg in node.args:
+            refcounts[id(arg)] = refcounts.get(id(arg), 0) + 1
+        key = (node.value, tuple(node_keys[id(arg)] for arg in node.args))
+        node_keys[id(node)] = keys.setdefault(key, len(keys))
+        straight[id(node)] = _is_straight(node, straight)
+        expr = _get_expression(node, exprs)
+        if expr is not None:
+            exprs[id(node)] = expr
+        if isinstance(node.value, str):
+            names.add(node.value)
+
+    # occurrences of each candidate by block, then by key
+    blocks: Dict[Tuple, Dict[int, List[_Location]]] = {}
+    locations: Dict[int, _Location] = {}
+
+    # (node, location of parent, index in parent, height, env, is unique, block)
+    cse_stack: List[Tuple[
+        LLLnode, Optional[_Location], int, int, Dict[Union[str, int], int], bool, Optional[Tuple]
+    ]] = [(root, None, 0, 0, {}, True, None)]
+    while cse_stack:
+        node, parent, index, height, env, unique, block = cse_stack.pop()
+        unique = unique and refcounts.get(id(node), 1) == 1
+        location = None
+        if unique:
+            depth = 0 if parent is None else parent.depth + 1
+            statement = parent.statement if block and parent is not None else None
+            location = _Location(node, parent, index, depth, height, env, statement)
+            locations[id(node)] = location
+            if block is not None and location.statement is None:
+                location.statement = id(node)
+            if block is not None and node.args and id(node) in exprs:
+                blocks.setdefault(block, {}).setdefault(node_keys[id(node)], []).append(location)
+
+        arg_heights = _get_arg_heights(node)
+        run = 0
+        for i, arg in enumerate(node.args):
+            offset = arg_heights[i]
+            if offset is None:
+                continue
+            arg_env = env
+            if node.value == 'with' and i == 2:
+                arg_env = {**env, node.args[0].value: height}
+            arg_height = height + offset
+            if node.value == 'lll' and i == 0:
+                arg_height, arg_env = 0, {}
+
+            if not straight[id(arg)]:
+                arg_block = None
+                run += 1
+            elif block is not None:
+                arg_block = block
+            elif node.value == 'seq' and location is not None:
+                arg_block = (id(node), run)
             else:
-                xs.append(arg)
-        return LLLnode(
-            node.value,
-            xs,
-            node.typ,
-            node.location,
-            node.pos,
-            node.annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
-    elif node.total_gas is not None:
-        o = LLLnode(
+                arg_block = (id(arg),)
+            cse_stack.append((arg, location, i, arg_height, arg_env, unique, arg_block))
+
+    return blocks, locations, node_keys, exprs, names
+
+
+def _get_target(occurrences: List[_Location]) -> Tuple[_Location, int, int]:
+    # The lowest common ancestor of the occurrences, and the range of its arguments
+    # that contain them
+    lca = occurrences[0]
+    for location in occurrences[1:]:
+        while location.depth > lca.depth:
+            location = location.get_parent()
+        while lca.depth > location.depth:
+            lca = lca.get_parent()
+        while location is not lca:
+            location, lca = location.get_parent(), lca.get_parent()
+
+    indexes = []
+    for location in occurrences:
+        while location.parent is not lca:
+            location = location.get_parent()
+        indexes.append(location.index)
+    return lca, min(indexes), max(indexes)
+
+
+def _check_target(
+    nodes: List[LLLnode],
+    height: int,
+    env: Dict[Union[str, int], int],
+    expr: _Expression,
+    occurrences: Set[int],
+) -> bool:
+    # Check that the subexpression can be evaluated before `nodes`, and bound to a
+    # variable that is available throughout them
+    for name in expr.variables:
+        if env.get(name) is None:
+            return False
+
+    stack = [(node, height, env) for node in nodes]
+    while stack:
+        node, node_height, node_env = stack.pop()
+        if id(node) in occurrences:
+            if node_height - height + 1 > MAX_STACK_DEPTH:
+                return False
+            continue
+        value = node.value
+        if isinstance(value, int):
+            if expr.flags & USES_SCRATCH and value in (
+                MemoryPositions.FREE_VAR_SPACE, MemoryPositions.FREE_VAR_SPACE2
+            ):
+                return False
+            continue
+
+        if value in ('with', 'set'):
+            name = node.args[0].value
+            if name in expr.variables:
+                return False
+            variable = name if value == 'set' else None
+        elif not node.args and _is_variable(value):
+            variable = value
+        else:
+            variable = None
+        # variables that are bound outside of `nodes` are one item deeper in the stack
+        if variable is not None and node_env.get(variable, height) < height:
+            if node_height - node_env[variable] + 1 > MAX_STACK_DEPTH:
+                return False
+
+        opcode = value.upper()
+        if expr.flags & READS_MEMORY and opcode in MEMORY_WRITES:
+            return False
+        if expr.flags & READS_STORAGE and opcode in STORAGE_WRITES:
+            return False
+
+        for i, offset in enumerate(_get_arg_heights(node)):
+            if offset is None:
+                continue
+            arg_env = node_env
+            if value == 'with' and i == 2:
+                arg_env = {**node_env, node.args[0].value: node_height}
+            stack.append((node.args[i], node_height + offset, arg_env))
+    return True
+
+
+def _get_gain(expr: _Expression, count: int, valency: int) -> Tuple[int, int]:
+    # Gas and bytecode saved by evaluating a subexpression once, then using DUP.
+    # Binding the variable costs SWAP1 POP, or POP for a zerovalent body.
+    gas = (count - 1) * expr.gas - 3 * count - (5 if valency else 2)
+    size = (count - 1) * expr.size - count - (2 if valency else 1)
+    return gas, size
+
+
+def _eliminate(
+    occurrences: List[_Location], target: _Location, lo: int, hi: int, name: str
+) -> None:
+    init = occurrences[0].node
+    for location in occurrences:
+        node = location.node
+        parent = location.get_parent().node
+        variable = LLLnode(name, [], node.typ, node.location, node.pos, node.annotation)
+        # the list of arguments may be shared with other nodes
+        parent.args = parent.args[:location.index] + [variable] + parent.args[location.index + 1:]
+
+    node = target.node
+    if lo == 0 and hi == len(node.args) - 1:
+        body = LLLnode(
             node.value,
-            argz,
+            node.args,
             node.typ,
             node.location,
             node.pos,
             node.annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
+            node.mutable,
+            node.add_gas_estimate,
         )
-        o.total_gas = node.total_gas - node.gas + o.gas
-        o.func_name = node.func_name
-        return o
+        _rewrite(node, 'with', [LLLnode(name), init, body], annotation=None, _valency=None)
     else:
-        return LLLnode(
-            node.value,
-            argz,
-            node.typ,
-            node.location,
-            node.pos,
-            node.annotation,
-            add_gas_estimate=node.add_gas_estimate,
-            valency=node.valency,
-        )
+        # bind the variable around the statements that use it
+        statements = node.args[lo:hi + 1]
+        body = LLLnode('seq', statements, pos=statements[0].pos)
+        wrapper = LLLnode('with', [LLLnode(name), init, body], pos=statements[0].pos)
+        node.args = node.args[:lo] + [wrapper] + node.args[hi + 1:]
+
+
+def _eliminate_common_subexpressions(root: LLLnode, hits: Optional[Counter[str]] = None) -> None:
+    # Each pass eliminates at most one subexpression within each block, then the
+    # tree is analysed again
+    index = 0
+    while True:
+        blocks, locations, node_keys, exprs, names = _find_common_subexpressions(root)
+        is_changed = False
+        # nodes with arguments that were replaced in this pass
+        modified: Set[int] = set()
+        for candidates in blocks.values():
+            options = []
+            for occurrences in candidates.values():
+                if len(occurrences) < 2:
+                    continue
+                options.append(occurrences)
+                # if the subexpression cannot be eliminated throughout the block, it may
+                # still be possible within single statements
+                statements: Dict[Optional[int], List[_Location]] = {}
+                for location in occurrences:
+                    statements.setdefault(location.statement, []).append(location)
+                if len(statements) > 1:
+                    options.extend(i for i in statements.values() if len(i) > 1)
+
+            result = None
+            for occurrences in options:
+                expr = exprs[id(occurrences[0].node)]
+                target, lo, hi = _get_target(occurrences)
+                node = target.node
+                if node.value == 'seq':
+                    nodes, valency = node.args[lo:hi + 1], node.args[hi].valency
+                else:
+                    lo, hi = 0, len(node.args) - 1
+                    nodes, valency = [node], node.valency
+                gas, size = _get_gain(expr, len(occurrences), valency)
+                if gas <= 0 or size < 0 or (result is not None and gas <= result[0]):
+                    continue
+                parents = {id(target.node)} | {id(i.get_parent().node) for i in occurrences}
+                if not parents.isdisjoint(modified):
+                    # blocks within the same `seq` must wait for the next pass
+                    continue
+                if not _check_target(
+                    nodes, target.height, target.env, expr, {id(i.node) for i in occurrences}
+                ):
+                    continue
+                result = (gas, parents, (occurrences, target, lo, hi))
+
+            if result is not None:
+                modified |= result[1]
+                while f'_cse{index}' in names:
+                    index += 1
+                _eliminate(*result[2], f'_cse{index}')  # type: ignore
+                names.add(f'_cse{index}')
+                if hits is not None:
+                    hits['common_subexpression'] += 1
+                is_changed = True
+
+        if not is_changed:
+            return
+
+
+def optimize(node: LLLnode, hits: Optional[Counter[str]] = None) -> LLLnode:
+    """
+    Optimize LLL by applying the rewrite rules for the active EVM version,
+    until no more rules apply.
+
+    Nodes are rewritten in place, children before their parents. Nodes that are
+    not rewritten are left untouched.
+
+    Arguments
+    ---------
+    node : LLLnode
+        Top-level LLL node.
+    hits : Counter, optional
+        If given, the number of times each rule was applied is added to it.
+
+    Returns
+    -------
+    LLLnode
+        The optimized LLL, i.e. `node`.
+    """
+    rules = _get_rules(opcodes.active_evm_version)
+
+    # optimized nodes by id, these are kept so that the ids are not reused
+    done: Dict[int, LLLnode] = {}
+
+    stack = [(node, False)]
+    while stack:
+        lll, is_ready = stack.pop()
+        if id(lll) in done:
+            continue
+        if not is_ready:
+            stack.append((lll, True))
+            stack.extend((arg, False) for arg in lll.args)
+            continue
+
+        for r in rules.get(lll.value, ()):  # type: ignore
+            if r.fn(lll):
+                if hits is not None:
+                    hits[r.name] += 1
+                # optimize any new arguments, then try the rules again
+                stack.append((lll, False))
+                break
+        else:
+            # gas is estimated again for the optimized LLL
+            lll.gas = None  # type: ignore
+            done[id(lll)] = lll
+
+    _eliminate_common_subexpressions(node, hits)
+    return node
@@ -31,6 +31,9 @@ class Context:
         self.vars = vars or {}
         # Memory alloctor, keeps track of currently allocated memory.
         self.memory_allocator = memory_allocator
+        # Variables allocated by `new_variable`, in order, as (record, is internal).
+        # Their memory is released when they go out of scope.
+        self.allocated_vars = []
         # Global variables, in the form (name, storage location, type)
         self.globals = global_ctx._globals
         # ABI objects, in the form {classname: ABI JSON}
@@ -57,6 +60,8 @@ class Context:
         self.function_return_count = 0
         # Current block scope
         self.blockscopes = set()
+        # Statements being parsed, from the outermost to the innermost
+        self.statements = []
         # In assignment. Whether expression is currently evaluating an assignment expression.
         self.in_assignment = False
         # List of custom structs that have been defined.
@@ -65,6 +70,8 @@ class Context:
         self.constants = global_ctx._constants
         # Callback pointer to jump back to, used in private functions.
         self.callback_ptr = None
+        # Size of the memory used by the private functions called, None if unknown
+        self.callee_frame_size = 0
         self.is_private = is_private
         # method_id of current function
         self.method_id = method_id
@@ -111,15 +118,39 @@ class Context:
     @contextlib.contextmanager
     def make_blockscope(self, blockscope_id):
         self.blockscopes.add(blockscope_id)
+        start = len(self.allocated_vars)
         yield
         # Remove all variables that have specific blockscope_id attached.
         self.vars = {
             name: var_record for name, var_record in self.vars.items()
             if blockscope_id not in var_record.blockscopes
         }
+        # Release the memory of all variables allocated within the block.
+        self._release_variables(start, internal_only=False)
         # Remove block scopes
         self.blockscopes.remove(blockscope_id)
 
+    @contextlib.contextmanager
+    def statement_scope(self, stmt):
+        # Internal variables allocated while parsing a statement are not used
+        # after it, so their memory is released at the end of the statement.
+        start = len(self.allocated_vars)
+        self.statements.append(stmt)
+        yield
+        self.statements.pop()
+        self._release_variables(start, internal_only=True)
+
+    def _release_variables(self, start, internal_only):
+        kept = []
+        for var_record, is_internal in self.allocated_vars[start:]:
+            if internal_only and not is_internal:
+                kept.append((var_record, is_internal))
+                continue
+            if self.vars.get(var_record.name) is var_record:
+                del self.vars[var_record.name]
+            self.memory_allocator.release_memory(var_record.pos, var_record.size * 32)
+        self.allocated_vars[start:] = kept
+
     def is_valid_varname(self, name, pos):
         # Global context check first.
         if self.global_ctx.is_valid_varname(name, pos):
@@ -148,13 +179,15 @@ class Context:
         if internal_var or self.is_valid_varname(name, pos):
             var_size = 32 * get_size_of_type(typ)
             var_pos, _ = self.memory_allocator.increase_memory(var_size)
-            self.vars[name] = VariableRecord(
+            var_record = VariableRecord(
                 name=name,
                 pos=var_pos,
                 typ=typ,
                 mutable=True,
                 blockscopes=self.blockscopes.copy(),
             )
+            self.vars[name] = var_record
+            self.allocated_vars.append((var_record, internal_var))
             return var_pos
 
     def new_internal_variable(self, name, typ, pos=None):
@@ -0,0 +1,268 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from vyper.typing import DispatchProfile
+
+# Ways of finding the public function that matches the method id of a call:
+#   linear    - compare the method id of each function in the order they are defined
+#   binary    - binary search over the sorted method ids
+#   jumptable - jump to a bucket selected by some bits of the method id, then
+#               search the few method ids within the bucket
+DISPATCH_MODES = ("linear", "binary", "jumptable")
+DEFAULT_DISPATCH = "binary"
+
+# Gas used by the code of the dispatcher
+SELECTOR_GAS = 6  # PUSH1 0 MLOAD
+CHECK_GAS = 22  # PUSH4 <method id> DUP EQ PUSH <label> JUMPI
+JUMPDEST_GAS = 1
+INDEX_GAS = 9  # PUSH <mask> DUP AND
+SHIFT_GAS = 8  # PUSH <divisor> DIV
+JUMPTABLE_GAS = 34  # PUSH1 <entry size> MUL PUSH <table> ADD JUMP JUMPDEST PUSH <bucket> JUMP
+
+# Method ids that are compared in turn rather than split further. Splitting three
+# or fewer method ids does not lower the worst-case gas.
+MAX_LEAF_SIZE = 3
+# The jump table of a contract has at most 2**MAX_JUMPTABLE_BITS entries
+MAX_JUMPTABLE_BITS = 8
+# With a call profile, at most this many of the most called method ids are compared
+# before the search
+MAX_HOT_METHOD_IDS = 8
+
+
+def get_method_id_weights(
+    profile: DispatchProfile, method_ids: Mapping[str, int]
+) -> Dict[int, float]:
+    """
+    Resolve a call profile to the weight of each method id.
+
+    Arguments
+    ---------
+    profile : Dict
+        Relative number of calls, as `{key: weight}`. A key may be a method id
+        in hex, e.g. "0xa9059cbb", a function signature, e.g.
+        "transfer(address,uint256)", or a function name, e.g. "transfer". The
+        weight of a name is shared between the signatures of the function.
+        Keys that do not match a public function are ignored.
+    method_ids : Dict
+        Method ids of the public functions, as `{signature: method id}`.
+
+    Returns
+    -------
+    Dict
+        Weight of each method id, as `{method id: weight}`.
+    """
+    by_name: Dict[str, List[int]] = {}
+    for sig, method_id in method_ids.items():
+        by_name.setdefault(sig.partition("(")[0], []).append(method_id)
+    known_ids = set(method_ids.values())
+
+    weights: Dict[int, float] = {}
+    for key, weight in profile.items():
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+            raise ValueError(f"Invalid weight for {repr(key)} in call profile: {weight}")
+        parsed_id = _parse_method_id(key)
+        if key in method_ids:
+            matches = [method_ids[key]]
+        elif key in by_name:
+            matches = by_name[key]
+        elif parsed_id is not None and parsed_id in known_ids:
+            matches = [parsed_id]
+        else:
+            continue
+        for method_id in matches:
+            weights[method_id] = weights.get(method_id, 0) + weight / len(matches)
+    return weights
+
+
+def _parse_method_id(key: str) -> Optional[int]:
+    if not key.lower().startswith("0x"):
+        return None
+    try:
+        return int(key, 16)
+    except ValueError:
+        return None
+
+
+def get_expected_gas(
+    dispatch_gas: Mapping[int, int], weights: Mapping[int, float]
+) -> Optional[float]:
+    """
+    Return the mean gas used by the dispatcher for calls following a profile, or
+    `None` if no method id has a weight.
+    """
+    total = sum(weights.get(i, 0) for i in dispatch_gas)
+    if not total:
+        return None
+    return sum(gas * weights.get(i, 0) for i, gas in dispatch_gas.items()) / total
+
+
+def make_dispatcher(
+    method_ids: Sequence[int],
+    mode: str = DEFAULT_DISPATCH,
+    weights: Optional[Mapping[int, float]] = None,
+) -> Tuple[List[Any], Dict[int, int]]:
+    """
+    Generate LLL that jumps to the public function matching the method id of a call.
+
+    The method id is read from memory position 0. A public function is entered at
+    the label `pub_<method id>`, calls with an unknown method id jump to `fallback`.
+
+    Arguments
+    ---------
+    method_ids : Sequence[int]
+        Method ids of the public functions, in the order they are defined.
+    mode : str, optional
+        How the dispatcher searches for the method id, one of `DISPATCH_MODES`.
+    weights : Dict, optional
+        Relative number of calls to each method id, as `{method id: weight}`. If
+        given, the search is arranged to lower the mean gas used by those calls.
+        Method ids without a weight are assumed to be rarely called.
+
+    Returns
+    -------
+    list
+        LLL of the dispatcher.
+    Dict
+        Worst-case gas used by the dispatcher to reach each method id, as
+        `{method id: gas}`.
+    """
+    if mode not in DISPATCH_MODES:
+        raise ValueError(f"Unsupported dispatch {repr(mode)}")
+
+    dispatch_gas: Dict[int, int] = {}
+    if not method_ids:
+        return ['pass'], dispatch_gas
+
+    if not weights or not any(weights.get(i) for i in method_ids):
+        search = _search(method_ids, mode, None, SELECTOR_GAS, dispatch_gas)
+        return ['with', '_sel', ['mload', 0], search], dispatch_gas
+
+    # the most called method ids are compared before the search for the others, if
+    # that lowers the mean gas
+    hot = [i for i in _by_weight(method_ids, weights)[:MAX_HOT_METHOD_IDS] if weights.get(i)]
+    candidates = []
+    for count in range(len(hot) + 1):
+        gas: Dict[int, int] = {}
+        hot_search = _compare(hot[:count], SELECTOR_GAS, gas, fallthrough=True)
+        cold = [i for i in method_ids if i not in hot[:count]]
+        search = _search(cold, mode, weights, SELECTOR_GAS + CHECK_GAS * count, gas)
+        candidates.append((get_expected_gas(gas, weights), count, hot_search + [search], gas))
+
+    _, _, search, dispatch_gas = min(candidates, key=lambda i: i[:2])
+    return ['with', '_sel', ['mload', 0], search], dispatch_gas
+
+
+def _by_weight(method_ids: Sequence[int], weights: Mapping[int, float]) -> List[int]:
+    # the most called method ids first, otherwise in the given order
+    return sorted(method_ids, key=lambda i: -weights.get(i, 0))
+
+
+def _search(
+    method_ids: Sequence[int],
+    mode: str,
+    weights: Optional[Mapping[int, float]],
+    gas: int,
+    dispatch_gas: Dict[int, int],
+) -> List[Any]:
+    if not method_ids:
+        return ['goto', 'fallback']
+    if mode == "linear":
+        if weights:
+            method_ids = _by_weight(method_ids, weights)
+        return _compare(method_ids, gas, dispatch_gas)
+    if mode == "binary":
+        return _binary_search(sorted(method_ids), weights, gas, dispatch_gas)
+    return _jumptable(sorted(method_ids), weights, gas, dispatch_gas)
+
+
+def _compare(
+    method_ids: Sequence[int], gas: int, dispatch_gas: Dict[int, int], fallthrough: bool = False
+) -> List[Any]:
+    # compare the selector with each method id in turn
+    o: List[Any] = ['seq']
+    for method_id in method_ids:
+        gas += CHECK_GAS
+        dispatch_gas[method_id] = gas + JUMPDEST_GAS
+        o.append(['jumpi', f'_sym_pub_{method_id}', ['eq', '_sel', method_id]])
+    if not fallthrough:
+        o.append(['goto', 'fallback'])
+    return o
+
+
+def _split(method_ids: Sequence[int], weights: Optional[Mapping[int, float]]) -> int:
+    # Index of the first method id of the upper half. Without weights the method ids
+    # are split evenly, otherwise so that the weight of the two halves is balanced.
+    middle = len(method_ids) // 2
+    if not weights:
+        return middle
+
+    total = sum(weights.get(i, 0) for i in method_ids)
+    best, best_key, lower = middle, None, 0.0
+    for idx in range(1, len(method_ids)):
+        lower += weights.get(method_ids[idx - 1], 0)
+        key = (abs(total - 2 * lower), abs(idx - middle))
+        if best_key is None or key < best_key:
+            best, best_key = idx, key
+    return best
+
+
+def _binary_search(
+    method_ids: Sequence[int],
+    weights: Optional[Mapping[int, float]],
+    gas: int,
+    dispatch_gas: Dict[int, int],
+) -> List[Any]:
+    if len(method_ids) <= MAX_LEAF_SIZE:
+        if weights:
+            method_ids = _by_weight(method_ids, weights)
+        return _compare(method_ids, gas, dispatch_gas)
+
+    mid = _split(method_ids, weights)
+    pivot = method_ids[mid]
+    return [
+        'seq',
+        ['jumpi', f'_sym_dispatch_{pivot}', ['gt', '_sel', pivot - 1]],
+        _binary_search(method_ids[:mid], weights, gas + CHECK_GAS, dispatch_gas),
+        ['label', f'dispatch_{pivot}'],
+        _binary_search(method_ids[mid:], weights, gas + CHECK_GAS + JUMPDEST_GAS, dispatch_gas),
+    ]
+
+
+def _get_buckets(method_ids: Sequence[int], bits: int, shift: int) -> List[List[int]]:
+    buckets: List[List[int]] = [[] for _ in range(2**bits)]
+    for method_id in method_ids:
+        buckets[(method_id >> shift) % 2**bits].append(method_id)
+    return buckets
+
+
+def _jumptable(
+    method_ids: Sequence[int],
+    weights: Optional[Mapping[int, float]],
+    gas: int,
+    dispatch_gas: Dict[int, int],
+) -> List[Any]:
+    # at least one bucket for each method id. The bits of the method id used as the
+    # index into the table are those that leave the fewest method ids in one bucket.
+    bits = min(max(1, (len(method_ids) - 1).bit_length()), MAX_JUMPTABLE_BITS)
+    shift = min(
+        range(33 - bits),
+        key=lambda k: (max(len(i) for i in _get_buckets(method_ids, bits, k)), k)
+    )
+
+    index: Any = '_sel'
+    gas += INDEX_GAS + JUMPTABLE_GAS
+    if shift:
+        index = ['div', index, 2**shift]
+        gas += SHIFT_GAS
+
+    table: List[Any] = ['jumptable', ['and', index, 2**bits - 1]]
+    o: List[Any] = ['seq', table]
+    for i, bucket in enumerate(_get_buckets(method_ids, bits, shift)):
+        if not bucket:
+            table.append(['goto', 'fallback'])
+            continue
+        table.append(['goto', f'dispatch_bucket_{i}'])
+        o.extend([
+            ['label', f'dispatch_bucket_{i}'],
+            _binary_search(bucket, weights, gas + JUMPDEST_GAS, dispatch_gas),
+        ])
+    return o
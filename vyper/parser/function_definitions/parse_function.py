@@ -69,9 +69,8 @@ def parse_function(code, sigs, origcode, global_ctx, _vars=None):
             context=context,
         )
 
-    o.context = context
-    o.total_gas = o.gas + calc_mem_gas(
-        o.context.memory_allocator.get_next_memory_position()
-    )
+    o.total_gas = o.gas + calc_mem_gas(context.memory_allocator.size_of_mem)
+    if context.callee_frame_size is not None:
+        o.frame_size = max(context.memory_allocator.size_of_mem, context.callee_frame_size)
     o.func_name = sig.name
     return o
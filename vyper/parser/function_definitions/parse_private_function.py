@@ -7,7 +7,7 @@ from vyper.parser.expr import Expr
 from vyper.parser.function_definitions.utils import (
     get_default_names_to_set,
     get_nonreentrant_lock,
-    get_sig_statements,
+    get_sig_label,
     make_unpacker,
 )
 from vyper.parser.lll_node import LLLnode
@@ -19,18 +19,20 @@ from vyper.types.types import BaseType, ByteArrayLike, get_size_of_type
 from vyper.utils import MemoryPositions
 
 
-def get_private_arg_copier(total_size: int, memory_dest: int) -> List[Any]:
+def get_private_arg_copier(total_size: int, memory_dest: int, reverse: bool = False) -> List[Any]:
     """
     Copy arguments.
     For private functions, MSTORE arguments and callback pointer from the stack.
 
     :param  total_size: total size to copy
     :param  memory_dest: base memory position to copy to
+    :param  reverse: pop the last word first
     :return: LLL list that copies total_size of memory
     """
 
     copier: List[Any] = ['seq']
-    for pos in range(0, total_size, 32):
+    positions = range(0, total_size, 32)
+    for pos in reversed(positions) if reverse else positions:
         copier.append(['mstore', memory_dest + pos, 'pass'])
     return copier
 
@@ -90,9 +92,11 @@ def parse_private_function(code: ast.FunctionDef,
         copier = ['pass']
         clampers.append(LLLnode.from_list(copier))
     elif sig.total_default_args == 0:
+        # with the stack convention, the last argument is on top of the stack
         copier = get_private_arg_copier(
             total_size=sig.base_copy_size,
-            memory_dest=MemoryPositions.RESERVED_MEMORY
+            memory_dest=MemoryPositions.RESERVED_MEMORY,
+            reverse=sig.uses_stack_convention(),
         )
         clampers.append(LLLnode.from_list(copier))
 
@@ -139,7 +143,7 @@ def parse_private_function(code: ast.FunctionDef,
         sig_chain: List[Any] = ['seq']
 
         for default_sig in default_sigs:
-            sig_compare, private_label = get_sig_statements(default_sig, getpos(code))
+            private_label = get_sig_label(default_sig, getpos(code))
 
             # Populate unset default variables
             set_defaults = []
@@ -204,7 +208,7 @@ def parse_private_function(code: ast.FunctionDef,
                 default_copiers.append(0)  # for over arching seq, POP
 
             sig_chain.append([
-                'if', sig_compare,
+                'if', 0,  # can only be jumped into
                 ['seq',
                     private_label,
                     LLLnode.from_list([
@@ -240,11 +244,10 @@ def parse_private_function(code: ast.FunctionDef,
 
     else:
         # Function without default parameters.
-        sig_compare, private_label = get_sig_statements(sig, getpos(code))
+        private_label = get_sig_label(sig, getpos(code))
         o = LLLnode.from_list(
             [
-                'if',
-                sig_compare,
+                'if', 0,  # can only be jumped into
                 ['seq'] + [private_label] + nonreentrant_pre + clampers + [
                     parse_body(c, context)
                     for c
@@ -8,7 +8,7 @@ from vyper.parser.expr import Expr
 from vyper.parser.function_definitions.utils import (
     get_default_names_to_set,
     get_nonreentrant_lock,
-    get_sig_statements,
+    get_sig_label,
 )
 from vyper.parser.global_context import GlobalContext
 from vyper.parser.lll_node import LLLnode
@@ -64,7 +64,7 @@ def parse_public_function(code: ast.FunctionDef,
 
     :param sig: the FuntionSignature
     :param code: ast of function
-    :return: full sig compare & function body
+    :return: function body, entered at the label of the signature
     """
 
     validate_public_function(code, sig, context.global_ctx)
@@ -153,7 +153,7 @@ def parse_public_function(code: ast.FunctionDef,
             sig_chain: List[Any] = ['seq']
 
             for default_sig in default_sigs:
-                sig_compare, _ = get_sig_statements(default_sig, getpos(code))
+                sig_label = get_sig_label(default_sig, getpos(code))
 
                 # Populate unset default variables
                 set_defaults = []
@@ -210,11 +210,11 @@ def parse_public_function(code: ast.FunctionDef,
                     default_copiers.append(0)  # for over arching seq, POP
 
                 sig_chain.append([
-                    'if', sig_compare,
-                    ['seq',
-                        ['seq'] + set_defaults if set_defaults else ['pass'],
-                        ['seq_unchecked'] + default_copiers if default_copiers else ['pass'],
-                        ['goto', function_routine]]
+                    'seq',
+                    sig_label,
+                    ['seq'] + set_defaults if set_defaults else ['pass'],
+                    ['seq_unchecked'] + default_copiers if default_copiers else ['pass'],
+                    ['goto', function_routine]
                 ])
 
             # Function with default parameters.
@@ -223,29 +223,23 @@ def parse_public_function(code: ast.FunctionDef,
                     'seq',
                     sig_chain,
                     [
-                        'if', 0,  # can only be jumped into
-                        [
-                            'seq',
-                            ['label', function_routine],
-                            ['seq'] + nonreentrant_pre + clampers + [
-                                parse_body(c, context)
-                                for c in code.body
-                            ] + nonreentrant_post + [['stop']]
-                        ],
+                        'seq',
+                        ['label', function_routine],
+                        ['seq'] + nonreentrant_pre + clampers + [
+                            parse_body(c, context)
+                            for c in code.body
+                        ] + nonreentrant_post + [['stop']]
                     ],
                 ], typ=None, pos=getpos(code))
 
         else:
             # Function without default parameters.
-            sig_compare, _ = get_sig_statements(sig, getpos(code))
+            sig_label = get_sig_label(sig, getpos(code))
             o = LLLnode.from_list(
-                [
-                    'if',
-                    sig_compare,
-                    ['seq'] + nonreentrant_pre + clampers + [
-                        parse_body(c, context)
-                        for c
-                        in code.body
-                    ] + nonreentrant_post + [['stop']]
-                ], typ=None, pos=getpos(code))
+                ['seq', sig_label] + nonreentrant_pre + clampers + [
+                    parse_body(c, context)
+                    for c
+                    in code.body
+                ] + nonreentrant_post + [['stop']],
+                typ=None, pos=getpos(code))
     return o
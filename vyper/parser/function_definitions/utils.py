@@ -1,20 +1,14 @@
 from vyper.parser.lll_node import LLLnode
 
 
-def get_sig_statements(sig, pos):
-    method_id_node = LLLnode.from_list(sig.method_id, pos=pos, annotation=f'{sig.sig}')
-
-    if sig.private:
-        sig_compare = 0
-        private_label = LLLnode.from_list(
-            ['label', f'priv_{sig.method_id}'],
-            pos=pos, annotation=f'{sig.sig}'
-        )
-    else:
-        sig_compare = ['eq', ['mload', 0], method_id_node]
-        private_label = ['pass']
-
-    return sig_compare, private_label
+def get_sig_label(sig, pos):
+    # Functions are entered by jumping to their label, private functions from
+    # the caller and public functions from the dispatcher
+    prefix = 'priv' if sig.private else 'pub'
+    return LLLnode.from_list(
+        ['label', f'{prefix}_{sig.method_id}'],
+        pos=pos, annotation=f'{sig.sig}'
+    )
 
 
 def make_unpacker(ident, i_placeholder, begin_pos):
@@ -0,0 +1,54 @@
+from typing import Optional, Set
+
+from vyper import ast as vy_ast
+from vyper.parser.context import Context
+
+
+def _get_start(node):
+    return (node.lineno, node.col_offset)
+
+
+def _get_end(node):
+    return (node.end_lineno, node.end_col_offset)
+
+
+def get_live_variables(context: Context) -> Optional[Set[str]]:
+    """
+    Return the names of the variables that may be read once a call within the
+    statement currently being parsed returns.
+
+    A variable is live if it is read anywhere from the start of the current
+    statement to the end of the function, or anywhere in a for loop that contains
+    the current statement. Assigning to the whole of a variable is not a read.
+
+    Arguments
+    ---------
+    context : Context
+        Context of the function that is being parsed.
+
+    Returns
+    -------
+    Set | None
+        Names of the live variables, or `None` if they are not known.
+    """
+    if context.sig is None or not context.statements:
+        return None
+
+    func_ast = context.sig.func_ast_code
+    start = _get_start(context.statements[-1])
+    loops = [
+        (_get_start(stmt), _get_end(stmt))
+        for stmt in context.statements if isinstance(stmt, vy_ast.For)
+    ]
+    writes = {
+        id(node.target) for node in func_ast.get_descendants((vy_ast.Assign, vy_ast.AnnAssign))
+    }
+
+    live = set()
+    for node in func_ast.get_descendants(vy_ast.Name):
+        if id(node) in writes:
+            continue
+        position = _get_start(node)
+        if position >= start or any(lo <= position <= hi for lo, hi in loops):
+            live.add(node.id)
+    return live
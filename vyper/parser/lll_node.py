@@ -1,5 +1,5 @@
 import re
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 from vyper.exceptions import CompilerPanic
 from vyper.opcodes import get_comb_opcodes
@@ -37,12 +37,35 @@ class NullAttractor(int):
 
 
 # Data structure for LLL parse tree
+#
+# The valency (1 if the node pushes a value on the stack, 0 otherwise) and an upper
+# bound on the gas consumption of each node are computed lazily, on first access.
+# Checking that the number and valencies of the arguments to each node are correct
+# is a separate pass, see `LLLnode.validate`.
 class LLLnode:
+    __slots__ = (
+        'value',
+        'args',
+        'typ',
+        'location',
+        'pos',
+        'annotation',
+        'mutable',
+        'add_gas_estimate',
+        'as_hex',
+        'total_gas_overhead',
+        'func_name',
+        'dispatch_gas',
+        'frame_size',
+        '_gas',
+        '_valency',
+    )
     repr_show_gas = False
-    gas: int
-    valency: int
     args: List['LLLnode']
     value: Union[str, int]
+    total_gas_overhead: Optional[int]
+    _gas: Optional[int]
+    _valency: Optional[int]
 
     def __init__(self,
                  value: Union[str, int],
@@ -69,113 +92,136 @@ class LLLnode:
         self.as_hex = AS_HEX_DEFAULT
 
         # Optional annotation properties for gas estimation
-        self.total_gas = None
+        self.total_gas_overhead = None
         self.func_name = None
+        self.dispatch_gas = None
+        # Size of the memory a function may write to, including the private
+        # functions it calls
+        self.frame_size = None
 
-        # Determine this node's valency (1 if it pushes a value on the stack,
-        # 0 otherwise) and checks to make sure the number and valencies of
-        # children are correct. Also, find an upper bound on gas consumption
+        if not isinstance(self.value, (int, str)) and self.value is not None:
+            raise CompilerPanic(f"Invalid value for LLL AST node: {self.value}")
+        assert isinstance(self.args, list)
+
+        self._gas = None
+        self._valency = valency
+
+    @property
+    def valency(self) -> int:
+        if self._valency is None:
+            return self._annotate('_valency', LLLnode._get_valency)
+        return self._valency
+
+    @property
+    def gas(self) -> int:
+        if self._gas is None:
+            return self._annotate('_gas', LLLnode._estimate_gas)
+        return self._gas
+
+    @gas.setter
+    def gas(self, value: int) -> None:
+        self._gas = value
+
+    @property
+    def total_gas(self) -> Optional[int]:
+        # Gas estimate for a function, including costs that are not part of the LLL
+        # (e.g. memory expansion). Stored relative to `gas`, so that rebuilding the
+        # node does not require the estimate.
+        if self.total_gas_overhead is None:
+            return None
+        return self.gas + self.total_gas_overhead
+
+    @total_gas.setter
+    def total_gas(self, value: Optional[int]) -> None:
+        self.total_gas_overhead = None if value is None else value - self.gas
+
+    def _annotate(self, attr: str, compute: Callable[['LLLnode'], int]) -> int:
+        # Set `attr` on this node and on every descendant where it is not yet known,
+        # children first, and return its value for this node. Uses an explicit stack
+        # so that deeply nested LLL does not reach the recursion limit.
+        stack = [(self, False)]
+        while stack:
+            node, is_ready = stack.pop()
+            if getattr(node, attr) is not None:
+                continue
+            if is_ready:
+                setattr(node, attr, compute(node))
+            else:
+                stack.append((node, True))
+                stack.extend((arg, False) for arg in node.args)
+        return getattr(self, attr)
+
+    def _get_valency(self) -> int:
+        # Numbers
+        if isinstance(self.value, int):
+            return 1
+        elif isinstance(self.value, str):
+            # Opcodes and pseudo-opcodes (e.g. clamp)
+            if self.value.upper() in get_comb_opcodes():
+                return get_comb_opcodes()[self.value.upper()][2]
+            # If statements
+            elif self.value == 'if':
+                return self.args[1].valency
+            # With statements: with <var> <initial> <statement>
+            elif self.value == 'with':
+                return self.args[2].valency
+            # Repeat statements: repeat <index_memloc> <startval> <rounds> <body>
+            elif self.value == 'repeat':
+                return 0
+            # Jump tables: jumptable <index> <goto> <goto> ...
+            elif self.value == 'jumptable':
+                return 0
+            # Seq statements: seq <statement> <statement> ...
+            elif self.value == 'seq':
+                return self.args[-1].valency if self.args else 0
+            # Multi statements: multi <expr> <expr> ...
+            elif self.value == 'multi':
+                return sum([arg.valency for arg in self.args])
+        # LLL brackets, stack variables and None LLLnodes
+        return 1
+
+    def _estimate_gas(self) -> int:
         # Numbers
         if isinstance(self.value, int):
-            self.valency = 1
-            self.gas = 5
+            gas = 5
         elif isinstance(self.value, str):
             # Opcodes and pseudo-opcodes (e.g. clamp)
             if self.value.upper() in get_comb_opcodes():
                 _, ins, outs, gas = get_comb_opcodes()[self.value.upper()]
-                self.valency = outs
-                if len(self.args) != ins:
-                    raise CompilerPanic(
-                        f"Number of arguments mismatched: {self.value} {self.args}"
-                    )
                 # We add 2 per stack height at push time and take it back
                 # at pop time; this makes `break` easier to handle
-                self.gas = gas + 2 * (outs - ins)
+                gas += 2 * (outs - ins)
                 for arg in self.args:
-                    # pop and pass are used to push/pop values on the stack to be
-                    # consumed for private functions, therefore we whitelist this as a zero valency
-                    # allowed argument.
-                    zero_valency_whitelist = {'pass', 'pop'}
-                    if arg.valency == 0 and arg.value not in zero_valency_whitelist:
-                        raise CompilerPanic(
-                            "Can't have a zerovalent argument to an opcode or a pseudo-opcode! "
-                            f"{arg.value}: {arg}. Please file a bug report."
-                        )
-                    self.gas += arg.gas
+                    gas += arg.gas
                 # Dynamic gas cost: 8 gas for each byte of logging data
                 if self.value.upper()[0:3] == 'LOG' and isinstance(self.args[1].value, int):
-                    self.gas += self.args[1].value * 8
+                    gas += self.args[1].value * 8
                 # Dynamic gas cost: non-zero-valued call
                 if self.value.upper() == 'CALL' and self.args[2].value != 0:
-                    self.gas += 34000
+                    gas += 34000
                 # Dynamic gas cost: filling sstore (ie. not clearing)
                 elif self.value.upper() == 'SSTORE' and self.args[1].value != 0:
-                    self.gas += 15000
+                    gas += 15000
                 # Dynamic gas cost: calldatacopy
                 elif self.value.upper() in ('CALLDATACOPY', 'CODECOPY'):
                     size = 34000
                     if isinstance(self.args[2].value, int):
                         size = self.args[2].value
-                    self.gas += ceil32(size) // 32 * 3
+                    gas += ceil32(size) // 32 * 3
                 # Gas limits in call
                 if self.value.upper() == 'CALL' and isinstance(self.args[0].value, int):
-                    self.gas += self.args[0].value
+                    gas += self.args[0].value
             # If statements
             elif self.value == 'if':
                 if len(self.args) == 3:
-                    self.gas = self.args[0].gas + max(self.args[1].gas, self.args[2].gas) + 3
-                if len(self.args) == 2:
-                    self.gas = self.args[0].gas + self.args[1].gas + 17
-                if not self.args[0].valency:
-                    raise CompilerPanic(
-                        "Can't have a zerovalent argument as a test to an if "
-                        f"statement! {self.args[0]}"
-                    )
-                if len(self.args) not in (2, 3):
-                    raise CompilerPanic("If can only have 2 or 3 arguments")
-                self.valency = self.args[1].valency
+                    gas = self.args[0].gas + max(self.args[1].gas, self.args[2].gas) + 3
+                else:
+                    gas = self.args[0].gas + self.args[1].gas + 17
             # With statements: with <var> <initial> <statement>
             elif self.value == 'with':
-                if len(self.args) != 3:
-                    raise CompilerPanic("With statement must have 3 arguments")
-                if len(self.args[0].args) or not isinstance(self.args[0].value, str):
-                    raise CompilerPanic("First argument to with statement must be a variable")
-                if not self.args[1].valency:
-                    raise CompilerPanic((
-                        "Second argument to with statement (initial value) "
-                        f"cannot be zerovalent: {self.args[1]}"
-                    ))
-                self.valency = self.args[2].valency
-                self.gas = sum([arg.gas for arg in self.args]) + 5
+                gas = sum([arg.gas for arg in self.args]) + 5
             # Repeat statements: repeat <index_memloc> <startval> <rounds> <body>
             elif self.value == 'repeat':
-                is_invalid_repeat_count = any((
-                    len(self.args[2].args),
-                    not isinstance(self.args[2].value, int),
-                    isinstance(self.args[2].value, int) and self.args[2].value <= 0,
-                ))
-
-                if is_invalid_repeat_count:
-                    raise CompilerPanic((
-                        "Number of times repeated must be a constant nonzero "
-                        f"positive integer: {self.args[2]}"
-                    ))
-                if not self.args[0].valency:
-                    raise CompilerPanic((
-                        "First argument to repeat (memory location) cannot be "
-                        f"zerovalent: {self.args[0]}"
-                    ))
-                if not self.args[1].valency:
-                    raise CompilerPanic((
-                        "Second argument to repeat (start value) cannot be "
-                        f"zerovalent: {self.args[1]}"
-                    ))
-                if self.args[3].valency:
-                    raise CompilerPanic((
-                        "Third argument to repeat (clause to be repeated) must "
-                        f"be zerovalent: {self.args[3]}"
-                    ))
-                self.valency = 0
                 rounds: int
                 if self.args[1].value in ('calldataload', 'mload') or self.args[1].value == 'sload':
                     if isinstance(self.args[2].value, int):
@@ -191,45 +237,135 @@ class LLLnode:
                         raise CompilerPanic(
                             f'Unsupported second argument types. {self.args}'
                         )
-                self.gas = rounds * (self.args[3].gas + 50) + 30
+                gas = rounds * (self.args[3].gas + 50) + 30
+            # Jump tables: jumptable <index> <goto> <goto> ...
+            elif self.value == 'jumptable':
+                gas = self.args[0].gas + 34
             # Seq statements: seq <statement> <statement> ...
             elif self.value == 'seq':
-                self.valency = self.args[-1].valency if self.args else 0
-                self.gas = sum([arg.gas for arg in self.args]) + 30
+                gas = sum([arg.gas for arg in self.args]) + 30
             # Multi statements: multi <expr> <expr> ...
             elif self.value == 'multi':
-                for arg in self.args:
-                    if not arg.valency:
-                        raise CompilerPanic(
-                            f"Multi expects all children to not be zerovalent: {arg}"
-                        )
-                self.valency = sum([arg.valency for arg in self.args])
-                self.gas = sum([arg.gas for arg in self.args])
+                gas = sum([arg.gas for arg in self.args])
             # LLL brackets (don't bother gas counting)
             elif self.value == 'lll':
-                self.valency = 1
-                self.gas = NullAttractor()
+                gas = NullAttractor()
             # Stack variables
             else:
-                self.valency = 1
-                self.gas = 5
+                gas = 5
                 if self.value == 'seq_unchecked':
-                    self.gas = sum([arg.gas for arg in self.args]) + 30
+                    gas = sum([arg.gas for arg in self.args]) + 30
                 if self.value == 'if_unchecked':
-                    self.gas = self.args[0].gas + self.args[1].gas + 17
-        elif self.value is None:
-            self.valency = 1
+                    gas = self.args[0].gas + self.args[1].gas + 17
+        else:
             # None LLLnodes always get compiled into something else, e.g.
             # mzero or PUSH1 0, and the gas will get re-estimated then.
-            self.gas = 3
-        else:
-            raise CompilerPanic(f"Invalid value for LLL AST node: {self.value}")
-        assert isinstance(self.args, list)
+            gas = 3
+
+        return gas + self.add_gas_estimate
+
+    def validate(self) -> None:
+        """
+        Check the number and valencies of the arguments to this node and all of
+        its descendants.
+
+        This is a consistency check of the generated LLL. It is run during
+        compilation when `VYPER_DEBUG_LLL` is set.
 
-        if valency is not None:
-            self.valency = valency
+        Raises
+        ------
+        CompilerPanic
+            If a node is malformed.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node._validate()
+            stack.extend(node.args)
 
-        self.gas += self.add_gas_estimate
+    def _validate(self) -> None:
+        if not isinstance(self.value, str):
+            return
+        # Opcodes and pseudo-opcodes (e.g. clamp)
+        if self.value.upper() in get_comb_opcodes():
+            ins = get_comb_opcodes()[self.value.upper()][1]
+            if len(self.args) != ins:
+                raise CompilerPanic(
+                    f"Number of arguments mismatched: {self.value} {self.args}"
+                )
+            for arg in self.args:
+                # pop and pass are used to push/pop values on the stack to be
+                # consumed for private functions, therefore we whitelist this as a zero valency
+                # allowed argument.
+                zero_valency_whitelist = {'pass', 'pop'}
+                if arg.valency == 0 and arg.value not in zero_valency_whitelist:
+                    raise CompilerPanic(
+                        "Can't have a zerovalent argument to an opcode or a pseudo-opcode! "
+                        f"{arg.value}: {arg}. Please file a bug report."
+                    )
+        # If statements
+        elif self.value == 'if':
+            if len(self.args) not in (2, 3):
+                raise CompilerPanic("If can only have 2 or 3 arguments")
+            if not self.args[0].valency:
+                raise CompilerPanic(
+                    "Can't have a zerovalent argument as a test to an if "
+                    f"statement! {self.args[0]}"
+                )
+        # With statements: with <var> <initial> <statement>
+        elif self.value == 'with':
+            if len(self.args) != 3:
+                raise CompilerPanic("With statement must have 3 arguments")
+            if len(self.args[0].args) or not isinstance(self.args[0].value, str):
+                raise CompilerPanic("First argument to with statement must be a variable")
+            if not self.args[1].valency:
+                raise CompilerPanic((
+                    "Second argument to with statement (initial value) "
+                    f"cannot be zerovalent: {self.args[1]}"
+                ))
+        # Repeat statements: repeat <index_memloc> <startval> <rounds> <body>
+        elif self.value == 'repeat':
+            is_invalid_repeat_count = any((
+                len(self.args[2].args),
+                not isinstance(self.args[2].value, int),
+                isinstance(self.args[2].value, int) and self.args[2].value <= 0,
+            ))
+
+            if is_invalid_repeat_count:
+                raise CompilerPanic((
+                    "Number of times repeated must be a constant nonzero "
+                    f"positive integer: {self.args[2]}"
+                ))
+            if not self.args[0].valency:
+                raise CompilerPanic((
+                    "First argument to repeat (memory location) cannot be "
+                    f"zerovalent: {self.args[0]}"
+                ))
+            if not self.args[1].valency:
+                raise CompilerPanic((
+                    "Second argument to repeat (start value) cannot be "
+                    f"zerovalent: {self.args[1]}"
+                ))
+            if self.args[3].valency:
+                raise CompilerPanic((
+                    "Third argument to repeat (clause to be repeated) must "
+                    f"be zerovalent: {self.args[3]}"
+                ))
+        # Jump tables: jumptable <index> <goto> <goto> ...
+        elif self.value == 'jumptable':
+            if len(self.args) < 2:
+                raise CompilerPanic("Jumptable must have an index and at least one entry")
+            if not self.args[0].valency:
+                raise CompilerPanic(f"Index of a jumptable cannot be zerovalent: {self.args[0]}")
+            if any(arg.value != 'goto' for arg in self.args[1:]):
+                raise CompilerPanic(f"Entries of a jumptable must be gotos: {self.args[1:]}")
+        # Multi statements: multi <expr> <expr> ...
+        elif self.value == 'multi':
+            for arg in self.args:
+                if not arg.valency:
+                    raise CompilerPanic(
+                        f"Multi expects all children to not be zerovalent: {arg}"
+                    )
 
     def __getitem__(self, i):
         return self.to_list()[i]
@@ -1,25 +1,72 @@
-from typing import Tuple
+from typing import List, Tuple
 
 from vyper.exceptions import CompilerPanic
 from vyper.utils import MemoryPositions
 
 
 class MemoryAllocator:
+    """
+    Keeps track of the memory used by the variables of a function.
+
+    Memory that is released is added to a list of free blocks, which are reused
+    by later allocations before memory is grown.
+    """
     next_mem: int
+    size_of_mem: int
 
     def __init__(self, start_position: int = MemoryPositions.RESERVED_MEMORY):
+        # end of the memory that is currently allocated
         self.next_mem = start_position
+        # highest value of `next_mem`, i.e. the size of memory used by the function
+        self.size_of_mem = start_position
+        # blocks below `next_mem` that were released, as (position, size), sorted
+        self.free_blocks: List[Tuple[int, int]] = []
 
     # Get the next unused memory location
     def get_next_memory_position(self) -> int:
         return self.next_mem
 
-    # Grow memory by x bytes
+    # Allocate x bytes, reusing the first free block that is large enough
     def increase_memory(self, size: int) -> Tuple[int, int]:
         if size % 32 != 0:
             raise CompilerPanic(
                 'Memory misaligment, only multiples of 32 supported.'
             )
+        for idx, (position, free_size) in enumerate(self.free_blocks):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free_blocks[idx]
+                else:
+                    self.free_blocks[idx] = (position + size, free_size - size)
+                return position, position + size
+
         before_value = self.next_mem
         self.next_mem += size
+        self.size_of_mem = max(self.size_of_mem, self.next_mem)
         return before_value, self.next_mem
+
+    # Release x bytes at a position returned by `increase_memory`
+    def release_memory(self, position: int, size: int) -> None:
+        if size == 0:
+            return
+        if position + size > self.next_mem or any(
+            position < free_pos + free_size and free_pos < position + size
+            for free_pos, free_size in self.free_blocks
+        ):
+            raise CompilerPanic(f'Memory at {position} released twice or never allocated')
+
+        self.free_blocks.append((position, size))
+        self.free_blocks.sort()
+
+        # merge adjacent free blocks
+        merged: List[Tuple[int, int]] = []
+        for free_pos, free_size in self.free_blocks:
+            if merged and merged[-1][0] + merged[-1][1] == free_pos:
+                merged[-1] = (merged[-1][0], merged[-1][1] + free_size)
+            else:
+                merged.append((free_pos, free_size))
+
+        # a free block at the end of allocated memory shrinks it
+        if merged[-1][0] + merged[-1][1] == self.next_mem:
+            self.next_mem = merged.pop()[0]
+        self.free_blocks = merged
@@ -6,6 +6,11 @@ from vyper.exceptions import (
     FunctionDeclarationException,
     StructureException,
 )
+from vyper.parser.dispatcher import (
+    DEFAULT_DISPATCH,
+    get_method_id_weights,
+    make_dispatcher,
+)
 from vyper.parser.function_definitions import (
     is_default_func,
     is_initializer,
@@ -17,7 +22,7 @@ from vyper.signatures import sig_utils
 from vyper.signatures.event_signature import EventSignature
 from vyper.signatures.function_signature import FunctionSignature
 from vyper.signatures.interface import check_valid_contract_interface
-from vyper.typing import InterfaceImports
+from vyper.typing import DispatchProfile, InterfaceImports
 from vyper.utils import LOADED_LIMITS
 
 # TODO remove this check
@@ -105,19 +110,42 @@ def parse_other_functions(o,
                           external_contracts,
                           origcode,
                           global_ctx,
-                          default_function):
+                          default_function,
+                          dispatch=DEFAULT_DISPATCH,
+                          dispatch_profile=None):
     sub = ['seq', func_init_lll()]
     add_gas = func_init_lll().gas
 
+    functions = []
     for _def in otherfuncs:
-        sub.append(
-            parse_function(_def, {**{'self': sigs}, **external_contracts}, origcode, global_ctx)
-        )
-        sub[-1].total_gas += add_gas
-        add_gas += 30
-        for sig in sig_utils.generate_default_arg_sigs(_def, external_contracts, global_ctx):
-            sig.gas = sub[-1].total_gas
+        func = parse_function(_def, {**{'self': sigs}, **external_contracts}, origcode, global_ctx)
+        func.total_gas += add_gas
+        default_sigs = sig_utils.generate_default_arg_sigs(_def, external_contracts, global_ctx)
+        for sig in default_sigs:
+            sig.gas = func.total_gas
+            sig.frame_size = func.frame_size
             sigs[sig.sig] = sig
+        functions.append((func, default_sigs))
+
+    # Public functions are entered from the dispatcher, their gas estimate includes
+    # the worst-case gas used by the dispatcher to reach them
+    public_sigs = [sig for _, default_sigs in functions for sig in default_sigs if not sig.private]
+    weights = None
+    if dispatch_profile is not None:
+        weights = get_method_id_weights(
+            dispatch_profile, {sig.sig: sig.method_id for sig in public_sigs}
+        )
+    dispatcher, dispatch_gas = make_dispatcher(
+        [sig.method_id for sig in public_sigs], dispatch, weights
+    )
+    sub.append(dispatcher)
+    for func, default_sigs in functions:
+        if not default_sigs[0].private:
+            func.dispatch_gas = {sig.method_id: dispatch_gas[sig.method_id] for sig in default_sigs}
+            func.total_gas += max(func.dispatch_gas.values())
+            for sig in default_sigs:
+                sig.gas = func.total_gas
+        sub.append(func)
 
     # Add fallback function
     if default_function:
@@ -131,12 +159,19 @@ def parse_other_functions(o,
     else:
         fallback = LLLnode.from_list(['revert', 0, 0], typ=None, annotation='Default function')
     sub.append(['seq_unchecked', ['label', 'fallback'], fallback])
-    o.append(['return', 0, ['lll', sub, 0]])
-    return o, sub
+    # the runtime LLL is built once, and shared with the deployment LLL
+    runtime = LLLnode.from_list(sub, typ=None)
+    o.append(['return', 0, ['lll', runtime, 0]])
+    return o, runtime
 
 
 # Main python parse tree => LLL method
-def parse_tree_to_lll(source_code: str, global_ctx: GlobalContext) -> Tuple[LLLnode, LLLnode]:
+def parse_tree_to_lll(
+    source_code: str,
+    global_ctx: GlobalContext,
+    dispatch: str = DEFAULT_DISPATCH,
+    dispatch_profile: Optional[DispatchProfile] = None,
+) -> Tuple[LLLnode, LLLnode]:
     _names_def = [_def.name for _def in global_ctx._defs]
     # Checks for duplicate function names
     if len(set(_names_def)) < len(_names_def):
@@ -189,7 +224,9 @@ def parse_tree_to_lll(source_code: str, global_ctx: GlobalContext) -> Tuple[LLLn
             external_contracts,
             source_code,
             global_ctx,
-            defaultfunc
+            defaultfunc,
+            dispatch,
+            dispatch_profile,
         )
     else:
         runtime = o.copy()
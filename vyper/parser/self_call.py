@@ -5,8 +5,13 @@ from vyper.exceptions import (
     StructureException,
     TypeMismatch,
 )
+from vyper.parser.liveness import get_live_variables
 from vyper.parser.lll_node import LLLnode
-from vyper.parser.parser_utils import getpos, pack_arguments
+from vyper.parser.parser_utils import (
+    base_type_conversion,
+    getpos,
+    pack_arguments,
+)
 from vyper.signatures.function_signature import FunctionSignature
 from vyper.types import (
     BaseType,
@@ -92,21 +97,40 @@ def call_self_private(stmt_expr, context, sig):
     push_args = []
 
     # Push local variables.
-    var_slots = [
-        (v.pos, v.size) for name, v in context.vars.items()
+    # Only variables that may be read after the call returns, and that lie within
+    # the memory used by the callee, are saved. Internal variables are always
+    # considered live. Memory between the saved variables may be reused by a
+    # placeholder that is still to be allocated (e.g. for the return value), so
+    # only the contiguous runs of memory held by saved variables are restored.
+    live_vars = get_live_variables(context)
+    saved_vars = [
+        v for name, v in context.vars.items()
         if v.location == 'memory'
+        and (sig.frame_size is None or v.pos < sig.frame_size)
+        and (live_vars is None or name in live_vars or name.startswith(context._mangle('')))
     ]
-    if var_slots:
-        var_slots.sort(key=lambda x: x[0])
-        mem_from, mem_to = var_slots[0][0], var_slots[-1][0] + var_slots[-1][1] * 32
+    if sig.frame_size is None:
+        context.callee_frame_size = None
+    elif context.callee_frame_size is not None:
+        context.callee_frame_size = max(context.callee_frame_size, sig.frame_size)
+
+    var_runs = []
+    for pos, size in sorted((v.pos, v.size * 32) for v in saved_vars):
+        if var_runs and pos <= var_runs[-1][1]:
+            var_runs[-1][1] = max(var_runs[-1][1], pos + size)
+        else:
+            var_runs.append([pos, pos + size])
 
+    if any(mem_to - mem_from > 320 for mem_from, mem_to in var_runs):
         i_placeholder = context.new_placeholder(BaseType('uint256'))
-        local_save_ident = f"_{stmt_expr.lineno}_{stmt_expr.col_offset}"
+
+    for idx, (mem_from, mem_to) in enumerate(var_runs):
+        local_save_ident = f"_{stmt_expr.lineno}_{stmt_expr.col_offset}_{idx}"
         push_loop_label = 'save_locals_start' + local_save_ident
         pop_loop_label = 'restore_locals_start' + local_save_ident
 
         if mem_to - mem_from > 320:
-            push_local_vars = [
+            push_local_vars += [
                     ['mstore', i_placeholder, mem_from],
                     ['label', push_loop_label],
                     ['mload', ['mload', i_placeholder]],
@@ -114,7 +138,7 @@ def call_self_private(stmt_expr, context, sig):
                     ['if', ['lt', ['mload', i_placeholder], mem_to],
                         ['goto', push_loop_label]]
             ]
-            pop_local_vars = [
+            pop_local_vars[:0] = [
                 ['mstore', i_placeholder, mem_to - 32],
                 ['label', pop_loop_label],
                 ['mstore', ['mload', i_placeholder], 'pass'],
@@ -123,11 +147,27 @@ def call_self_private(stmt_expr, context, sig):
                        ['goto', pop_loop_label]]
             ]
         else:
-            push_local_vars = [['mload', pos] for pos in range(mem_from, mem_to, 32)]
-            pop_local_vars = [['mstore', pos, 'pass'] for pos in range(mem_to-32, mem_from-32, -32)]
+            push_local_vars += [['mload', pos] for pos in range(mem_from, mem_to, 32)]
+            pop_local_vars[:0] = [
+                ['mstore', pos, 'pass'] for pos in range(mem_to-32, mem_from-32, -32)
+            ]
 
     # Push Arguments
-    if expr_args:
+    if expr_args and sig.uses_stack_convention():
+        if len(expr_args) != len(sig.args):
+            raise StructureException(
+                f"Wrong number of args for: {sig.name} "
+                f"({len(expr_args)} args given, expected {len(sig.args)})",
+                stmt_expr
+            )
+        # evaluated in order and pushed directly, the callee pops them in reverse.
+        push_args += [
+            base_type_conversion(
+                arg, arg.typ, sig_arg.typ, getpos(stmt_expr), in_function_call=True
+            )
+            for arg, sig_arg in zip(expr_args, sig.args)
+        ]
+    elif expr_args:
         inargs, inargsize, arg_pos = pack_arguments(
             sig,
             expr_args,
@@ -194,16 +234,19 @@ def call_self_private(stmt_expr, context, sig):
             stmt_expr
         )
 
-    # Jump to function label.
+    # Jump to function label, the callback pointer is a fresh return label.
     jump_to_func = [
-        ['add', ['pc'], 6],  # set callback pointer.
-        ['goto', f'priv_{sig.method_id}'],
-        ['jumpdest'],
+        ['gosub', f'priv_{sig.method_id}'],
     ]
 
     # Pop return values.
     returner = [0]
-    if sig.output_type:
+    location = 'memory'
+    if sig.uses_stack_convention() and sig.output_type and not pop_local_vars:
+        # the return value is left on the stack by the callee
+        returner = 'pass'
+        location = None
+    elif sig.output_type:
         output_placeholder, returner, output_size = call_make_placeholder(stmt_expr, context, sig)
         if output_size > 0:
             dynamic_offsets = []
@@ -285,7 +328,7 @@ def call_self_private(stmt_expr, context, sig):
     o = LLLnode.from_list(
         pop_returner_call_body,
         typ=sig.output_type,
-        location='memory',
+        location=location,
         pos=getpos(stmt_expr),
         annotation=f'Internal Call: {method_name}',
         add_gas_estimate=sig.gas
@@ -1,5 +1,9 @@
 from vyper import ast as vy_ast
-from vyper.codegen.return_ import gen_tuple_return, make_return_stmt
+from vyper.codegen.return_ import (
+    gen_tuple_return,
+    make_return_stmt,
+    make_stack_return_stmt,
+)
 from vyper.exceptions import (
     CompilerPanic,
     ConstancyViolation,
@@ -705,6 +709,21 @@ class Stmt(object):
     def parse_break(self):
         return LLLnode.from_list('break', typ=None, pos=getpos(self.stmt))
 
+    def _make_base_return(self, sub):
+        if self.context.is_private and self.context.sig.uses_stack_convention():
+            # push the value directly rather than through memory
+            return_stmt = make_stack_return_stmt(self.context, sub)
+        else:
+            return_stmt = [
+                'seq', ['mstore', 0, sub], make_return_stmt(self.stmt, self.context, 0, 32)
+            ]
+        return LLLnode.from_list(
+            return_stmt,
+            typ=None,
+            pos=getpos(self.stmt),
+            valency=0,
+        )
+
     def parse_return(self):
         if self.context.return_type is None:
             if self.stmt.value:
@@ -737,23 +756,9 @@ class Stmt(object):
                         self.stmt
                     )
                 else:
-                    return LLLnode.from_list(
-                        [
-                            'seq',
-                            ['mstore', 0, sub],
-                            make_return_stmt(self.stmt, self.context, 0, 32)
-                        ],
-                        typ=None,
-                        pos=getpos(self.stmt),
-                        valency=0,
-                    )
+                    return self._make_base_return(sub)
             elif is_base_type(sub.typ, self.context.return_type.typ) or (is_base_type(sub.typ, 'int128') and is_base_type(self.context.return_type, 'int256')):  # noqa: E501
-                return LLLnode.from_list(
-                    ['seq', ['mstore', 0, sub], make_return_stmt(self.stmt, self.context, 0, 32)],
-                    typ=None,
-                    pos=getpos(self.stmt),
-                    valency=0,
-                )
+                return self._make_base_return(sub)
             else:
                 raise TypeMismatch(
                     f"Unsupported type conversion: {sub.typ} to {self.context.return_type}",
@@ -916,7 +921,8 @@ class Stmt(object):
 
 # Parse a statement (usually one line of code but not always)
 def parse_stmt(stmt, context):
-    return Stmt(stmt, context).lll_node
+    with context.statement_scope(stmt):
+        return Stmt(stmt, context).lll_node
 
 
 # Parse a piece of code
@@ -4,6 +4,12 @@ from typing import Optional
 VYPER_COLOR_OUTPUT = os.environ.get('VYPER_COLOR_OUTPUT', '0') == '1'
 VYPER_ERROR_CONTEXT_LINES = int(os.environ.get('VYPER_ERROR_CONTEXT_LINES', '1'))
 VYPER_ERROR_LINE_NUMBERS = os.environ.get('VYPER_ERROR_LINE_NUMBERS', '1') == '1'
+# perform exhaustive (and slow) consistency checks when modifying the AST
+VYPER_DEBUG_AST = os.environ.get('VYPER_DEBUG_AST', '0') == '1'
+# check the structure of all generated LLL (slow)
+VYPER_DEBUG_LLL = os.environ.get('VYPER_DEBUG_LLL', '0') == '1'
+# maximum size of the on-disk compilation cache, in bytes (default 256MB)
+VYPER_CACHE_MAX_SIZE = int(os.environ.get('VYPER_CACHE_MAX_SIZE', str(256 * 1024 * 1024)))
 
 VYPER_TRACEBACK_LIMIT: Optional[int]
 
@@ -14,6 +14,7 @@ from vyper.parser.parser_utils import (
     getpos,
 )
 from vyper.types import (
+    BaseType,
     ByteArrayLike,
     StructType,
     TupleLike,
@@ -76,6 +77,7 @@ class FunctionSignature:
         self.sig = sig
         self.method_id = method_id
         self.gas = None
+        self.frame_size = None
         self.nonreentrant_key = nonreentrant_key
         self.func_ast_code = func_ast_code
         self.calculate_arg_totals()
@@ -418,6 +420,17 @@ class FunctionSignature:
     def is_initializer(self):
         return self.name == '__init__'
 
+    def uses_stack_convention(self):
+        # Private functions with only base type arguments, without default
+        # arguments, and returning nothing or a base type, take their arguments
+        # and return their value on the stack rather than through memory.
+        return (
+            self.private and
+            self.total_default_args == 0 and
+            all(isinstance(arg.typ, BaseType) for arg in self.args) and
+            (self.output_type is None or isinstance(self.output_type, BaseType))
+        )
+
     def validate_return_statement_balance(self):
         # Run balanced return statement check.
         check_unmatched_return(self.func_ast_code)
@@ -10,6 +10,7 @@ SourceCode = str
 ContractCodes = Dict[ContractPath, SourceCode]
 OutputFormats = Sequence[str]
 OutputDict = Dict[ContractPath, OutputFormats]
+DispatchProfile = Dict[str, float]
 
 # Interfaces
 InterfaceAsName = str
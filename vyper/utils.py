@@ -186,7 +186,7 @@ VALID_LLL_MACROS = {
     'clampgt', 'clample', 'clamplt', 'codeload', 'continue', 'debugger', 'ge',
     'if', 'le', 'lll', 'ne', 'pass', 'repeat', 'seq', 'set', 'sge', 'sha3_32',
     'sha3_64', 'sle', 'uclampge', 'uclampgt', 'uclample', 'uclamplt', 'with',
-    '~codelen', 'label', 'goto',
+    '~codelen', 'label', 'goto', 'gosub', 'jumptable',
 }
 
 